@@ -0,0 +1,126 @@
+# fake_mcp_filesystem.py — offline stand-in for @modelcontextprotocol/server-filesystem
+# ============================================
+#
+#   ADK_MCP_FILESYSTEM_CMD="python3 bench/fake_mcp_filesystem.py" python3 src/adk_service.py ...
+#
+# A small stdio MCP server exposing the same tool names and argument shapes as
+# the Node filesystem server, restricted to the directory given as its last
+# argument. No Node, npm or network needed, and it starts in a fraction of the
+# time, so benchmarks measure the pipeline rather than npx.
+
+import json
+import os
+import sys
+from datetime import datetime, timezone
+from typing import List
+
+try:
+    from mcp.server.fastmcp import FastMCP
+except ImportError:  # mcp >= 2 renamed the high-level server
+    from mcp.server.mcpserver import MCPServer as FastMCP
+
+ROOT = os.path.realpath(sys.argv[-1] if len(sys.argv) > 1 else os.getcwd())
+
+server = FastMCP("filesystem")
+
+
+def _resolve(path: str) -> str:
+    full = os.path.realpath(path if os.path.isabs(path) else os.path.join(ROOT, path))
+    if full != ROOT and not full.startswith(ROOT + os.sep):
+        raise ValueError(f"Access denied - path outside allowed directories: {path}")
+    return full
+
+
+@server.tool()
+def read_file(path: str) -> str:
+    """Read the complete contents of a file."""
+    with open(_resolve(path), "r", encoding="utf-8") as f:
+        return f.read()
+
+
+@server.tool()
+def read_multiple_files(paths: List[str]) -> str:
+    """Read several files at once."""
+    results = []
+    for path in paths:
+        try:
+            results.append(f"{path}:\n{read_file(path)}")
+        except (OSError, ValueError) as e:
+            results.append(f"{path}: Error - {e}")
+    return "\n---\n".join(results)
+
+
+@server.tool()
+def write_file(path: str, content: str) -> str:
+    """Create or overwrite a file."""
+    full = _resolve(path)
+    os.makedirs(os.path.dirname(full), exist_ok=True)
+    with open(full, "w", encoding="utf-8") as f:
+        f.write(content)
+    return f"Successfully wrote to {path}"
+
+
+@server.tool()
+def create_directory(path: str) -> str:
+    """Create a directory, including parents."""
+    os.makedirs(_resolve(path), exist_ok=True)
+    return f"Successfully created directory {path}"
+
+
+@server.tool()
+def list_directory(path: str) -> str:
+    """List a directory, marking entries as [FILE] or [DIR]."""
+    full = _resolve(path)
+    return "\n".join(
+        f"{'[DIR]' if os.path.isdir(os.path.join(full, name)) else '[FILE]'} {name}"
+        for name in sorted(os.listdir(full))
+    )
+
+
+@server.tool()
+def directory_tree(path: str) -> str:
+    """Recursive JSON tree of files and directories."""
+    def walk(full: str):
+        entries = []
+        for name in sorted(os.listdir(full)):
+            child = os.path.join(full, name)
+            if os.path.isdir(child):
+                entries.append({"name": name, "type": "directory", "children": walk(child)})
+            else:
+                entries.append({"name": name, "type": "file"})
+        return entries
+
+    return json.dumps(walk(_resolve(path)), indent=2)
+
+
+@server.tool()
+def search_files(path: str, pattern: str) -> str:
+    """Find files and directories whose name contains `pattern`."""
+    matches = []
+    for dirpath, dirnames, filenames in os.walk(_resolve(path)):
+        for name in dirnames + filenames:
+            if pattern.lower() in name.lower():
+                matches.append(os.path.join(dirpath, name))
+    return "\n".join(matches) or "No matches found"
+
+
+@server.tool()
+def get_file_info(path: str) -> str:
+    """Size, timestamps and type of a file or directory."""
+    st = os.stat(_resolve(path))
+    modified = datetime.fromtimestamp(st.st_mtime, timezone.utc).isoformat()
+    return "\n".join([
+        f"size: {st.st_size}",
+        f"modified: {modified}",
+        f"isDirectory: {os.path.isdir(_resolve(path))}",
+    ])
+
+
+@server.tool()
+def list_allowed_directories() -> str:
+    """Directories this server may access."""
+    return f"Allowed directories:\n{ROOT}"
+
+
+if __name__ == "__main__":
+    server.run()
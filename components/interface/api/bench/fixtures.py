@@ -0,0 +1,149 @@
+# fixtures.py — synthetic replay fixtures for small, medium and huge projects
+# ============================================
+#
+# Each fixture is a complete, review-clean pipeline run: an analysis naming
+# React + Vite, a CodeWriterAgent script that builds N React components, an
+# approving review, and a TestingAgent that lists the project through the MCP
+# filesystem server before writing its report. Only the script size changes
+# between scenarios, so differences in overhead come from the stages that
+# parse, validate and save it.
+
+import json
+from typing import Dict
+
+from replay_llm import TARGET_PLACEHOLDER, Fixture
+
+# scenario -> (component files, approximate bytes per component)
+SCENARIOS: Dict[str, tuple] = {
+    "small": (4, 400),
+    "medium": (60, 1500),
+    "huge": (400, 4000),
+}
+
+ANALYSIS = """# Project Requirements Analysis
+
+## 📋 Project Overview
+A dashboard of interactive counter widgets.
+
+## 🛠️ Technical Stack
+- Frontend: React 18 + Vite
+
+## 📦 Deliverables
+- src/components/*.jsx
+- src/App.jsx
+- README.md
+"""
+
+APPROVED = "APPROVED: Code is production-ready and ready to save."
+
+REPORT = """# Validation Report
+
+## ✅ Passed Checks
+- output.py exists and is valid Python
+- All components are implemented
+
+## 📊 Summary
+- Status: PASS
+"""
+
+
+def _component(index: int, size: int) -> str:
+    lines = [
+        "import { useState } from 'react';",
+        "",
+        f"export default function Widget{index}() {{",
+        "  const [count, setCount] = useState(0);",
+        "  const items = [",
+    ]
+    body = sum(len(line) + 1 for line in lines)
+    item = 0
+    while body < size:
+        line = f"    'widget-{index}-item-{item}',"
+        lines.append(line)
+        body += len(line) + 1
+        item += 1
+    lines += [
+        "  ];",
+        "  return (",
+        f"    <section className='widget-{index}'>",
+        "      <button onClick={() => setCount(count + 1)}>Clicked {count} times</button>",
+        "      <ul>{items.map((item) => <li key={item}>{item}</li>)}</ul>",
+        "    </section>",
+        "  );",
+        "}",
+    ]
+    return "\n".join(lines) + "\n"
+
+
+def build_script(components: int, size: int) -> str:
+    package = {
+        "name": "widget-dashboard",
+        "version": "0.1.0",
+        "private": True,
+        "type": "module",
+        "scripts": {"dev": "vite", "build": "vite build", "preview": "vite preview"},
+        "dependencies": {"react": "^18.2.0", "react-dom": "^18.2.0"},
+        "devDependencies": {"@vitejs/plugin-react": "^4.2.0", "vite": "^5.0.0"},
+    }
+    files = {
+        "package.json": json.dumps(package, indent=2) + "\n",
+        "README.md": "# Widget Dashboard\n\n## Setup\n\n```bash\nnpm install\nnpm run dev\n```\n",
+        ".gitignore": "node_modules\ndist\n",
+        "index.html": (
+            "<!doctype html>\n<html lang='en'>\n  <head><title>Widget Dashboard</title></head>\n"
+            "  <body>\n    <div id='root'></div>\n    <script type='module' src='/src/main.jsx'></script>\n"
+            "  </body>\n</html>\n"
+        ),
+        "vite.config.js": (
+            "import { defineConfig } from 'vite';\nimport react from '@vitejs/plugin-react';\n\n"
+            "export default defineConfig({ plugins: [react()] });\n"
+        ),
+        "src/main.jsx": (
+            "import React from 'react';\nimport ReactDOM from 'react-dom/client';\nimport App from './App.jsx';\n\n"
+            "ReactDOM.createRoot(document.getElementById('root')).render(<App />);\n"
+        ),
+    }
+    imports = "\n".join(f"import Widget{i} from './components/Widget{i}.jsx';" for i in range(components))
+    tags = "\n".join(f"      <Widget{i} />" for i in range(components))
+    files["src/App.jsx"] = f"{imports}\n\nexport default function App() {{\n  return (\n    <main>\n{tags}\n    </main>\n  );\n}}\n"
+    for i in range(components):
+        files[f"src/components/Widget{i}.jsx"] = _component(i, size)
+
+    writes = "\n".join(
+        f"    create_file(os.path.join(project_path, {path!r}), {content!r})" for path, content in files.items()
+    )
+    return f"""#!/usr/bin/env python3
+import os
+
+
+def create_file(path, content):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(content)
+
+
+def main():
+    project_path = os.path.join("{TARGET_PLACEHOLDER}", "widget-dashboard")
+    os.makedirs(project_path, exist_ok=True)
+{writes}
+    print("Created " + str({len(files)}) + " files in " + project_path)
+
+
+if __name__ == "__main__":
+    main()
+"""
+
+
+def synthetic_fixture(scenario: str) -> Fixture:
+    components, size = SCENARIOS[scenario]
+    fixture = Fixture(scenario)
+    fixture.add_text("BusinessAnalystAgent", ANALYSIS)
+    fixture.add_text("CodeWriterAgent", f"```python\n{build_script(components, size)}```")
+    fixture.add_text("CodeReviewerAgent", APPROVED)
+    fixture.add_text("CodeRefactorerAgent", build_script(components, size))
+    fixture.add_text("PatchRefactorerAgent", "")
+    fixture.add("TestingAgent", {"role": "model", "parts": [
+        {"function_call": {"name": "list_directory", "args": {"path": TARGET_PLACEHOLDER}}},
+    ]})
+    fixture.add_text("TestingAgent", REPORT)
+    return fixture
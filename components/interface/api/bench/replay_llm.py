@@ -0,0 +1,177 @@
+# replay_llm.py — deterministic record/replay model backend for benchmarks
+# ============================================
+#
+# ReplayLlm answers every model call from a fixture: a list of recorded
+# responses per agent, replayed in call order within a run (a second
+# CodeReviewerAgent call in the review loop gets the second response, and so
+# on; the last one repeats). Latency is artificial and configurable, so
+# pipeline overhead can be measured apart from model time.
+#
+# Fixtures are recorded from real runs with record_agents(); absolute paths
+# under TARGET_FOLDER_PATH are stored as {{TARGET_FOLDER_PATH}} so a fixture
+# replays into any directory.
+
+import asyncio
+import json
+import os
+import time
+from contextvars import ContextVar
+from typing import Any, AsyncGenerator, Dict, List, Optional, Tuple
+
+from google.adk.agents import BaseAgent, LlmAgent
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.adk.models.registry import LLMRegistry
+from google.genai import types as genai_types
+
+TARGET_PLACEHOLDER = "{{TARGET_FOLDER_PATH}}"
+
+# (invocation id, agent name) of the model call about to run
+_current_call: ContextVar[Tuple[str, str]] = ContextVar("replay_current_call", default=("", ""))
+
+
+class Fixture:
+    def __init__(self, name: str, responses: Optional[Dict[str, List[Dict[str, Any]]]] = None):
+        self.name = name
+        self.responses: Dict[str, List[Dict[str, Any]]] = responses or {}
+
+    def add(self, agent: str, content: Dict[str, Any]):
+        self.responses.setdefault(agent, []).append(content)
+
+    def add_text(self, agent: str, text: str):
+        self.add(agent, {"role": "model", "parts": [{"text": text}]})
+
+    @classmethod
+    def load(cls, path: str) -> "Fixture":
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(data["name"], data["responses"])
+
+    def save(self, path: str):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"name": self.name, "responses": self.responses}, f, indent=1)
+
+    @property
+    def script_bytes(self) -> int:
+        texts = [
+            p.get("text", "") for p in (self.responses.get("CodeWriterAgent") or [{}])[-1].get("parts", [])
+        ]
+        return sum(len(t.encode("utf-8")) for t in texts)
+
+
+class ReplayBackend:
+    def __init__(self):
+        self.fixture = Fixture("empty")
+        self.target = ""
+        self.latency_s = 0.0  # before the first chunk
+        self.stream_s_per_kb = 0.0  # while streaming the rest
+        self.chunk_chars = 200
+        self._calls: Dict[Tuple[str, str], int] = {}
+        self.model_s: Dict[str, float] = {}  # simulated model time per agent
+
+    def configure(self, fixture: Fixture, target: str, latency_ms: float = 0.0, stream_ms_per_kb: float = 0.0):
+        self.fixture = fixture
+        self.target = os.path.abspath(target)
+        self.latency_s = latency_ms / 1000
+        self.stream_s_per_kb = stream_ms_per_kb / 1000
+        self.reset()
+
+    def reset(self):
+        self._calls.clear()
+        self.model_s.clear()
+
+    def next_content(self, invocation_id: str, agent: str) -> genai_types.Content:
+        recorded = self.fixture.responses.get(agent)
+        if not recorded:
+            raise ValueError(f"Fixture {self.fixture.name!r} has no responses for {agent!r}")
+        index = self._calls.get((invocation_id, agent), 0)
+        self._calls[(invocation_id, agent)] = index + 1
+        blob = json.dumps(recorded[min(index, len(recorded) - 1)]).replace(
+            TARGET_PLACEHOLDER, self.target.replace("\\", "\\\\")
+        )
+        return genai_types.Content.model_validate_json(blob)
+
+
+backend = ReplayBackend()
+
+
+class ReplayLlm(BaseLlm):
+    @classmethod
+    def supported_models(cls) -> List[str]:
+        return [r"replay/.*"]
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        invocation_id, agent = _current_call.get()
+        content = backend.next_content(invocation_id, agent)
+        text = "".join(p.text for p in content.parts or [] if p.text)
+        prompt_chars = len(str(llm_request.config.system_instruction or "")) + sum(
+            len(p.text or "") for c in llm_request.contents for p in c.parts or []
+        )
+        usage = genai_types.GenerateContentResponseUsageMetadata(
+            prompt_token_count=prompt_chars // 4,
+            candidates_token_count=len(text) // 4,
+            total_token_count=prompt_chars // 4 + len(text) // 4,
+        )
+
+        # Only the simulated waits count as model time; time spent by the
+        # pipeline consuming streamed chunks is overhead
+        simulated = backend.latency_s + backend.stream_s_per_kb * len(text) / 1024
+        backend.model_s[agent] = backend.model_s.get(agent, 0.0) + simulated
+        # Pace against deadlines so sleep overshoot does not add up per chunk
+        deadline = time.monotonic() + backend.latency_s
+        await asyncio.sleep(backend.latency_s)
+        if stream and text:
+            chunks = [text[i:i + backend.chunk_chars] for i in range(0, len(text), backend.chunk_chars)]
+            for chunk in chunks:
+                yield LlmResponse(content=genai_types.Content(role="model", parts=[genai_types.Part(text=chunk)]), partial=True)
+                deadline += backend.stream_s_per_kb * len(chunk) / 1024
+                await asyncio.sleep(max(deadline - time.monotonic(), 0))
+        elif backend.stream_s_per_kb:
+            await asyncio.sleep(backend.stream_s_per_kb * len(text) / 1024)
+        yield LlmResponse(content=content, usage_metadata=usage)
+
+
+LLMRegistry.register(ReplayLlm)
+
+
+def _llm_agents(agent: BaseAgent) -> List[LlmAgent]:
+    found = [agent] if isinstance(agent, LlmAgent) else []
+    for sub in agent.sub_agents:
+        found += _llm_agents(sub)
+    return found
+
+
+def _prepend(agent: LlmAgent, field: str, callback):
+    existing = getattr(agent, field)
+    callbacks = existing if isinstance(existing, list) else ([existing] if existing else [])
+    setattr(agent, field, [callback] + callbacks)
+
+
+def bind_agents(root_agent: BaseAgent):
+    """Tell ReplayLlm which agent is calling; the request itself does not say."""
+    async def before_model(callback_context: CallbackContext, llm_request: LlmRequest):
+        _current_call.set((callback_context.invocation_id, callback_context.agent_name))
+        return None
+
+    for agent in _llm_agents(root_agent):
+        _prepend(agent, "before_model_callback", before_model)
+
+
+def record_agents(root_agent: BaseAgent, fixture: Fixture, target: str):
+    """Append every final model response of a real run to `fixture`."""
+    target = os.path.abspath(target)
+
+    async def after_model(callback_context: CallbackContext, llm_response: LlmResponse):
+        if not llm_response.partial and llm_response.content is not None:
+            blob = llm_response.content.model_dump_json(exclude_none=True).replace(
+                json.dumps(target)[1:-1], TARGET_PLACEHOLDER
+            )
+            fixture.add(callback_context.agent_name, json.loads(blob))
+        return None
+
+    for agent in _llm_agents(root_agent):
+        _prepend(agent, "after_model_callback", after_model)
@@ -0,0 +1,283 @@
+# run_bench.py — offline benchmark suite for adk_service.py
+# ============================================
+#
+#   python3 bench/run_bench.py --out bench.json                 # small, medium, huge
+#   python3 bench/run_bench.py --scenarios huge --runs 5 --latency-ms 200
+#   python3 bench/run_bench.py --fixture recorded.json           # replay a recorded run
+#   python3 bench/run_bench.py --compare before.json after.json  # exit 1 on regressions
+#   LLM_MODEL=gemini-2.5-flash python3 bench/run_bench.py --record recorded.json "build a todo app"
+#
+# Every scenario runs in a fresh child process against ReplayLlm and the
+# offline MCP filesystem stand-in, so no network is needed. Each child reports:
+#
+#   coldStartMs      interpreter start -> pipeline built and MCP server connected
+#   wallMs           end-to-end pipeline time per run (median, plus the first run)
+#   overheadMs       wall time minus simulated model time
+#   agentOverheadMs  per agent: activation time minus its simulated model time
+#   eventsPerRun     pipeline events emitted per run
+#   eventsPerSec     emit_event() throughput through a JSON-serializing sink
+#   peakRssKb        peak resident set size of the child
+#
+# Results are one JSON document, so runs on two commits can be compared.
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+SRC_DIR = os.path.join(BENCH_DIR, "..", "src")
+SCHEMA_VERSION = 1
+REQUEST = "Build a React dashboard of interactive counter widgets"
+
+# metric -> True when higher is better
+COMPARED_METRICS = {
+    "coldStartMs": False,
+    "wallMs": False,
+    "overheadMs": False,
+    "peakRssKb": False,
+    "eventsPerSec": True,
+}
+
+
+def _git(*args: str) -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", *args], cwd=BENCH_DIR, capture_output=True, text=True, timeout=10, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+# ----------------------------------------------------------------------------
+# Child: one scenario in a fresh interpreter
+# ----------------------------------------------------------------------------
+def _emit_throughput(emit_event, event_sink, count: int = 20000) -> float:
+    payload = {"agent": "CodeWriterAgent", "text": "x" * 200, "seq": 0}
+    with open(os.devnull, "w") as devnull:
+        with event_sink(lambda data: devnull.write(json.dumps(data) + "\n")):
+            start = time.perf_counter()
+            for i in range(count):
+                emit_event("agent.delta", {**payload, "seq": i})
+            elapsed = time.perf_counter() - start
+    return round(count / elapsed)
+
+
+def run_child(args) -> Dict[str, Any]:
+    spawned_at = float(os.environ.get("BENCH_SPAWNED_AT", time.time()))
+    sys.path[:0] = [SRC_DIR, BENCH_DIR]
+    import resource
+
+    started = time.perf_counter()
+    import adk_service
+    from adk_pipeline.events import emit_event, event_sink
+    from fixtures import synthetic_fixture
+    from replay_llm import Fixture, backend, bind_agents
+    import_ms = (time.perf_counter() - started) * 1000
+
+    fixture = Fixture.load(args.child) if os.path.isfile(args.child) else synthetic_fixture(args.child)
+    target = os.environ["TARGET_FOLDER_PATH"]
+    backend.configure(fixture, target, args.latency_ms, args.stream_ms_per_kb)
+
+    async def _main():
+        built = time.perf_counter()
+        runner = adk_service.get_runner()
+        bind_agents(runner.agent)
+        build_ms = (time.perf_counter() - built) * 1000
+        prewarmed = time.perf_counter()
+        await adk_service.mcp_pool.prewarm(1)
+        prewarm_ms = (time.perf_counter() - prewarmed) * 1000
+        cold_start_ms = (time.time() - spawned_at) * 1000
+
+        runs = []
+        try:
+            for _ in range(args.runs):
+                for name in os.listdir(target):
+                    path = os.path.join(target, name)
+                    shutil.rmtree(path) if os.path.isdir(path) else os.remove(path)
+                backend.reset()
+                events: List[Dict[str, Any]] = []
+                with open(os.devnull, "w") as devnull:
+                    def sink(data: Dict[str, Any]):
+                        devnull.write(json.dumps(data) + "\n")
+                        events.append(data)
+
+                    with event_sink(sink):
+                        start = time.perf_counter()
+                        await adk_service.run_pipeline_async(REQUEST, None, write_stdout=False)
+                        wall_ms = (time.perf_counter() - start) * 1000
+
+                metrics = next((e for e in events if e["event"] == "pipeline.metrics"), {})
+                model_ms = {agent: s * 1000 for agent, s in backend.model_s.items()}
+                runs.append({
+                    "ok": metrics.get("status") == "success" and os.path.exists(os.path.join(target, "output.py")),
+                    "wallMs": wall_ms,
+                    "modelMs": sum(model_ms.values()),
+                    "events": len(events),
+                    "agentOverheadMs": {
+                        agent: row["durationMs"] - model_ms.get(agent, 0.0)
+                        for agent, row in (metrics.get("agents") or {}).items()
+                    },
+                })
+        finally:
+            await adk_service.shutdown_async()
+        return cold_start_ms, import_ms, build_ms, prewarm_ms, runs
+
+    cold_start_ms, import_ms, build_ms, prewarm_ms, runs = asyncio.run(_main())
+    warm = runs[1:] or runs
+    agents = sorted({a for r in runs for a in r["agentOverheadMs"]})
+    return {
+        "fixture": fixture.name,
+        "scriptBytes": fixture.script_bytes,
+        "runs": len(runs),
+        "ok": all(r["ok"] for r in runs),
+        "coldStartMs": round(cold_start_ms, 1),
+        "importMs": round(import_ms, 1),
+        "buildMs": round(build_ms, 1),
+        "mcpConnectMs": round(prewarm_ms, 1),
+        "firstRunMs": round(runs[0]["wallMs"], 1),
+        "wallMs": round(statistics.median(r["wallMs"] for r in warm), 1),
+        "overheadMs": round(statistics.median(r["wallMs"] - r["modelMs"] for r in warm), 1),
+        "agentOverheadMs": {
+            agent: round(statistics.median(r["agentOverheadMs"].get(agent, 0.0) for r in warm), 1)
+            for agent in agents
+        },
+        "eventsPerRun": round(statistics.median(r["events"] for r in runs)),
+        "eventsPerSec": _emit_throughput(emit_event, event_sink),
+        "peakRssKb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    }
+
+
+# ----------------------------------------------------------------------------
+# Parent: spawn one child per scenario and collect the results
+# ----------------------------------------------------------------------------
+def run_scenario(scenario: str, args) -> Dict[str, Any]:
+    with tempfile.TemporaryDirectory(prefix="adk-bench-") as tmp:
+        target = os.path.join(tmp, "target")
+        os.makedirs(target)
+        env = {
+            **os.environ,
+            "LLM_MODEL": "replay/bench",
+            "TARGET_FOLDER_PATH": target,
+            "ADK_MCP_FILESYSTEM_CMD": f"{sys.executable} {os.path.join(BENCH_DIR, 'fake_mcp_filesystem.py')}",
+            "ADK_LLM_TESTER": args.tester,
+            "ADK_CACHE": "off",
+            "ADK_TRACE_DIR": "",
+            "ADK_MCP_PREWARM": "0",
+            "BENCH_SPAWNED_AT": repr(time.time()),
+        }
+        cmd = [
+            sys.executable, os.path.abspath(__file__), "--child", scenario,
+            "--runs", str(args.runs), "--latency-ms", str(args.latency_ms),
+            "--stream-ms-per-kb", str(args.stream_ms_per_kb),
+        ]
+        proc = subprocess.run(cmd, env=env, capture_output=True, text=True, timeout=args.timeout)
+    if proc.returncode != 0:
+        return {"error": (proc.stderr or proc.stdout).strip().splitlines()[-20:]}
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def run_suite(args) -> Dict[str, Any]:
+    scenarios = [args.fixture] if args.fixture else args.scenarios.split(",")
+    results = {}
+    for scenario in scenarios:
+        name = os.path.splitext(os.path.basename(scenario))[0]
+        print(f"benchmarking {name} ...", file=sys.stderr, flush=True)
+        results[name] = run_scenario(os.path.abspath(scenario) if args.fixture else scenario, args)
+    return {
+        "schema": SCHEMA_VERSION,
+        "createdAt": datetime.now(timezone.utc).isoformat(),
+        "git": {"commit": _git("rev-parse", "HEAD"), "dirty": bool(_git("status", "--porcelain", "--", "."))},
+        "host": {"python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count()},
+        "config": {
+            "runs": args.runs,
+            "latencyMs": args.latency_ms,
+            "streamMsPerKb": args.stream_ms_per_kb,
+            "llmTester": args.tester,
+        },
+        "scenarios": results,
+    }
+
+
+def compare(before_path: str, after_path: str, threshold: float) -> int:
+    with open(before_path, "r", encoding="utf-8") as f:
+        before = json.load(f)
+    with open(after_path, "r", encoding="utf-8") as f:
+        after = json.load(f)
+    print(f"{before.get('git', {}).get('commit') or before_path} -> {after.get('git', {}).get('commit') or after_path}")
+    regressions = 0
+    for scenario, new in after.get("scenarios", {}).items():
+        old = before.get("scenarios", {}).get(scenario)
+        if not old or "error" in old or "error" in new:
+            continue
+        for metric, higher_is_better in COMPARED_METRICS.items():
+            a, b = old.get(metric), new.get(metric)
+            if not a or b is None:
+                continue
+            change = (b - a) / a * 100
+            worse = -change if higher_is_better else change
+            flag = "REGRESSION" if worse > threshold else ""
+            regressions += bool(flag)
+            print(f"{scenario:<10} {metric:<14} {a:>12} -> {b:>12} {change:>+8.1f}% {flag}")
+    return 1 if regressions else 0
+
+
+def record(args) -> int:
+    """Run the real pipeline once and save its model responses as a replay fixture."""
+    sys.path[:0] = [SRC_DIR, BENCH_DIR]
+    import adk_service
+    from replay_llm import Fixture, record_agents
+
+    fixture = Fixture(os.path.splitext(os.path.basename(args.record))[0])
+    record_agents(adk_service.get_runner().agent, fixture, adk_service.TARGET_FOLDER_PATH)
+    adk_service.run_pipeline(args.request)
+    fixture.save(args.record)
+    print(f"Recorded {sum(len(v) for v in fixture.responses.values())} responses to {args.record}", file=sys.stderr)
+    return 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Offline benchmarks for the ADK pipeline")
+    parser.add_argument("--scenarios", default="small,medium,huge", help="comma-separated synthetic scenarios")
+    parser.add_argument("--fixture", help="replay a recorded fixture file instead of the synthetic scenarios")
+    parser.add_argument("--runs", type=int, default=3, help="pipeline runs per scenario (first run reported apart)")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="simulated time to first token per model call")
+    parser.add_argument("--stream-ms-per-kb", type=float, default=0.0, help="simulated streaming time per KB of output")
+    parser.add_argument("--tester", default="always", choices=["always", "auto", "never"], help="ADK_LLM_TESTER mode")
+    parser.add_argument("--timeout", type=float, default=600.0, help="seconds before a scenario is abandoned")
+    parser.add_argument("--out", help="write the results here instead of stdout")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"), help="compare two result files")
+    parser.add_argument("--threshold", type=float, default=10.0, help="regression threshold in percent for --compare")
+    parser.add_argument("--record", metavar="FIXTURE", help="record a real run (uses LLM_MODEL) into FIXTURE")
+    parser.add_argument("request", nargs="?", default=REQUEST, help="request used with --record")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        print(json.dumps(run_child(args)))
+        return 0
+    if args.compare:
+        return compare(*args.compare, args.threshold)
+    if args.record:
+        return record(args)
+
+    report = json.dumps(run_suite(args), indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(report + "\n")
+    else:
+        print(report)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,267 @@
+import { spawn } from "child_process";
+import { randomUUID } from "crypto";
+import { ADK_WORKERS } from "./constants.js";
+
+/**
+ * Prefork pool of long-lived `adk_service.py --worker` processes.
+ *
+ * Each worker imports ADK once and keeps its agent graph and MCP toolset warm,
+ * so requests skip the multi-second Python cold start. Workers speak JSON lines
+ * over stdin/stdout (see adk_pipeline/worker.py). A worker runs as many jobs at
+ * once as the `concurrency` it announces when ready; jobs go to the least
+ * loaded worker and the rest wait in a FIFO queue until a slot frees up.
+ */
+export class ADKWorkerPool {
+  constructor({ scriptPath, size = ADK_WORKERS.POOL_SIZE, env = {} }) {
+    this.scriptPath = scriptPath;
+    this.size = size;
+    this.env = env;
+    this.workers = new Set();
+    this.queue = [];
+    this.jobs = new Map(); // jobId -> { worker, resolve, reject, onEvent }
+    this.healthTimer = null;
+    this.stopping = false;
+  }
+
+  start() {
+    if (this.healthTimer) return;
+    for (let i = 0; i < this.size; i++) {
+      this.#spawnWorker();
+    }
+    this.healthTimer = setInterval(() => this.#healthCheck(), ADK_WORKERS.HEALTH_CHECK_INTERVAL);
+    this.healthTimer.unref?.();
+    console.log(`🐍 ADK worker pool starting ${this.size} worker(s)`);
+  }
+
+  /**
+   * Run a pipeline job on the next free worker
+   * @param {Object} job - { id?, task, context, workDir? }
+   * @param {Object} options - { onEvent(eventType, data), timeout }
+   * @returns {Promise<Array>} Pipeline outputs
+   */
+  run(job, { onEvent, timeout } = {}) {
+    const id = job.id || randomUUID();
+    return new Promise((resolve, reject) => {
+      let timer = null;
+      const done = (fn) => (value) => {
+        clearTimeout(timer);
+        fn(value);
+      };
+      this.jobs.set(id, {
+        worker: null,
+        resolve: done(resolve),
+        reject: done(reject),
+        onEvent,
+        message: { ...job, type: "job", id },
+      });
+      if (timeout) {
+        timer = setTimeout(() => {
+          // The worker stays busy until it acknowledges the cancel
+          const entry = this.jobs.get(id);
+          if (entry?.worker) this.#send(entry.worker, { type: "cancel", id });
+          this.queue = this.queue.filter((queuedId) => queuedId !== id);
+          this.#settle(id, new Error(`ADK job timed out after ${timeout}ms`));
+        }, timeout);
+      }
+      this.queue.push(id);
+      this.#dispatch();
+    });
+  }
+
+  cancel(jobId) {
+    const entry = this.jobs.get(jobId);
+    if (!entry) return;
+    if (entry.worker) {
+      this.#send(entry.worker, { type: "cancel", id: jobId });
+    } else {
+      this.queue = this.queue.filter((id) => id !== jobId);
+      this.jobs.delete(jobId);
+      entry.reject(new Error("ADK job cancelled"));
+    }
+  }
+
+  stats() {
+    const workers = [...this.workers];
+    return {
+      size: this.size,
+      ready: workers.filter((w) => w.ready).length,
+      busy: workers.filter((w) => w.jobIds.size > 0).length,
+      running: workers.reduce((sum, w) => sum + w.jobIds.size, 0),
+      capacity: workers.filter((w) => w.ready).reduce((sum, w) => sum + w.capacity, 0),
+      queued: this.queue.length,
+    };
+  }
+
+  async shutdown() {
+    this.stopping = true;
+    clearInterval(this.healthTimer);
+    this.healthTimer = null;
+    for (const id of this.queue) {
+      this.jobs.get(id)?.reject(new Error("ADK worker pool shutting down"));
+      this.jobs.delete(id);
+    }
+    this.queue = [];
+
+    const exits = [...this.workers].map(
+      (worker) =>
+        new Promise((resolve) => {
+          worker.proc.once("exit", resolve);
+          this.#send(worker, { type: "shutdown" });
+          setTimeout(() => {
+            worker.proc.kill("SIGKILL");
+            resolve();
+          }, ADK_WORKERS.SHUTDOWN_TIMEOUT).unref?.();
+        })
+    );
+    await Promise.all(exits);
+  }
+
+  #spawnWorker() {
+    const proc = spawn("python3", [this.scriptPath, "--worker"], {
+      env: { ...process.env, ...this.env },
+      stdio: ["pipe", "pipe", "pipe"],
+    });
+    const worker = {
+      proc,
+      ready: false,
+      draining: false,
+      capacity: 1,
+      jobIds: new Set(),
+      jobsCompleted: 0,
+      stdoutBuffer: "",
+      pendingPing: null,
+      readyTimer: null,
+    };
+    this.workers.add(worker);
+
+    worker.readyTimer = setTimeout(() => {
+      console.error(`⚠️ ADK worker ${proc.pid} not ready after ${ADK_WORKERS.READY_TIMEOUT}ms, restarting`);
+      proc.kill("SIGKILL");
+    }, ADK_WORKERS.READY_TIMEOUT);
+
+    proc.stdout.on("data", (chunk) => {
+      worker.stdoutBuffer += chunk.toString();
+      const lines = worker.stdoutBuffer.split("\n");
+      worker.stdoutBuffer = lines.pop() || "";
+      for (const line of lines) {
+        if (!line.trim()) continue;
+        try {
+          this.#handleMessage(worker, JSON.parse(line));
+        } catch (err) {
+          console.warn(`ADK worker ${proc.pid} sent invalid line:`, err.message);
+        }
+      }
+    });
+
+    proc.stderr.on("data", (chunk) => {
+      console.error(`ADK worker ${proc.pid}:`, chunk.toString());
+    });
+
+    proc.on("exit", (code, signal) => {
+      clearTimeout(worker.readyTimer);
+      this.workers.delete(worker);
+      for (const jobId of worker.jobIds) {
+        this.#settle(jobId, new Error(`ADK worker exited (code ${code}, signal ${signal})`));
+      }
+      worker.jobIds.clear();
+      if (!this.stopping) {
+        console.warn(`⚠️ ADK worker ${proc.pid} exited (code ${code}), respawning`);
+        setTimeout(() => {
+          if (!this.stopping) this.#spawnWorker();
+        }, ADK_WORKERS.RESPAWN_DELAY);
+      }
+    });
+
+    proc.on("error", (err) => {
+      console.error("Failed to spawn ADK worker:", err.message);
+    });
+  }
+
+  #handleMessage(worker, msg) {
+    switch (msg.type) {
+      case "ready":
+        clearTimeout(worker.readyTimer);
+        worker.ready = true;
+        worker.capacity = Math.max(1, msg.concurrency || 1);
+        console.log(`✅ ADK worker ${msg.pid} ready (${worker.capacity} concurrent job(s))`);
+        this.#dispatch();
+        break;
+      case "pong":
+        if (worker.pendingPing) {
+          clearTimeout(worker.pendingPing);
+          worker.pendingPing = null;
+        }
+        break;
+      case "event": {
+        const entry = this.jobs.get(msg.id);
+        const { type, id, event, ...data } = msg;
+        entry?.onEvent?.(event, data);
+        break;
+      }
+      case "result":
+        this.#settle(msg.id, null, msg.outputs);
+        this.#release(worker, msg.id);
+        break;
+      case "error":
+        this.#settle(msg.id, new Error(msg.error || "ADK worker job failed"));
+        this.#release(worker, msg.id);
+        break;
+      default:
+        break;
+    }
+  }
+
+  #dispatch() {
+    while (this.queue.length > 0) {
+      const worker = [...this.workers]
+        .filter((w) => w.ready && w.jobIds.size < w.capacity)
+        .sort((a, b) => a.jobIds.size / a.capacity - b.jobIds.size / b.capacity)[0];
+      if (!worker) return;
+      const jobId = this.queue.shift();
+      const entry = this.jobs.get(jobId);
+      if (!entry) continue;
+      entry.worker = worker;
+      worker.jobIds.add(jobId);
+      this.#send(worker, entry.message);
+    }
+  }
+
+  #release(worker, jobId) {
+    if (!worker.jobIds.delete(jobId)) return;
+    worker.jobsCompleted += 1;
+    // Recycle long-lived workers to bound memory growth; stop sending new jobs
+    // and shut down once the ones in flight have finished
+    if (worker.jobsCompleted >= ADK_WORKERS.MAX_JOBS_PER_WORKER) {
+      worker.ready = false;
+      worker.draining = true;
+    }
+    if (worker.draining && worker.jobIds.size === 0) {
+      this.#send(worker, { type: "shutdown" });
+    }
+    this.#dispatch();
+  }
+
+  #settle(jobId, error, outputs) {
+    const entry = this.jobs.get(jobId);
+    if (!entry) return;
+    this.jobs.delete(jobId);
+    error ? entry.reject(error) : entry.resolve(outputs);
+  }
+
+  #healthCheck() {
+    for (const worker of this.workers) {
+      if (!worker.ready || worker.pendingPing) continue;
+      worker.pendingPing = setTimeout(() => {
+        console.error(`⚠️ ADK worker ${worker.proc.pid} failed health check, restarting`);
+        worker.ready = false;
+        worker.proc.kill("SIGKILL");
+      }, ADK_WORKERS.HEALTH_CHECK_TIMEOUT);
+      this.#send(worker, { type: "ping", id: randomUUID() });
+    }
+  }
+
+  #send(worker, message) {
+    if (!worker.proc.stdin.writable) return;
+    worker.proc.stdin.write(JSON.stringify(message) + "\n");
+  }
+}
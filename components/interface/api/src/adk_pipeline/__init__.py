@@ -0,0 +1,5 @@
+# adk_pipeline — support modules for adk_service.py
+# ============================================
+#
+# adk_service.py is launched directly (`python3 adk_service.py`), so its own
+# directory is on sys.path and these modules import as `adk_pipeline.<name>`.
@@ -0,0 +1,318 @@
+# artifacts.py — generated files stored once, referenced by an index
+# ============================================
+#
+# The writer's script embeds every project file, and the whole script used to
+# be pasted into CodeReviewerAgent and CodeRefactorerAgent on every review
+# iteration. ArtifactIndexAgent instead stores each file the script resolves
+# to (script.analyze_script) once in a content-addressed ArtifactStore and puts
+# a compact manifest in session state:
+#
+#   artifact_manifest  relative path -> {sha256, bytes}
+#   artifact_index     one line per file, for the prompts
+#   review_code        the script with embedded file bodies replaced by
+#                      <<file: path>> markers
+#
+# Agents fetch the files they actually need with the read_project_file tool.
+# The refactorer answers with SEARCH/REPLACE patches (refine.py's format) for
+# the files it changes; ArtifactPatchAgent applies them to the stored contents
+# and splices the new bodies back into the script, so output.py stays the
+# single builder every later stage reads.
+#
+# Scripts whose files cannot all be recovered statically are not indexed
+# (artifact_mode is False): review_code is then the full script and the
+# whole-script refactorer runs, as before.
+
+import ast
+import hashlib
+import os
+from collections import OrderedDict
+from typing import Any, AsyncGenerator, Callable, Dict, List, Mapping, Optional, Tuple
+
+from google.adk.agents import BaseAgent
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.events import Event, EventActions
+from google.adk.tools.tool_context import ToolContext
+
+from adk_pipeline.events import emit_event
+from adk_pipeline.refine import PatchError, parse_patches, plan_edits
+from adk_pipeline.script import analyze_script, project_files, render_script, strip_code_fences, write_atomic
+
+# String literals shorter than this stay in the outline even when they are a file body
+OUTLINE_MIN_CHARS = 80
+
+
+class ArtifactStore:
+    """Content-addressed file bodies: a bounded memory tier, then <root>/<sha[:2]>/<sha>."""
+
+    def __init__(self, root: str = "", max_memory_bytes: int = 64 * 1024 * 1024):
+        self.root = root
+        self.max_memory_bytes = max_memory_bytes
+        self._memory: "OrderedDict[str, str]" = OrderedDict()
+        self._memory_bytes = 0
+
+    def _path(self, digest: str) -> str:
+        return os.path.join(self.root, digest[:2], digest)
+
+    def _remember(self, digest: str, content: str):
+        if digest in self._memory:
+            self._memory.move_to_end(digest)
+            return
+        self._memory[digest] = content
+        self._memory_bytes += len(content)
+        while self._memory_bytes > self.max_memory_bytes and len(self._memory) > 1:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+
+    def put(self, content: str) -> Tuple[str, bool]:
+        """Store `content`; returns its sha256 and whether it was new to the store."""
+        digest = hashlib.sha256(content.encode("utf-8")).hexdigest()
+        new = digest not in self._memory
+        if self.root:
+            path = self._path(digest)
+            new = not os.path.exists(path)
+            if new:
+                write_atomic(path, content)
+        self._remember(digest, content)
+        return digest, new
+
+    def get(self, digest: str) -> Optional[str]:
+        content = self._memory.get(digest)
+        if content is None and self.root:
+            try:
+                with open(self._path(digest), "r", encoding="utf-8") as f:
+                    content = f.read()
+            except OSError:
+                return None
+        if content is not None:
+            self._remember(digest, content)
+        return content
+
+
+def render_index(manifest: Dict[str, Dict[str, Any]]) -> str:
+    return "\n".join(
+        f"- {path} ({entry['bytes']} bytes, sha256 {entry['sha256'][:12]})" for path, entry in manifest.items()
+    )
+
+
+def _line_offsets(source: str) -> Callable[[int, int], int]:
+    # ast column offsets count UTF-8 bytes; turn (line, col) into a str index
+    lines = source.splitlines(keepends=True)
+    starts = [0]
+    for line in lines:
+        starts.append(starts[-1] + len(line))
+
+    def offset(lineno: int, col: int) -> int:
+        line = lines[lineno - 1] if lineno <= len(lines) else ""
+        return starts[lineno - 1] + len(line.encode("utf-8")[:col].decode("utf-8", errors="ignore"))
+    return offset
+
+
+def _string_literals(source: str, tree: ast.AST) -> List[Tuple[int, int, str]]:
+    """(start, end, value) of every str constant in the script."""
+    offset = _line_offsets(source)
+    spans = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Constant) and isinstance(node.value, str) and node.end_lineno is not None:
+            spans.append((offset(node.lineno, node.col_offset), offset(node.end_lineno, node.end_col_offset), node.value))
+    return spans
+
+
+def _replace_spans(source: str, replacements: List[Tuple[int, int, str]]) -> str:
+    for start, end, text in sorted(replacements, reverse=True):
+        source = source[:start] + text + source[end:]
+    return source
+
+
+def outline_script(source: str, tree: ast.AST, files: Dict[str, str]) -> str:
+    """The script with each embedded file body replaced by a <<file: path>> marker."""
+    paths_by_body: Dict[str, str] = {}
+    for path, content in files.items():
+        paths_by_body.setdefault(content, path)
+    replacements = []
+    for start, end, value in _string_literals(source, tree):
+        if len(value) >= OUTLINE_MIN_CHARS:
+            path = paths_by_body.get(value)
+            replacements.append((start, end, f"<<file: {path}>>" if path else f"<<text: {len(value)} chars>>"))
+    return _replace_spans(source, replacements)
+
+
+def splice_script(source: str, old: Dict[str, str], new: Dict[str, str]) -> Optional[str]:
+    """Rewrite the literals holding changed file bodies in place.
+
+    Returns None when that is not possible (files added or removed, a body that
+    is not a single literal or is shared by several files); the caller then
+    renders a fresh builder instead.
+    """
+    if set(old) != set(new):
+        return None
+    changed = {path for path in old if old[path] != new[path]}
+    bodies = list(old.values())
+    if any(bodies.count(old[path]) > 1 for path in changed):
+        return None
+    try:
+        tree = ast.parse(source)
+    except SyntaxError:
+        return None
+    wanted = {old[path]: new[path] for path in changed}
+    literals = [(start, end, value) for start, end, value in _string_literals(source, tree) if value in wanted]
+    if {value for _, _, value in literals} != set(wanted):
+        return None
+    replacements = [(start, end, repr(wanted[value])) for start, end, value in literals]
+    spliced = _replace_spans(source, replacements)
+    return spliced if project_files(analyze_script(spliced)) == new else None
+
+
+def _current_files(store: ArtifactStore, state: Mapping[str, Any], code_key: str) -> Optional[Dict[str, str]]:
+    """The indexed files' contents: from the store, or from the script itself on a miss."""
+    manifest = state.get("artifact_manifest") or {}
+    files = {}
+    for path, entry in manifest.items():
+        content = store.get(entry["sha256"])
+        if content is None:
+            break
+        files[path] = content
+    else:
+        return files
+    return project_files(analyze_script(strip_code_fences(state.get(code_key) or "")))
+
+
+def read_project_file_tool(store: ArtifactStore, code_key: str = "generated_code"):
+    """The read_project_file tool, bound to `store`."""
+
+    def read_project_file(path: str, tool_context: ToolContext) -> Dict[str, Any]:
+        """Read one file of the generated project by its path in the artifact index.
+
+        Args:
+            path: Path relative to the project root, exactly as listed in the index.
+
+        Returns:
+            {"path", "content"} on success, or {"error"} when the path is not indexed.
+        """
+        state = tool_context.state
+        manifest = state.get("artifact_manifest") or {}
+        relative = path.strip()
+        if relative.startswith("./"):
+            relative = relative[2:]
+        entry = manifest.get(relative)
+        if entry is None:
+            return {"error": f"{path} is not in the artifact index"}
+        content = store.get(entry["sha256"])
+        if content is None:
+            content = (_current_files(store, state, code_key) or {}).get(relative)
+        if content is None:
+            return {"error": f"{path} is no longer available"}
+        return {"path": relative, "content": content}
+
+    return read_project_file
+
+
+class ArtifactIndexAgent(BaseAgent):
+    """Stores the current script's files and publishes their index for the prompts."""
+
+    store: Any  # ArtifactStore
+    source_key: str = "generated_code"
+    refactored_key: str = "refactored_code"
+
+    async def _run_async_impl(self, ctx: InvocationContext) -> AsyncGenerator[Event, None]:
+        state = ctx.session.state
+        source = strip_code_fences(state.get(self.refactored_key) or state.get(self.source_key) or "")
+        analysis = analyze_script(source)
+        files = project_files(analysis)
+        delta: Dict[str, Any] = {}
+        if "artifact_patch_errors" not in state:
+            delta["artifact_patch_errors"] = ""
+
+        if files:
+            manifest: Dict[str, Dict[str, Any]] = {}
+            stored = 0
+            for path, content in files.items():
+                digest, new = self.store.put(content)
+                stored += new
+                manifest[path] = {"sha256": digest, "bytes": len(content.encode("utf-8"))}
+            outline = outline_script(source, analysis.tree, files)
+            delta.update({
+                "artifact_mode": True,
+                "artifact_manifest": manifest,
+                "artifact_project_path": analysis.project_path,
+                "artifact_index": render_index(manifest),
+                "review_code": outline,
+            })
+            emit_event("artifact.index", {
+                "indexed": True,
+                "files": len(manifest),
+                "bytes": sum(e["bytes"] for e in manifest.values()),
+                "stored": stored,
+                "scriptChars": len(source),
+                "outlineChars": len(outline),
+            })
+        else:
+            delta.update({
+                "artifact_mode": False,
+                "artifact_manifest": {},
+                "artifact_project_path": None,
+                "artifact_index": "(the files could not be indexed statically; read output.py instead)",
+                "review_code": source,
+            })
+            emit_event("artifact.index", {"indexed": False, "scriptChars": len(source)})
+
+        yield Event(
+            author=self.name,
+            invocation_id=ctx.invocation_id,
+            branch=ctx.branch,
+            actions=EventActions(state_delta=delta),
+        )
+
+
+class ArtifactPatchAgent(BaseAgent):
+    """Applies the refactorer's per-file patches and writes the updated script to refactored_code."""
+
+    store: Any  # ArtifactStore
+    patches_key: str = "refactor_patches"
+    source_key: str = "generated_code"
+    refactored_key: str = "refactored_code"
+
+    async def _run_async_impl(self, ctx: InvocationContext) -> AsyncGenerator[Event, None]:
+        state = ctx.session.state
+        manifest = state.get("artifact_manifest") or {}
+        source = strip_code_fences(state.get(self.source_key) or "")
+        files = _current_files(self.store, state, self.source_key) or {}
+        delta: Dict[str, Any] = {}
+
+        try:
+            patches = parse_patches(state.get(self.patches_key) or "")
+            changes, unchanged, errors = plan_edits(manifest, patches, files.get)
+        except PatchError as e:
+            changes, unchanged, errors = {}, [], [str(e)]
+        if not files:
+            errors.append("the indexed files are not available")
+
+        mode = None
+        if not errors and changes:
+            updated = dict(files)
+            for path, content in changes.items():
+                if content is None:
+                    updated.pop(path, None)
+                else:
+                    updated[path] = content
+            script = splice_script(source, files, updated)
+            mode = "splice"
+            if script is None:
+                script = render_script(state.get("artifact_project_path"), updated)
+                mode = "render"
+            delta[self.refactored_key] = script
+
+        delta["artifact_patch_errors"] = "\n".join(f"- {e}" for e in errors)
+        emit_event("artifact.patch", {
+            "applied": not errors,
+            "mode": mode,
+            "changed": sorted(changes) if not errors else [],
+            "unchanged": unchanged,
+            "patchChars": len(state.get(self.patches_key) or ""),
+            "errors": errors,
+        })
+        yield Event(
+            author=self.name,
+            invocation_id=ctx.invocation_id,
+            branch=ctx.branch,
+            actions=EventActions(state_delta=delta),
+        )
@@ -0,0 +1,331 @@
+# cache.py — content-addressed response cache for agent model calls
+# ============================================
+#
+# Attached to each LlmAgent through its model callbacks. A call is keyed by
+# model, agent name and a hash of the rendered request (system instruction,
+# conversation contents, tools, generation config), so a repeated request
+# replays earlier answers instead of re-running every stage against the model.
+#
+#   memory tier  - per-process LRU, bounded by entry count
+#   disk tier    - SQLite file with TTL and a total-size cap (LRU eviction)
+#
+# Concurrent identical calls are coalesced: the first caller goes upstream and
+# the others wait for its response (single-flight). A leader whose call never
+# reaches after_model/on_model_error (its job was cancelled or timed out) is
+# released when the job's scope ends, so the key does not stay in flight.
+#
+# Each job runs in its own work directory (state["work_dir"]); the path is
+# swapped for a placeholder in keys and stored answers so jobs share entries.
+
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import TYPE_CHECKING, Any, Dict, Iterator, Optional, Set, Tuple
+
+if TYPE_CHECKING:
+    from google.adk.agents.callback_context import CallbackContext
+    from google.adk.models.llm_request import LlmRequest
+    from google.adk.models.llm_response import LlmResponse
+
+from adk_pipeline.events import emit_event
+
+WORK_DIR_PLACEHOLDER = "{{WORK_DIR}}"
+
+# Single-flight calls the current job leads: (invocation id, agent)
+_led_calls: ContextVar[Optional[Set[Tuple[str, str]]]] = ContextVar("adk_cache_led_calls", default=None)
+
+
+class MemoryTier:
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, str]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[str]:
+        value = self._entries.get(key)
+        if value is not None:
+            self._entries.move_to_end(key)
+        return value
+
+    def put(self, key: str, value: str):
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SqliteTier:
+    def __init__(self, path: str, ttl_s: float = 86400.0, max_bytes: int = 64 * 1024 * 1024):
+        self.path = path
+        self.ttl_s = ttl_s
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=5.0)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS adk_response_cache ("
+                " key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL,"
+                " created_at REAL NOT NULL, last_access REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_adk_response_cache_access ON adk_response_cache(last_access)"
+            )
+        return self._conn
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            db = self._db()
+            row = db.execute(
+                "SELECT value, created_at FROM adk_response_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if self.ttl_s and now - row[1] > self.ttl_s:
+                db.execute("DELETE FROM adk_response_cache WHERE key = ?", (key,))
+                db.commit()
+                return None
+            db.execute("UPDATE adk_response_cache SET last_access = ? WHERE key = ?", (now, key))
+            db.commit()
+            return row[0]
+
+    def put(self, key: str, value: str):
+        now = time.time()
+        with self._lock:
+            db = self._db()
+            db.execute(
+                "INSERT OR REPLACE INTO adk_response_cache (key, value, size, created_at, last_access)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (key, value, len(value.encode("utf-8")), now, now),
+            )
+            self._evict(db, now)
+            db.commit()
+
+    def _evict(self, db: sqlite3.Connection, now: float):
+        if self.ttl_s:
+            db.execute("DELETE FROM adk_response_cache WHERE created_at < ?", (now - self.ttl_s,))
+        if not self.max_bytes:
+            return
+        total = db.execute("SELECT COALESCE(SUM(size), 0) FROM adk_response_cache").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # Drop least recently used entries until the cache fits again
+        excess = total - self.max_bytes
+        for key, size in db.execute(
+            "SELECT key, size FROM adk_response_cache ORDER BY last_access ASC"
+        ).fetchall():
+            db.execute("DELETE FROM adk_response_cache WHERE key = ?", (key,))
+            excess -= size
+            if excess <= 0:
+                break
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+def _normalize_content(content) -> Dict[str, Any]:
+    data = content.model_dump(mode="json", exclude_none=True)
+    # Tool call ids are random per run and would defeat the cache
+    for part in data.get("parts", []):
+        for field in ("function_call", "function_response"):
+            if field in part:
+                part[field].pop("id", None)
+        part.pop("thought_signature", None)
+    return data
+
+
+def _escaped(path: str) -> str:
+    # The path as it appears inside a JSON string
+    return json.dumps(path, ensure_ascii=False)[1:-1]
+
+
+def request_key(agent_name: str, llm_request: "LlmRequest", work_dir: Optional[str] = None) -> str:
+    config = llm_request.config.model_dump(
+        mode="json", exclude_none=True, exclude={"http_options", "labels"}
+    ) if llm_request.config else {}
+    payload = {
+        "model": llm_request.model,
+        "agent": agent_name,
+        "config": config,
+        "contents": [_normalize_content(c) for c in llm_request.contents],
+    }
+    blob = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+    if work_dir:
+        blob = blob.replace(_escaped(work_dir), WORK_DIR_PLACEHOLDER)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+def _cacheable(llm_response: "LlmResponse") -> bool:
+    if llm_response.partial or llm_response.error_code or not llm_response.content:
+        return False
+    parts = llm_response.content.parts or []
+    # Only final text answers; tool-calling turns depend on live tool results
+    return bool(parts) and all(p.text is not None and not p.function_call for p in parts)
+
+
+class ResponseCache:
+    def __init__(
+        self,
+        memory: Optional[MemoryTier] = None,
+        disk: Optional[SqliteTier] = None,
+        wait_timeout_s: float = 300.0,
+    ):
+        self.memory = memory
+        self.disk = disk
+        self.wait_timeout_s = wait_timeout_s
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._pending: Dict[Tuple[str, str], str] = {}
+        self._stats = {"hits": 0, "memoryHits": 0, "diskHits": 0, "misses": 0, "coalesced": 0, "stores": 0}
+
+    def callbacks(self) -> Dict[str, Any]:
+        """LlmAgent keyword arguments that route the agent's model calls through the cache."""
+        return {
+            "before_model_callback": self.before_model,
+            "after_model_callback": self.after_model,
+            "on_model_error_callback": self.on_model_error,
+        }
+
+    async def _lookup(self, key: str) -> Tuple[Optional[str], Optional[str]]:
+        if self.memory is not None:
+            value = self.memory.get(key)
+            if value is not None:
+                return value, "memory"
+        if self.disk is not None:
+            try:
+                value = await asyncio.to_thread(self.disk.get, key)
+            except sqlite3.Error as e:
+                print(f"Response cache read failed: {e}", file=sys.stderr, flush=True)
+                value = None
+            if value is not None:
+                if self.memory is not None:
+                    self.memory.put(key, value)
+                return value, "disk"
+        return None, None
+
+    async def _store(self, key: str, value: str):
+        self._stats["stores"] += 1
+        if self.memory is not None:
+            self.memory.put(key, value)
+        if self.disk is not None:
+            try:
+                await asyncio.to_thread(self.disk.put, key, value)
+            except sqlite3.Error as e:
+                print(f"Response cache write failed: {e}", file=sys.stderr, flush=True)
+
+    @staticmethod
+    def _replay(value: str, work_dir: Optional[str]) -> "LlmResponse":
+        from google.adk.models.llm_response import LlmResponse
+
+        if work_dir:
+            value = value.replace(WORK_DIR_PLACEHOLDER, _escaped(work_dir))
+        response = LlmResponse.model_validate_json(value)
+        # A replayed answer costs no tokens
+        response.usage_metadata = None
+        return response
+
+    async def before_model(self, callback_context: "CallbackContext", llm_request: "LlmRequest") -> Optional["LlmResponse"]:
+        agent = callback_context.agent_name
+        work_dir = callback_context.state.get("work_dir")
+        key = request_key(agent, llm_request, work_dir)
+
+        value, tier = await self._lookup(key)
+        if value is not None:
+            self._stats["hits"] += 1
+            self._stats[f"{tier}Hits"] += 1
+            emit_event("cache.hit", {"agent": agent, "tier": tier, "key": key[:12]})
+            return self._replay(value, work_dir)
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            try:
+                value = await asyncio.wait_for(asyncio.shield(inflight), self.wait_timeout_s)
+            except asyncio.TimeoutError:
+                value = None
+            if value is not None:
+                self._stats["hits"] += 1
+                self._stats["coalesced"] += 1
+                emit_event("cache.hit", {"agent": agent, "tier": "inflight", "key": key[:12]})
+                return self._replay(value, work_dir)
+            # The leader failed or got an uncacheable answer; make our own call
+
+        self._stats["misses"] += 1
+        emit_event("cache.miss", {"agent": agent, "key": key[:12]})
+        if key not in self._inflight:
+            self._inflight[key] = asyncio.get_running_loop().create_future()
+            self._pending[(callback_context.invocation_id, agent)] = key
+            led = _led_calls.get()
+            if led is not None:
+                led.add((callback_context.invocation_id, agent))
+        return None
+
+    async def after_model(self, callback_context: "CallbackContext", llm_response: "LlmResponse") -> Optional["LlmResponse"]:
+        if llm_response.partial:
+            return None
+        key = self._pending.pop((callback_context.invocation_id, callback_context.agent_name), None)
+        if key is None:
+            return None
+        value = None
+        if _cacheable(llm_response):
+            value = llm_response.model_dump_json(exclude_none=True)
+            work_dir = callback_context.state.get("work_dir")
+            if work_dir:
+                value = value.replace(_escaped(work_dir), WORK_DIR_PLACEHOLDER)
+            await self._store(key, value)
+        self._finish(key, value)
+        return None
+
+    async def on_model_error(self, callback_context: "CallbackContext", llm_request: "LlmRequest", error: Exception):
+        key = self._pending.pop((callback_context.invocation_id, callback_context.agent_name), None)
+        if key is not None:
+            self._finish(key, None)
+        return None
+
+    @contextmanager
+    def job_scope(self) -> Iterator[None]:
+        """Release the calls this job leads that are still in flight when it ends, however it ends."""
+        led: Set[Tuple[str, str]] = set()
+        token = _led_calls.set(led)
+        try:
+            yield
+        finally:
+            _led_calls.reset(token)
+            for call in led:
+                key = self._pending.pop(call, None)
+                if key is not None:
+                    # Waiters get None and make their own call
+                    self._finish(key, None)
+
+    def _finish(self, key: str, value: Optional[str]):
+        future = self._inflight.pop(key, None)
+        if future is not None and not future.done():
+            future.set_result(value)
+
+    def metrics(self) -> Dict[str, Any]:
+        lookups = self._stats["hits"] + self._stats["misses"]
+        return {
+            **self._stats,
+            "hitRate": round(self._stats["hits"] / lookups, 3) if lookups else None,
+            "memoryEntries": len(self.memory) if self.memory is not None else 0,
+        }
+
+    def close(self):
+        if self.disk is not None:
+            self.disk.close()
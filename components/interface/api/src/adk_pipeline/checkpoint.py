@@ -0,0 +1,164 @@
+# checkpoint.py — resumable pipeline runs
+# ============================================
+#
+# A run's session lives in memory, so an exception or a cancelled job used to
+# throw away the requirements, code and review already paid for, and the
+# retry started again at BusinessAnalystAgent. CheckpointedSequenceAgent runs
+# the top-level stages in order like a SequentialAgent and, after each stage
+# completes, saves the session state to CheckpointStore under the job id:
+#
+#   adk_checkpoints   job_id -> state, completed stage names, status, task
+#
+# Resuming a job (run_pipeline_async(..., resume=True)) restores that state
+# into the new session and skips the stages already completed, so the run
+# picks up at the stage that failed. The skipped stages answer nothing, so the
+# final responses collected so far are saved with the state (OUTPUTS_KEY) and
+# put back in front of the resumed run's outputs. Stages are the pipeline's top-level
+# agents; a stage that fails midway (the review loop, say) runs again whole.
+#
+# The table sits in the SQLite file Node's SQLiteStore uses (data/memory.db)
+# by default; its name is prefixed so it cannot clash with Node's tables.
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, AsyncGenerator, Dict, List, Mapping, NamedTuple, Optional
+
+from google.adk.agents import BaseAgent
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.events import Event
+
+from adk_pipeline.events import emit_event
+
+COMPLETED_KEY = "checkpoint_completed"
+JOB_ID_KEY = "job_id"
+OUTPUTS_KEY = "checkpoint_outputs"
+
+
+class Checkpoint(NamedTuple):
+    job_id: str
+    task: str
+    status: str          # "running" | "failed" | "complete"
+    completed: List[str]
+    state: Dict[str, Any]
+    updated_at: float
+
+
+def _persistable(state: Mapping[str, Any]) -> Dict[str, Any]:
+    # temp: keys are per-invocation by ADK convention
+    return {k: v for k, v in state.items() if not k.startswith("temp:")}
+
+
+def final_texts(event: Event) -> List[str]:
+    """The text of a final response; a run's outputs are these, in order."""
+    if not (event.is_final_response() and event.content and event.content.parts):
+        return []
+    return [part.text for part in event.content.parts if part.text]
+
+
+class CheckpointStore:
+    def __init__(self, path: str = "", ttl_s: float = 7 * 86400):
+        self.path = path  # empty = in-memory, for this process only
+        self.ttl_s = ttl_s
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            if self.path:
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            self._conn = sqlite3.connect(self.path or ":memory:", check_same_thread=False, timeout=5.0)
+            if self.path:
+                # Node opens the same file in WAL mode
+                self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS adk_checkpoints ("
+                " job_id TEXT PRIMARY KEY, task TEXT NOT NULL, status TEXT NOT NULL, completed TEXT NOT NULL,"
+                " state TEXT NOT NULL, updated_at REAL NOT NULL)"
+            )
+            if self.ttl_s > 0:
+                self._conn.execute("DELETE FROM adk_checkpoints WHERE updated_at < ?", (time.time() - self.ttl_s,))
+            self._conn.commit()
+        return self._conn
+
+    def save(self, job_id: str, task: str, status: str, completed: List[str], state: Mapping[str, Any]):
+        row = (
+            job_id, task, status, json.dumps(completed),
+            json.dumps(_persistable(state), default=str), time.time(),
+        )
+        with self._lock:
+            db = self._db()
+            db.execute(
+                "INSERT OR REPLACE INTO adk_checkpoints (job_id, task, status, completed, state, updated_at)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                row,
+            )
+            db.commit()
+
+    def set_status(self, job_id: str, status: str):
+        with self._lock:
+            db = self._db()
+            db.execute(
+                "UPDATE adk_checkpoints SET status = ?, updated_at = ? WHERE job_id = ?", (status, time.time(), job_id)
+            )
+            db.commit()
+
+    def load(self, job_id: str) -> Optional[Checkpoint]:
+        with self._lock:
+            row = self._db().execute(
+                "SELECT job_id, task, status, completed, state, updated_at FROM adk_checkpoints WHERE job_id = ?",
+                (job_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        job_id, task, status, completed, state, updated_at = row
+        return Checkpoint(job_id, task, status, json.loads(completed), json.loads(state), updated_at)
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+class CheckpointedSequenceAgent(BaseAgent):
+    """Runs its sub-agents in order, checkpointing the session state after each one.
+
+    Sub-agents already listed in state[COMPLETED_KEY] (restored from a
+    checkpoint) are skipped. Without a job id in state nothing is saved. The
+    stage list and the outputs so far (state[OUTPUTS_KEY]) are kept in the
+    checkpoint rather than in session state: an event of its own would read as
+    another activation of this agent in the metrics.
+    """
+
+    store: Any  # CheckpointStore
+
+    async def _run_async_impl(self, ctx: InvocationContext) -> AsyncGenerator[Event, None]:
+        state = ctx.session.state
+        job_id = state.get(JOB_ID_KEY)
+        completed = list(state.get(COMPLETED_KEY) or [])
+        outputs = list(state.get(OUTPUTS_KEY) or [])
+        for agent in self.sub_agents:
+            if agent.name in completed:
+                emit_event("agent.skip", {"agent": agent.name, "reason": "completed before the resume"})
+                continue
+            stage_outputs = []
+            async for event in agent.run_async(ctx):
+                stage_outputs.extend(final_texts(event))
+                yield event
+            if ctx.end_invocation:
+                return
+            completed.append(agent.name)
+            outputs.extend(stage_outputs)
+            if job_id:
+                started = time.monotonic()
+                saved = {**ctx.session.state, OUTPUTS_KEY: outputs}
+                self.store.save(job_id, state.get("user_request") or "", "running", completed, saved)
+                emit_event("checkpoint.saved", {
+                    "jobId": job_id,
+                    "stage": agent.name,
+                    "completed": len(completed),
+                    "ms": round((time.monotonic() - started) * 1000, 1),
+                })
@@ -0,0 +1,161 @@
+# context_pack.py — token-budgeted memory context for the prompts
+# ============================================
+#
+# Node passes the session summary, the recent messages and the project notes
+# it found for the request. All of it used to go into the BusinessAnalystAgent
+# prompt verbatim, so a long session made every run slower and dearer.
+# pack_context() keeps the most useful part within a token budget:
+#
+#   - the current request itself (Node saves it before reading the context)
+#     and repeated text are dropped
+#   - "ADK ... Artifacts at <path>" notes and messages are kept once per path,
+#     with the project's file listing from the project index
+#   - the summary gets at most a third of the budget, keeping its latest lines
+#   - messages and notes are ranked by recency plus word overlap with the
+#     request; the best fit in full, the next one may be cut to fit, the rest
+#     are dropped and counted in a one-line note
+#
+# Tokens are estimated at four characters each; the budget is a size control,
+# not an exact count. The returned report becomes a context.pack event.
+
+import re
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+CHARS_PER_TOKEN = 4
+SUMMARY_SHARE = 1 / 3
+MIN_TRUNCATED_TOKENS = 48
+HEADINGS_TOKENS = 32  # "### Context from memory", section titles, the omitted-messages line
+
+_ARTIFACTS_RE = re.compile(r"Artifacts at (\S+?)\.?(?:\s|$)")
+_WORD_RE = re.compile(r"[a-z][a-z0-9]{2,}")
+_STOP_WORDS = {
+    "the", "and", "for", "with", "that", "this", "from", "into", "make", "please", "can", "you",
+    "app", "add", "use", "are", "was", "have", "has", "not", "but", "all", "adk", "run", "stream",
+}
+
+
+def estimate_tokens(text: str) -> int:
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+
+def _words(text: str) -> set:
+    return set(_WORD_RE.findall(text.lower())) - _STOP_WORDS
+
+
+def _normalized(text: str) -> str:
+    return " ".join(text.lower().split())
+
+
+def _truncate(text: str, tokens: int, keep_tail: bool = False) -> str:
+    limit = max(0, tokens * CHARS_PER_TOKEN - 2)
+    if len(text) <= limit:
+        return text
+    return "…" + text[-limit:] if keep_tail else text[:limit] + "…"
+
+
+class _Item:
+    def __init__(self, kind: str, order: int, text: str, score: float):
+        self.kind = kind    # "message" | "note"
+        self.order = order  # position in the rendered section
+        self.text = text
+        self.score = score
+        self.kept: Optional[str] = None
+
+
+def pack_context(
+    ctx: Optional[Dict[str, Any]],
+    query: str,
+    budget_tokens: int,
+    describe_project: Optional[Callable[[str], Optional[str]]] = None,
+) -> Tuple[str, Dict[str, Any]]:
+    """The "### Context from memory" block for the prompts, and what was kept or dropped.
+
+    `describe_project(path)` returns the file listing line for a project
+    mentioned in a kept note (see project_index.ProjectIndex.describe).
+    """
+    c = (ctx or {}).get("context") or {}
+    summary = (c.get("summary") or "").strip()
+    messages = [m for m in c.get("recentMessages") or [] if (m.get("content") or "").strip()]
+    notes = [n for n in c.get("recentMemories") or [] if (n.get("text") or "").strip()]
+    query_words = _words(query)
+    unlimited = budget_tokens <= 0
+
+    def relevance(text: str) -> float:
+        return len(query_words & _words(text)) / len(query_words) if query_words else 0.0
+
+    # Notes come best match first, messages oldest first
+    items: List[_Item] = []
+    for i, note in enumerate(notes):
+        recency = 1 - i / len(notes)
+        items.append(_Item("note", i, f"- {note['text'].strip()}", 0.5 * recency + 2 * relevance(note["text"])))
+    for i, message in enumerate(messages):
+        recency = (i + 1) / len(messages)
+        text = f"- {message.get('role')}: {message['content'].strip()}"
+        items.append(_Item("message", i, text, recency + 2 * relevance(message["content"])))
+
+    seen_text = {_normalized(query)}
+    seen_paths = set()
+    duplicates = 0
+    candidates = []
+    for item in sorted(items, key=lambda it: -it.score):
+        body = item.text.split(": ", 1)[1] if item.kind == "message" else item.text[2:]
+        key = _normalized(body)
+        paths = set(_ARTIFACTS_RE.findall(body))
+        if key in seen_text or (paths and paths <= seen_paths):
+            duplicates += 1
+            continue
+        seen_text.add(key)
+        seen_paths |= paths
+        candidates.append(item)
+
+    remaining = budget_tokens - HEADINGS_TOKENS
+    sections = []
+    truncated = 0
+    if summary:
+        kept_summary = summary if unlimited else _truncate(summary, int(budget_tokens * SUMMARY_SHARE), keep_tail=True)
+        sections.append("Session summary:\n" + kept_summary)
+        remaining -= estimate_tokens(kept_summary)
+        truncated += kept_summary != summary
+    for item in candidates:
+        cost = estimate_tokens(item.text)
+        if unlimited or cost <= remaining:
+            item.kept = item.text
+        elif remaining >= MIN_TRUNCATED_TOKENS:
+            item.kept = _truncate(item.text, remaining)
+            truncated += 1
+        else:
+            continue
+        remaining -= estimate_tokens(item.kept)
+
+    kept_messages = sorted((it for it in candidates if it.kind == "message" and it.kept), key=lambda it: it.order)
+    omitted = sum(1 for it in candidates if it.kind == "message" and not it.kept)
+    if kept_messages or omitted:
+        lines = [it.kept for it in kept_messages]
+        if omitted:
+            lines.insert(0, f"- ({omitted} earlier or less relevant messages omitted)")
+        sections.append("Recent messages:\n" + "\n".join(lines))
+
+    note_lines = []
+    for item in sorted((it for it in candidates if it.kind == "note" and it.kept), key=lambda it: it.order):
+        note_lines.append(item.kept)
+        for path in _ARTIFACTS_RE.findall(item.kept) if describe_project else ():
+            listing = describe_project(path)
+            if listing and (unlimited or estimate_tokens(listing) <= remaining):
+                note_lines.append(listing)
+                remaining -= estimate_tokens(listing)
+    if note_lines:
+        sections.append("Relevant project notes:\n" + "\n".join(note_lines))
+
+    text = "\n\n### Context from memory\n" + "\n".join(sections) + "\n\n" if sections else ""
+    offered = estimate_tokens(summary) + sum(estimate_tokens(it.text) for it in items)
+    kept_tokens = estimate_tokens(text)
+    report = {
+        "budgetTokens": budget_tokens,
+        "keptTokens": kept_tokens,
+        "droppedTokens": max(0, offered - kept_tokens),
+        "messages": {"offered": len(messages), "kept": len(kept_messages)},
+        "notes": {"offered": len(notes), "kept": sum(1 for it in candidates if it.kind == "note" and it.kept)},
+        "duplicates": duplicates,
+        "truncated": truncated,
+    }
+    return text, report
@@ -0,0 +1,153 @@
+# event_channel.py — pipeline events on their own file descriptor
+# ============================================
+#
+# The one-shot CLI used to print every event as a JSON line on stderr, flushed
+# one by one and mixed with the plain-text diagnostics there, so Node had to
+# try JSON.parse on every stderr line to tell the two apart. With
+# --events-fd N the events go to an inherited descriptor instead (Node passes
+# a fourth stdio pipe) and stderr is left to logs:
+#
+#   {"seq": 1, "ts": 1760000000.123, "event": "pipeline.start", "data": {...}}\n
+#
+# One JSON object per line (NDJSON), the event's fields under "data" so they
+# cannot clash with the envelope (agent.delta has a seq of its own). seq counts
+# from 1 for the whole run, so the reader can tell a lost record from a late
+# one. Records are collected by a writer thread and written in batches: the
+# first record of a batch waits up to max_interval_s for company, a batch never
+# grows past max_batch_bytes.
+# When the reader falls behind and max_pending_bytes are waiting, emit blocks
+# until the writer catches up, so a slow consumer slows the run instead of
+# growing the buffer without bound. A closed reader (EPIPE) turns the channel
+# off; the run itself carries on.
+
+import json
+import os
+import sys
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+
+from adk_pipeline.job_input import JobInputError
+
+DEFAULT_INTERVAL_S = 0.025
+DEFAULT_BATCH_BYTES = 64 * 1024
+DEFAULT_PENDING_BYTES = 4 * 1024 * 1024
+
+
+def events_fd_from_argv(argv: List[str]) -> Optional[int]:
+    if "--events-fd" not in argv:
+        return None
+    try:
+        return int(argv[argv.index("--events-fd") + 1])
+    except (IndexError, ValueError):
+        raise JobInputError("--events-fd needs a descriptor number") from None
+
+
+class EventChannel:
+    """An event sink (see events.event_sink) writing batched NDJSON records to `fd`."""
+
+    def __init__(
+        self,
+        fd: int,
+        max_interval_s: float = DEFAULT_INTERVAL_S,
+        max_batch_bytes: int = DEFAULT_BATCH_BYTES,
+        max_pending_bytes: int = DEFAULT_PENDING_BYTES,
+    ):
+        self.fd = fd
+        self.max_interval_s = max_interval_s
+        self.max_batch_bytes = max_batch_bytes
+        self.max_pending_bytes = max_pending_bytes
+        self._cond = threading.Condition()
+        self._pending: Deque[bytes] = deque()
+        self._pending_bytes = 0
+        self._first_pending_at = 0.0
+        self._seq = 0
+        self._closed = False
+        self._broken = False
+        self.stats = {"records": 0, "batches": 0, "bytes": 0, "blockedMs": 0.0}
+        self._thread = threading.Thread(target=self._run, name="adk-event-channel", daemon=True)
+        self._thread.start()
+
+    def __call__(self, payload: Dict[str, Any]):
+        with self._cond:
+            if self._closed or self._broken:
+                return
+            self._seq += 1
+            data = dict(payload)
+            event = data.pop("event", None)
+            line = json.dumps(
+                {"seq": self._seq, "ts": round(time.time(), 3), "event": event, "data": data}, separators=(",", ":")
+            )
+            record = line.encode("utf-8") + b"\n"
+            if self._pending_bytes + len(record) > self.max_pending_bytes and self._pending:
+                started = time.monotonic()
+                self._cond.notify_all()
+                while self._pending and self._pending_bytes + len(record) > self.max_pending_bytes and not self._broken:
+                    self._cond.wait()
+                self.stats["blockedMs"] += (time.monotonic() - started) * 1000
+                if self._broken:
+                    return
+            if not self._pending:
+                self._first_pending_at = time.monotonic()
+            self._pending.append(record)
+            self._pending_bytes += len(record)
+            self.stats["records"] += 1
+            if len(self._pending) == 1 or self._pending_bytes >= self.max_batch_bytes:
+                self._cond.notify_all()
+
+    def _take_batch(self) -> Optional[bytes]:
+        # Called with the lock held; waits for a batch to be due
+        while True:
+            if self._broken or (self._closed and not self._pending):
+                return None
+            if self._pending:
+                due = self._first_pending_at + self.max_interval_s - time.monotonic()
+                if due <= 0 or self._closed or self._pending_bytes >= self.max_batch_bytes:
+                    break
+                self._cond.wait(due)
+            else:
+                self._cond.wait()
+        batch, size = [], 0
+        while self._pending and (not batch or size + len(self._pending[0]) <= self.max_batch_bytes):
+            record = self._pending.popleft()
+            batch.append(record)
+            size += len(record)
+        self._pending_bytes -= size
+        if self._pending:
+            self._first_pending_at = time.monotonic()
+        return b"".join(batch)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                data = self._take_batch()
+                if data is None:
+                    self._cond.notify_all()
+                    return
+            try:
+                view = memoryview(data)
+                while view:
+                    view = view[os.write(self.fd, view):]
+            except OSError as e:
+                with self._cond:
+                    self._broken = True
+                    self._pending.clear()
+                    self._pending_bytes = 0
+                print(f"⚠️ Event channel closed ({e}); further events are dropped", file=sys.stderr, flush=True)
+            with self._cond:
+                if not self._broken:
+                    self.stats["batches"] += 1
+                    self.stats["bytes"] += len(data)
+                self._cond.notify_all()
+
+    def close(self, timeout: float = 5.0):
+        """Flush the remaining records and close the descriptor."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join(timeout)
+        try:
+            os.close(self.fd)
+        except OSError:
+            pass
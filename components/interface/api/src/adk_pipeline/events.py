@@ -0,0 +1,81 @@
+# events.py — pipeline event emission
+# ============================================
+#
+# Every pipeline event goes through emit_event(). Where it ends up depends on
+# the active sink: the one-shot CLI writes JSON lines to stderr (what
+# agentService.js has always parsed), while worker mode installs a per-job sink
+# that tags each event with the job id and writes it to the worker channel.
+
+import json
+import sys
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict
+
+EventSink = Callable[[Dict[str, Any]], None]
+
+
+def stderr_sink(payload: Dict[str, Any]):
+    print(json.dumps(payload), file=sys.stderr, flush=True)
+
+
+_current_sink: ContextVar[EventSink] = ContextVar("adk_event_sink", default=stderr_sink)
+
+
+def emit_event(event_type: str, data: Dict[str, Any]):
+    event_data = {"event": event_type, **data}
+    _current_sink.get()(event_data)
+
+
+@contextmanager
+def event_sink(sink: EventSink):
+    """Route emit_event() calls made in this context (and tasks it spawns) to `sink`."""
+    token = _current_sink.set(sink)
+    try:
+        yield
+    finally:
+        _current_sink.reset(token)
+
+
+class DeltaCoalescer:
+    """Batches streamed model text into `agent.delta` events.
+
+    The first chunk of each agent goes out immediately (that is the latency
+    users see); after that text is held until `max_chars` accumulate or
+    `max_interval_s` passes, so a fast model does not emit one line per token.
+    Agents running in parallel interleave; `seq` counts per agent.
+    """
+
+    def __init__(self, max_chars: int = 200, max_interval_s: float = 0.1):
+        self.max_chars = max_chars
+        self.max_interval_s = max_interval_s
+        self._agent = None
+        self._buffer = []
+        self._size = 0
+        self._seq = 0
+        self._seqs: Dict[str, int] = {}
+        self._last_flush = 0.0
+
+    def add(self, agent: str, text: str):
+        if not text:
+            return
+        if agent != self._agent:
+            self.flush()
+            self._agent = agent
+            self._seq = self._seqs.get(agent, 0)
+        self._buffer.append(text)
+        self._size += len(text)
+        now = time.monotonic()
+        if self._seq == 0 or self._size >= self.max_chars or now - self._last_flush >= self.max_interval_s:
+            self.flush()
+
+    def flush(self):
+        if not self._buffer:
+            return
+        emit_event("agent.delta", {"agent": self._agent, "text": "".join(self._buffer), "seq": self._seq})
+        self._buffer = []
+        self._size = 0
+        self._seq += 1
+        self._seqs[self._agent] = self._seq
+        self._last_flush = time.monotonic()
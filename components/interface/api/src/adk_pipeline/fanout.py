@@ -0,0 +1,212 @@
+# fanout.py — parallel code generation by file group
+# ============================================
+#
+# CodeWriterAgent writes the whole project as one script, so its latency grows
+# with project size. For larger projects the "📦 Deliverables" section of the
+# analysis is split into independent file groups (frontend, backend, config,
+# docs). FanoutPlannerAgent decides whether to fan out and gives each group
+# writer its slice. The group writers run concurrently under a ParallelAgent,
+# and FanoutMergeAgent folds their scripts into a single straight-line builder
+# in generated_code. Every later stage still sees one output.py.
+#
+# Merging works on the files each script statically resolves to
+# (script.analyze_script). If a path comes from two groups with different
+# content, the group that owns the path by its classification wins and the
+# conflict is reported. When a group script cannot be resolved, nothing is
+# merged and the serial CodeWriterAgent runs instead.
+
+import posixpath
+import re
+from typing import Any, AsyncGenerator, Dict, List, Tuple
+
+from google.adk.agents import BaseAgent
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.events import Event, EventActions
+
+from adk_pipeline.events import emit_event
+from adk_pipeline.script import analyze_script, calls_scaffold, extra_dependencies, render_script, strip_code_fences
+
+GROUPS = ("frontend", "backend", "config", "docs")
+
+_DELIVERABLES_RE = re.compile(r"##[^\n]*Deliverables[^\n]*\n(.*?)(?=\n##\s|\Z)", re.DOTALL | re.IGNORECASE)
+_ITEM_RE = re.compile(r"^\s*(?:[-*+]|\d+[.)])\s+(.+?)\s*$")
+_LABEL_RE = re.compile(r"^\**(frontend|front-end|client|ui|backend|back-end|server|api|config|configuration|docs|documentation)\**\s*[:\-–]\s*", re.IGNORECASE)
+_LABELS = {
+    "frontend": "frontend", "front-end": "frontend", "client": "frontend", "ui": "frontend",
+    "backend": "backend", "back-end": "backend", "server": "backend", "api": "backend",
+    "config": "config", "configuration": "config",
+    "docs": "docs", "documentation": "docs",
+}
+
+_DOC_RE = re.compile(r"(^|/)(docs?/|readme|license|changelog|contributing)|\.(md|rst|txt)$", re.IGNORECASE)
+_CONFIG_RE = re.compile(
+    r"(^|/)(package\.json|package-lock\.json|tsconfig[^/]*\.json|requirements[^/]*\.txt|pyproject\.toml|setup\.(py|cfg)"
+    r"|dockerfile|docker-compose[^/]*|\.gitignore|\.env[^/]*|\.eslintrc[^/]*|\.prettierrc[^/]*|makefile)$"
+    r"|\.config\.[cm]?[jt]s$|\.(ya?ml|toml|ini)$",
+    re.IGNORECASE,
+)
+_BACKEND_RE = re.compile(
+    r"(^|/)(server|backend|api|routes|controllers|middleware|models|services|db|migrations)(/|$)|\.py$",
+    re.IGNORECASE,
+)
+
+
+def classify(path: str) -> str:
+    """Group a deliverable path by its name; ambiguous files count as frontend."""
+    path = path.strip().strip("`").lstrip("./")
+    for group, pattern in (("config", _CONFIG_RE), ("docs", _DOC_RE), ("backend", _BACKEND_RE)):
+        if pattern.search(path):
+            return group
+    return "frontend"
+
+
+def parse_deliverables(analysis: str) -> Dict[str, List[str]]:
+    """Deliverable items of the analysis by group, in the order they were listed."""
+    match = _DELIVERABLES_RE.search(analysis or "")
+    groups: Dict[str, List[str]] = {}
+    if not match:
+        return groups
+    for line in match.group(1).splitlines():
+        item = _ITEM_RE.match(line)
+        if not item:
+            continue
+        text = item.group(1)
+        label = _LABEL_RE.match(text)
+        if label:
+            group = _LABELS[label.group(1).lower()]
+            text = text[label.end():]
+        else:
+            # The first path-like token decides, e.g. "`src/App.jsx` - root component"
+            token = next((t.strip("`*,") for t in text.split() if "/" in t or "." in t), text)
+            group = classify(token)
+        groups.setdefault(group, []).append(text.strip())
+    return groups
+
+
+def project_slug(text: str) -> str:
+    words = re.findall(r"[a-z0-9]+", (text or "").lower())
+    stop = {"a", "an", "the", "build", "create", "make", "me", "please", "with", "and", "for", "of", "app", "application"}
+    slug = "-".join([w for w in words if w not in stop][:3])
+    return f"{slug}-app" if slug else "generated-app"
+
+
+class FanoutPlannerAgent(BaseAgent):
+    """Runs after BusinessAnalystAgent; sets fanout_active and one brief per group."""
+
+    mode: str = "auto"  # "auto" | "always" | "never"
+    min_files: int = 8
+    analysis_key: str = "requirements_analysis"
+
+    async def _run_async_impl(self, ctx: InvocationContext) -> AsyncGenerator[Event, None]:
+        state = ctx.session.state
+        groups = parse_deliverables(state.get(self.analysis_key) or "")
+        files = sum(len(items) for items in groups.values())
+        if self.mode == "never":
+            reason = "disabled"
+        elif len(groups) < 2:
+            reason = "fewer than two file groups"
+        elif self.mode == "auto" and files < self.min_files:
+            reason = f"fewer than {self.min_files} deliverables"
+        else:
+            reason = ""
+        active = not reason
+
+        delta: Dict[str, Any] = {
+            "fanout_active": active,
+            "fanout_project_name": project_slug(state.get("user_request") or ""),
+        }
+        for group in GROUPS:
+            items = groups.get(group) if active else None
+            delta[f"fanout_{group}"] = "\n".join(f"- {item}" for item in items) if items else ""
+        emit_event("fanout.plan", {
+            "active": active,
+            "reason": reason or None,
+            "groups": {group: len(items) for group, items in groups.items()},
+        })
+        yield Event(
+            author=self.name,
+            invocation_id=ctx.invocation_id,
+            branch=ctx.branch,
+            actions=EventActions(state_delta=delta),
+        )
+
+
+class GroupScript:
+    def __init__(self, group: str, source: str):
+        self.group = group
+        self.analysis = analyze_script(source)
+        self.files: Dict[str, str] = {}
+        project_path = self.analysis.project_path
+        if project_path and self.analysis.complete:
+            for path, content in self.analysis.files().items():
+                relative = posixpath.relpath(path, project_path)
+                if not relative.startswith(".."):
+                    self.files[relative] = content
+
+    @property
+    def usable(self) -> bool:
+        return bool(self.files) and len(self.files) == len(self.analysis.files())
+
+
+def merge_groups(scripts: List[GroupScript]) -> Tuple[Dict[str, str], List[Dict[str, Any]]]:
+    """Relative path -> content across groups, plus the conflicts that were resolved."""
+    merged: Dict[str, str] = {}
+    owners: Dict[str, List[str]] = {}
+    for script in scripts:
+        for path, content in script.files.items():
+            owners.setdefault(path, []).append(script.group)
+    conflicts = []
+    by_group = {script.group: script for script in scripts}
+    for path, groups in owners.items():
+        contents = {by_group[g].files[path] for g in groups}
+        if len(contents) == 1:
+            merged[path] = by_group[groups[0]].files[path]
+            continue
+        owner = classify(path)
+        kept = owner if owner in groups else groups[0]
+        merged[path] = by_group[kept].files[path]
+        conflicts.append({"path": path, "groups": groups, "kept": kept})
+    return merged, conflicts
+
+
+class FanoutMergeAgent(BaseAgent):
+    """Runs after the parallel group writers; merges their scripts into generated_code."""
+
+    source_prefix: str = "fanout_code_"
+    code_key: str = "generated_code"
+
+    async def _run_async_impl(self, ctx: InvocationContext) -> AsyncGenerator[Event, None]:
+        state = ctx.session.state
+        scripts = [
+            GroupScript(group, strip_code_fences(state.get(f"{self.source_prefix}{group}") or ""))
+            for group in GROUPS if state.get(f"fanout_{group}")
+        ]
+        unusable = [s.group for s in scripts if not s.usable]
+        delta: Dict[str, Any] = {}
+        if scripts and not unusable:
+            files, conflicts = merge_groups(scripts)
+            extras: Dict[str, Dict[str, str]] = {}
+            for script in scripts:
+                for name, values in extra_dependencies(script.analysis.tree).items():
+                    extras.setdefault(name, {}).update(values)
+            delta[self.code_key] = render_script(
+                scripts[0].analysis.project_path,
+                files,
+                extras,
+                scaffold=any(calls_scaffold(s.analysis.tree) for s in scripts),
+            )
+            emit_event("fanout.merge", {
+                "merged": True,
+                "groups": {s.group: len(s.files) for s in scripts},
+                "files": len(files),
+                "conflicts": conflicts,
+            })
+        else:
+            # Leave generated_code unset so the serial CodeWriterAgent runs
+            emit_event("fanout.merge", {"merged": False, "unresolved": unusable})
+        yield Event(
+            author=self.name,
+            invocation_id=ctx.invocation_id,
+            branch=ctx.branch,
+            actions=EventActions(state_delta=delta),
+        )
@@ -0,0 +1,77 @@
+# file_saver.py — deterministic save stage (no LLM round trip)
+# ============================================
+#
+# The old FileSaverAgent was an LlmAgent whose prompt and reply both carried the
+# whole script just to call write_file once. This stage copies
+# state["refactored_code"] to disk itself and reports through the same
+# `save_status` key and the same write_file tool call/response events.
+#
+# With `work_dir_key` set, the script goes to output.py in the job's own work
+# directory from session state; `script_path` is the fallback.
+
+import os
+import uuid
+from typing import AsyncGenerator, Optional
+
+from google.adk.agents import BaseAgent
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.events import Event, EventActions
+from google.genai import types as genai_types
+
+from adk_pipeline.script import strip_code_fences, write_atomic
+
+
+class FileSaverAgent(BaseAgent):
+    script_path: str
+    source_key: str = "refactored_code"
+    output_key: str = "save_status"
+    work_dir_key: Optional[str] = None
+
+    async def _run_async_impl(self, ctx: InvocationContext) -> AsyncGenerator[Event, None]:
+        state = ctx.session.state
+        work_dir = state.get(self.work_dir_key) if self.work_dir_key else None
+        script_path = os.path.join(work_dir, "output.py") if work_dir else self.script_path
+        code = strip_code_fences(state.get(self.source_key) or state.get("generated_code") or "")
+        call_id = f"adk-{uuid.uuid4().hex[:12]}"
+
+        yield Event(
+            author=self.name,
+            invocation_id=ctx.invocation_id,
+            branch=ctx.branch,
+            content=genai_types.Content(role="model", parts=[
+                genai_types.Part(function_call=genai_types.FunctionCall(
+                    id=call_id, name="write_file", args={"path": script_path},
+                )),
+            ]),
+        )
+
+        if not code.strip():
+            status = "✗ Error saving file: no code was generated"
+            result = {"error": status}
+        else:
+            try:
+                write_atomic(script_path, code)
+                status = f"✓ Successfully saved output.py to {os.path.dirname(script_path)}"
+                result = {"result": f"Wrote {len(code.encode('utf-8'))} bytes to {script_path}"}
+            except OSError as e:
+                status = f"✗ Error saving file: {e}"
+                result = {"error": str(e)}
+
+        yield Event(
+            author=self.name,
+            invocation_id=ctx.invocation_id,
+            branch=ctx.branch,
+            content=genai_types.Content(role="user", parts=[
+                genai_types.Part(function_response=genai_types.FunctionResponse(
+                    id=call_id, name="write_file", response=result,
+                )),
+            ]),
+        )
+
+        yield Event(
+            author=self.name,
+            invocation_id=ctx.invocation_id,
+            branch=ctx.branch,
+            content=genai_types.Content(role="model", parts=[genai_types.Part(text=status)]),
+            actions=EventActions(state_delta={self.output_key: status}),
+        )
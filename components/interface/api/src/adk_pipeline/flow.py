@@ -0,0 +1,110 @@
+# flow.py — control-flow building blocks for the agent graph
+# ============================================
+#
+# The graph's short-circuits are declared where it is built (build_pipeline):
+#
+#   ConditionalAgent   an edge that runs its sub-agent only when a condition on
+#                      session state holds; on_skip can fill in the state the
+#                      skipped stage would have produced
+#   EarlyStopLlm       ends a streamed model answer once stop_when(text so far)
+#                      holds, e.g. as soon as a reviewer's verdict is known
+#
+# run_pipeline_async only runs the graph; adding a short-circuit is a change to
+# build_pipeline alone.
+
+from contextlib import aclosing
+from typing import Any, AsyncGenerator, Callable, Dict, Mapping, Optional
+
+from google.adk.agents import BaseAgent
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.events import Event, EventActions
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.genai import types as genai_types
+
+from adk_pipeline.events import emit_event
+
+
+class ConditionalAgent(BaseAgent):
+    """Runs its single sub-agent only when `condition(state)` holds.
+
+    A before_agent_callback that returns content would end the whole
+    invocation, so stages that may be skipped are wrapped in this instead.
+    When skipped, `on_skip(state)` may return a state delta standing in for
+    the sub-agent's output.
+    """
+
+    condition: Callable[[Mapping[str, Any]], bool]
+    skip_reason: str = ""
+    on_skip: Optional[Callable[[Mapping[str, Any]], Dict[str, Any]]] = None
+
+    async def _run_async_impl(self, ctx: InvocationContext) -> AsyncGenerator[Event, None]:
+        agent = self.sub_agents[0]
+        state = ctx.session.state
+        if not self.condition(state):
+            delta = self.on_skip(state) if self.on_skip else None
+            emit_event("agent.skip", {
+                "agent": agent.name,
+                "reason": self.skip_reason,
+                **({"promoted": sorted(delta)} if delta else {}),
+            })
+            if delta:
+                yield Event(
+                    author=self.name,
+                    invocation_id=ctx.invocation_id,
+                    branch=ctx.branch,
+                    actions=EventActions(state_delta=delta),
+                )
+            return
+        async for event in agent.run_async(ctx):
+            yield event
+
+
+class EarlyStopLlm(BaseLlm):
+    """Wraps an agent's model and ends its streamed answer once `stop_when(text)` holds.
+
+    The chunks seen so far are passed on and followed by the final response
+    ADK expects, holding the text up to that point; the underlying stream is
+    closed, so the model stops generating. Chunks carrying anything but text
+    (function calls) never stop the stream. Without streaming there is nothing
+    to cut short and responses pass through unchanged.
+    """
+
+    inner: Any  # BaseLlm
+    agent: str
+    stop_when: Callable[[str], bool]
+
+    @property
+    def capabilities(self):
+        return self.inner.capabilities
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        chunks = []
+        usage = None
+        async with aclosing(self.inner.generate_content_async(llm_request, stream=stream)) as responses:
+            async for response in responses:
+                yield response
+                usage = response.usage_metadata or usage
+                parts = response.content.parts if response.partial and response.content else None
+                if not parts or any(p.text is None for p in parts):
+                    continue
+                chunks.extend(p.text for p in parts if not p.thought)
+                text = "".join(chunks)
+                if self.stop_when(text):
+                    emit_event("agent.early_stop", {"agent": self.agent, "chars": len(text)})
+                    yield LlmResponse(
+                        content=genai_types.Content(role="model", parts=[genai_types.Part(text=text)]),
+                        partial=False,
+                        finish_reason=genai_types.FinishReason.STOP,
+                        usage_metadata=usage,
+                        custom_metadata=response.custom_metadata,
+                    )
+                    return
+
+
+def early_stop(llm: Any, agent: str, stop_when: Callable[[str], bool]) -> Any:
+    """`llm` (an LlmAgent model) wrapped in an EarlyStopLlm; None stays None."""
+    return EarlyStopLlm(model=llm.model, inner=llm, agent=agent, stop_when=stop_when) if llm is not None else None
@@ -0,0 +1,134 @@
+# job_input.py — how a one-shot CLI run receives its task and context
+# ============================================
+#
+# Node used to pass the task in argv and the chat context as JSON in the
+# ADK_CONTEXT environment variable. The kernel caps both (ARG_MAX for argv
+# plus environment, MAX_ARG_STRLEN = 128 KiB for any single string), so long
+# sessions failed to spawn, and the environment is copied again into every
+# child process, MCP servers included. A job can now arrive out of band as one
+# JSON document, the same shape as a worker job:
+#
+#   {"task": "...", "context": {...}, "refineFrom": "/path/to/project"}
+#
+#   --input -        read it from stdin
+#   --input PATH     read it from a file (removed afterwards with --input-delete)
+#   --input-fd N     read it from an inherited file descriptor
+#
+# The document is decoded chunk by chunk and reading stops at the end of the
+# first complete value, so the writer does not have to close its end of a pipe.
+# Without any of these flags the task comes from argv and the context from
+# ADK_CONTEXT, as before.
+
+import codecs
+import json
+import os
+import sys
+from typing import Any, BinaryIO, Dict, List, NamedTuple, Optional, Tuple
+
+DEFAULT_TASK = "Help me create something new"
+CHUNK_SIZE = 64 * 1024
+# Flags of the CLI that take a value, which is not the task
+_VALUE_FLAGS = ("--input", "--input-fd", "--events-fd")
+
+
+class JobInputError(ValueError):
+    pass
+
+
+class JobInput(NamedTuple):
+    job: Dict[str, Any]
+    source: str   # "stdin" | "file" | "fd" | "argv"
+    bytes: int
+
+
+def read_json_document(stream: BinaryIO, chunk_size: int = CHUNK_SIZE) -> Any:
+    """Decode the first JSON value on `stream` without waiting for EOF after it."""
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    parser = json.JSONDecoder()
+    parts: List[str] = []
+    last = ""
+    while True:
+        chunk = stream.read(chunk_size)
+        text = decoder.decode(chunk or b"", final=not chunk)
+        if text:
+            parts.append(text)
+            last = text.rstrip()[-1:] or last
+        # A complete object or array can only end in a closing bracket; other
+        # chunk boundaries are not worth a parse attempt
+        if chunk and last not in ("}", "]"):
+            continue
+        buffer = "".join(parts).lstrip()
+        parts = [buffer]
+        try:
+            value, _ = parser.raw_decode(buffer)
+            return value
+        except ValueError as e:
+            if not chunk:
+                raise JobInputError(f"job input is not valid JSON: {e}") from None
+
+
+class _CountingReader:
+    def __init__(self, stream: BinaryIO):
+        self.stream = stream
+        self.count = 0
+
+    def read(self, size: int) -> bytes:
+        data = self.stream.read(size)
+        self.count += len(data or b"")
+        return data
+
+
+def _open_input(argv: List[str]) -> Optional[Tuple[BinaryIO, str, Optional[str]]]:
+    # Unbuffered readers: a buffered read(n) would block until n bytes or EOF
+    if "--input-fd" in argv:
+        fd = int(argv[argv.index("--input-fd") + 1])
+        return os.fdopen(fd, "rb", buffering=0), "fd", None
+    if "--input" in argv:
+        target = argv[argv.index("--input") + 1]
+        if target == "-":
+            return os.fdopen(sys.stdin.fileno(), "rb", buffering=0, closefd=False), "stdin", None
+        return open(target, "rb", buffering=0), "file", target
+    return None
+
+
+def _env_context() -> Optional[Dict[str, Any]]:
+    ctx_raw = os.getenv("ADK_CONTEXT", "")
+    if not ctx_raw:
+        return None
+    try:
+        return json.loads(ctx_raw)
+    except ValueError as e:
+        print(f"Error parsing ADK_CONTEXT: {e}", file=sys.stderr)
+        return None
+
+
+def read_job_input(argv: List[str], task: Optional[str] = None) -> JobInput:
+    """The job for this run, from the out-of-band input if one was given, else argv/ADK_CONTEXT."""
+    try:
+        opened = _open_input(argv)
+    except (IndexError, ValueError):
+        raise JobInputError("--input needs a path or '-', --input-fd a descriptor number") from None
+    except OSError as e:
+        raise JobInputError(f"cannot open job input: {e}") from None
+
+    if opened is None:
+        flag_values = {i + 1 for i, a in enumerate(argv) if a in _VALUE_FLAGS}
+        positional = [a for i, a in enumerate(argv) if not a.startswith("--") and i not in flag_values]
+        task = task or (positional[0] if positional else DEFAULT_TASK)
+        size = len(task.encode("utf-8")) + len(os.getenv("ADK_CONTEXT", "").encode("utf-8"))
+        return JobInput({"task": task, "context": _env_context()}, "argv", size)
+
+    stream, source, path = opened
+    counter = _CountingReader(stream)
+    try:
+        job = read_json_document(counter)
+    finally:
+        stream.close()
+        if path and "--input-delete" in argv:
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+    if not isinstance(job, dict) or not isinstance(job.get("task"), str):
+        raise JobInputError('job input must be an object with a "task" string')
+    return JobInput(job, source, counter.count)
@@ -0,0 +1,243 @@
+# materialize.py — write the generated project without running output.py
+# ============================================
+#
+# The project used to reach disk only when Node ran output.py: LLM-written
+# code creating one file at a time, rewriting every file even when nothing
+# changed and leaving a half-built tree behind when it failed midway.
+# MaterializeAgent recovers the files from the final script instead
+# (script.project_files, the same static analysis the validator uses) and
+# writes them in one go:
+#
+#   - files whose sha256 matches what is on disk are skipped (hashes come from
+#     the project index, re-hashing only files whose size or mtime changed)
+#   - the rest are written by a thread pool, in batches, into a staging
+#     directory next to the project
+#   - a new project is the staging directory renamed into place; an existing
+#     one gets its other files hard-linked into staging and heavy directories
+#     (node_modules, .git, ...) moved over, then the two trees swap by rename
+#
+# Scripts that do more than create files and directories (commands, deletes,
+# renames) or whose files cannot all be recovered are left alone, and Node
+# runs output.py as before; the complete event says which happened.
+
+import asyncio
+import hashlib
+import os
+import posixpath
+import shutil
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncGenerator, Dict, Iterable, List, Optional, Set, Tuple
+
+from google.adk.agents import BaseAgent
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.events import Event, EventActions
+
+from adk_pipeline.events import emit_event
+from adk_pipeline.refine import SKIP_DIRS, build_manifest
+from adk_pipeline.script import ScriptAnalysis, analyze_script, project_files, strip_code_fences
+
+# Calls that do more than create files and directories; output.py has to run for those
+_SIDE_EFFECT_MODULES = ("subprocess.", "shutil.")
+_SIDE_EFFECT_CALLS = {
+    "os.system", "os.popen", "os.remove", "os.unlink", "os.rmdir", "os.rename", "os.replace",
+    "os.symlink", "os.link", "os.chmod", "os.chdir", "eval", "exec",
+}
+_MAX_BATCHES_PER_WORKER = 4
+
+
+def _inside(path: str, root: str) -> bool:
+    root = posixpath.normpath(root)
+    return posixpath.isabs(path) and posixpath.commonpath([posixpath.normpath(path), root]) == root
+
+
+def recover_project(analysis: ScriptAnalysis, work_dir: str) -> Tuple[Optional[Tuple[str, Dict[str, str], Set[str]]], str]:
+    """(project root, relative path -> content, empty directories) for a script that only creates files.
+
+    Returns (None, reason) when the script cannot be materialized without running it.
+    """
+    files = project_files(analysis)
+    if files is None:
+        return None, "files could not all be recovered statically"
+    root = analysis.project_path
+    if not _inside(root, work_dir) or posixpath.normpath(root) == posixpath.normpath(work_dir):
+        return None, f"project path {root} is not a folder inside {work_dir}"
+    for name, _ in analysis.calls:
+        if name in _SIDE_EFFECT_CALLS or name.startswith(_SIDE_EFFECT_MODULES):
+            return None, f"the script calls {name}"
+    dirs = set()
+    for op in analysis.ops:
+        if op.kind in ("makedirs", "mkdir") and op.path and _inside(op.path, root):
+            relative = posixpath.relpath(posixpath.normpath(op.path), posixpath.normpath(root))
+            if relative != ".":
+                dirs.add(relative)
+    return (root, files, dirs), ""
+
+
+def _batches(items: List[Any], count: int) -> Iterable[List[Any]]:
+    size = max(1, -(-len(items) // max(1, count)))
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def _write_batch(staging: str, batch: List[Tuple[str, bytes]]):
+    for relative, data in batch:
+        with open(os.path.join(staging, relative), "wb") as f:
+            f.write(data)
+
+
+def _mirror(root: str, staging: str, replaced: Set[str], moved: List[Tuple[str, str]]):
+    """Hard-link the files of `root` that are not replaced into `staging`; list heavy directories to move."""
+    for dirpath, dirnames, filenames in os.walk(root):
+        relative_dir = os.path.relpath(dirpath, root)
+        relative_dir = "" if relative_dir == "." else relative_dir.replace(os.sep, "/")
+        keep = []
+        for name in dirnames:
+            relative = posixpath.join(relative_dir, name) if relative_dir else name
+            source = os.path.join(dirpath, name)
+            if os.path.islink(source):
+                os.symlink(os.readlink(source), os.path.join(staging, relative))
+            elif name in SKIP_DIRS and not any(p.startswith(relative + "/") for p in replaced):
+                moved.append((source, os.path.join(staging, relative)))
+            else:
+                os.makedirs(os.path.join(staging, relative), exist_ok=True)
+                keep.append(name)
+        dirnames[:] = keep
+        for name in filenames:
+            relative = posixpath.join(relative_dir, name) if relative_dir else name
+            if relative in replaced:
+                continue
+            source, target = os.path.join(dirpath, name), os.path.join(staging, relative)
+            if os.path.islink(source):
+                os.symlink(os.readlink(source), target)
+                continue
+            try:
+                os.link(source, target)
+            except OSError:
+                shutil.copy2(source, target)
+
+
+def materialize(
+    root: str,
+    files: Dict[str, str],
+    dirs: Iterable[str] = (),
+    index: Any = None,
+    workers: int = 8,
+) -> Dict[str, Any]:
+    """Write `files` (relative path -> content) under `root` through a staging directory.
+
+    `index` is the ProjectIndex whose manifest tells which files are unchanged;
+    it is refreshed afterwards.
+    """
+    started = time.monotonic()
+    root = os.path.abspath(root)
+    dirs = set(dirs)
+    encoded = {path: content.encode("utf-8") for path, content in files.items()}
+    existed = os.path.isdir(root)
+    on_disk = build_manifest(root, index.manifest(root) if index else None)[0] if existed else {}
+
+    changed = {}
+    skipped_bytes = 0
+    for path, data in encoded.items():
+        entry = on_disk.get(path)
+        if entry and entry["bytes"] == len(data) and entry["sha256"] == hashlib.sha256(data).hexdigest():
+            skipped_bytes += len(data)
+        else:
+            changed[path] = data
+    missing_dirs = [d for d in dirs if not os.path.isdir(os.path.join(root, d))]
+
+    report = {
+        "root": root,
+        "files": len(encoded),
+        "written": len(changed),
+        "skipped": len(encoded) - len(changed),
+        "bytesWritten": sum(len(d) for d in changed.values()),
+        "bytesSkipped": skipped_bytes,
+        "mode": "unchanged",
+    }
+    if not changed and not missing_dirs:
+        report["ms"] = round((time.monotonic() - started) * 1000, 1)
+        return report
+
+    parent = os.path.dirname(root)
+    os.makedirs(parent, exist_ok=True)
+    # os.mkdir rather than mkdtemp: the staging directory becomes the project, with the usual mode
+    staging = os.path.join(parent, f".{os.path.basename(root)}.staging-{uuid.uuid4().hex[:12]}")
+    os.mkdir(staging)
+    moved: List[Tuple[str, str]] = []
+    try:
+        if existed:
+            shutil.copymode(root, staging)
+            _mirror(root, staging, set(changed), moved)
+        for directory in {posixpath.dirname(p) for p in changed} | dirs:
+            if directory:
+                os.makedirs(os.path.join(staging, directory), exist_ok=True)
+        items = sorted(changed.items())
+        batches = list(_batches(items, workers * _MAX_BATCHES_PER_WORKER))
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, len(batches)))) as pool:
+            for future in [pool.submit(_write_batch, staging, batch) for batch in batches]:
+                future.result()
+
+        if existed:
+            for source, target in moved:
+                os.rename(source, target)
+            backup = staging + ".old"
+            os.rename(root, backup)
+            try:
+                os.rename(staging, root)
+            except OSError:
+                os.rename(backup, root)
+                raise
+            shutil.rmtree(backup, ignore_errors=True)
+            report["mode"] = "swap"
+        else:
+            os.rename(staging, root)
+            report["mode"] = "new"
+    except BaseException:
+        # Put moved directories back before dropping the staging tree
+        for source, target in moved:
+            if os.path.exists(target) and not os.path.exists(source):
+                os.rename(target, source)
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+    if index is not None:
+        index.refresh(root)
+    report["ms"] = round((time.monotonic() - started) * 1000, 1)
+    return report
+
+
+class MaterializeAgent(BaseAgent):
+    """Writes the final script's files into the job's work directory; sets `output_key` to the report or None."""
+
+    index: Any = None  # ProjectIndex
+    workers: int = 8
+    source_key: str = "refactored_code"
+    work_dir_key: str = "work_dir"
+    output_key: str = "materialized"
+
+    async def _run_async_impl(self, ctx: InvocationContext) -> AsyncGenerator[Event, None]:
+        state = ctx.session.state
+        code = strip_code_fences(state.get(self.source_key) or state.get("generated_code") or "")
+        work_dir = os.path.abspath(state.get(self.work_dir_key) or "")
+        recovered, reason = recover_project(analyze_script(code), work_dir)
+
+        report = None
+        if recovered is not None:
+            root, files, dirs = recovered
+            try:
+                report = await asyncio.to_thread(materialize, root, files, dirs, self.index, self.workers)
+            except OSError as e:
+                reason = f"writing the project failed: {e}"
+        if report is not None:
+            emit_event("project.materialize", report)
+        else:
+            emit_event("project.materialize", {"mode": None, "reason": reason})
+
+        yield Event(
+            author=self.name,
+            invocation_id=ctx.invocation_id,
+            branch=ctx.branch,
+            actions=EventActions(state_delta={self.output_key: report}),
+        )
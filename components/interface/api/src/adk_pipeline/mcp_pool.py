@@ -0,0 +1,264 @@
+# mcp_pool.py — pooled, lifecycle-managed MCP toolsets
+# ============================================
+#
+# Starting an MCP server over stdio means booting a Node child process (plus
+# npm resolution when launched through npx). The pool keeps a few connected
+# McpToolset instances warm, hands one to each pipeline run for its lifetime,
+# evicts connections that sit idle, and closes everything on shutdown so no
+# server child outlives the run that started it.
+#
+# Agents do not hold a connection themselves: they get a PooledMcpToolset,
+# which checks a connection out on first use inside a `lease()` scope and gives
+# it back when the scope exits.
+
+import asyncio
+import sys
+import time
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Set
+
+from google.adk.agents.readonly_context import ReadonlyContext
+from google.adk.tools.base_tool import BaseTool
+from google.adk.tools.base_toolset import BaseToolset
+
+if TYPE_CHECKING:
+    # The MCP client stack is only loaded once the factory opens a connection
+    from google.adk.tools.mcp_tool.mcp_toolset import McpToolset
+
+
+class _Connection:
+    def __init__(self, toolset: "McpToolset", connect_ms: float):
+        self.toolset = toolset
+        self.connect_ms = connect_ms
+        self.last_used = time.monotonic()
+
+
+class McpToolsetPool:
+    def __init__(
+        self,
+        factory: Callable[[], "McpToolset"],
+        max_size: int = 4,
+        idle_ttl_s: float = 300.0,
+    ):
+        self.factory = factory
+        self.max_size = max_size
+        self.idle_ttl_s = idle_ttl_s
+        self._idle: List[_Connection] = []
+        self._in_use: Dict[int, _Connection] = {}
+        self._cond: Optional[asyncio.Condition] = None
+        self._reaper: Optional[asyncio.Task] = None
+        self._closing: Set[asyncio.Task] = set()
+        self._closed = False
+        self._stats = {
+            "connects": 0,
+            "connectFailures": 0,
+            "connectMsTotal": 0.0,
+            "connectMsLast": None,
+            "checkouts": 0,
+            "evicted": 0,
+            "discarded": 0,
+            "leaked": 0,
+        }
+
+    @property
+    def _condition(self) -> asyncio.Condition:
+        # Created lazily so the pool can be built before an event loop exists
+        if self._cond is None:
+            self._cond = asyncio.Condition()
+        return self._cond
+
+    async def _connect(self) -> _Connection:
+        toolset = self.factory()
+        start = time.monotonic()
+        try:
+            # Listing tools forces the stdio server to start and the MCP session to open
+            await toolset.get_tools()
+        except Exception:
+            self._stats["connectFailures"] += 1
+            await self._close(toolset)
+            raise
+        connect_ms = (time.monotonic() - start) * 1000
+        self._stats["connects"] += 1
+        self._stats["connectMsTotal"] += connect_ms
+        self._stats["connectMsLast"] = round(connect_ms, 1)
+        return _Connection(toolset, connect_ms)
+
+    async def prewarm(self, count: int = 1):
+        for _ in range(max(0, min(count, self.max_size) - self.live)):
+            try:
+                conn = await self._connect()
+            except Exception as e:
+                print(f"MCP prewarm failed: {e}", file=sys.stderr, flush=True)
+                return
+            async with self._condition:
+                self._idle.append(conn)
+                self._condition.notify()
+        self._ensure_reaper()
+
+    async def checkout(self) -> "McpToolset":
+        if self._closed:
+            raise RuntimeError("MCP toolset pool is shut down")
+        self._ensure_reaper()
+        async with self._condition:
+            while not self._idle and self.live >= self.max_size:
+                await self._condition.wait()
+            conn = self._idle.pop() if self._idle else None
+            if conn is None:
+                # Reserve the slot while connecting so concurrent checkouts respect max_size
+                placeholder = _Connection(None, 0.0)
+                self._in_use[id(placeholder)] = placeholder
+        if conn is None:
+            try:
+                conn = await self._connect()
+            finally:
+                async with self._condition:
+                    self._in_use.pop(id(placeholder), None)
+                    self._condition.notify()
+        async with self._condition:
+            self._in_use[id(conn.toolset)] = conn
+        self._stats["checkouts"] += 1
+        return conn.toolset
+
+    async def release(self, toolset: "McpToolset", healthy: bool = True):
+        async with self._condition:
+            conn = self._in_use.pop(id(toolset), None)
+            if conn is not None and healthy and not self._closed:
+                conn.last_used = time.monotonic()
+                self._idle.append(conn)
+                self._condition.notify()
+                return
+            self._condition.notify()
+        # Connections from a failed run may be wedged mid-call; never hand them out again
+        self._stats["discarded"] += 1
+        await self._close(toolset)
+
+    def record_leak(self):
+        self._stats["leaked"] += 1
+
+    async def evict_idle(self):
+        now = time.monotonic()
+        async with self._condition:
+            stale = [c for c in self._idle if now - c.last_used > self.idle_ttl_s]
+            self._idle = [c for c in self._idle if c not in stale]
+        for conn in stale:
+            self._stats["evicted"] += 1
+            await self._close(conn.toolset)
+
+    async def shutdown(self):
+        self._closed = True
+        if self._reaper:
+            self._reaper.cancel()
+            self._reaper = None
+        async with self._condition:
+            idle, self._idle = self._idle, []
+            in_use = [c for c in self._in_use.values() if c.toolset is not None]
+            self._in_use = {}
+        if in_use:
+            self._stats["leaked"] += len(in_use)
+        for conn in idle + in_use:
+            await self._close(conn.toolset)
+        # Closes whose caller was cancelled keep running detached; let them finish
+        if self._closing:
+            await asyncio.gather(*list(self._closing), return_exceptions=True)
+
+    @property
+    def live(self) -> int:
+        return len(self._idle) + len(self._in_use)
+
+    def metrics(self) -> Dict[str, Any]:
+        connects = self._stats["connects"]
+        return {
+            "live": self.live,
+            "idle": len(self._idle),
+            "inUse": len(self._in_use),
+            "connectMsAvg": round(self._stats["connectMsTotal"] / connects, 1) if connects else None,
+            **{k: v for k, v in self._stats.items() if k != "connectMsTotal"},
+        }
+
+    def _ensure_reaper(self):
+        if self._reaper is None and self.idle_ttl_s > 0:
+            self._reaper = asyncio.ensure_future(self._reap_loop())
+
+    async def _reap_loop(self):
+        while True:
+            await asyncio.sleep(max(self.idle_ttl_s / 2, 1.0))
+            await self.evict_idle()
+
+    async def _close(self, toolset: Optional["McpToolset"]):
+        if toolset is None:
+            return
+        # The stdio teardown runs in its own task: a cancellation it raises stays
+        # there instead of landing in the job that released the connection, and a
+        # real cancel of the caller does not cut the teardown short
+        task = asyncio.ensure_future(self._teardown(toolset))
+        self._closing.add(task)
+        task.add_done_callback(self._closing.discard)
+        await asyncio.shield(task)
+
+    async def _teardown(self, toolset: "McpToolset"):
+        try:
+            await toolset.close()
+        except asyncio.CancelledError:
+            print("MCP toolset close was cancelled by its own teardown", file=sys.stderr, flush=True)
+        except Exception as e:
+            # stdio teardown from a different task than the one that opened it can complain
+            print(f"MCP toolset close error: {e}", file=sys.stderr, flush=True)
+
+
+class Lease:
+    """Connections borrowed by one pipeline run."""
+
+    def __init__(self):
+        self.toolsets: Dict[int, "McpToolset"] = {}
+        self.healthy = True
+
+    def mark_failed(self):
+        self.healthy = False
+
+
+_current_lease: ContextVar[Optional[Lease]] = ContextVar("adk_mcp_lease", default=None)
+
+
+class PooledMcpToolset(BaseToolset):
+    """Agent-facing toolset that borrows its MCP connection from a pool per run."""
+
+    def __init__(self, pool: McpToolsetPool, **kwargs):
+        super().__init__(**kwargs)
+        self.pool = pool
+
+    async def get_tools(self, readonly_context: Optional[ReadonlyContext] = None) -> List[BaseTool]:
+        lease = _current_lease.get()
+        if lease is None:
+            # Used outside lease(): nobody will give this connection back
+            self.pool.record_leak()
+            print("MCP toolset checked out outside a lease scope", file=sys.stderr, flush=True)
+            toolset = await self.pool.checkout()
+            return await toolset.get_tools(readonly_context)
+        toolset = lease.toolsets.get(id(self))
+        if toolset is None:
+            toolset = await self.pool.checkout()
+            lease.toolsets[id(self)] = toolset
+        return await toolset.get_tools(readonly_context)
+
+    @asynccontextmanager
+    async def lease(self):
+        """Scope one pipeline run: connections borrowed inside go back on exit.
+
+        Call mark_failed() on the yielded Lease (or let an exception escape) to
+        close the connections instead of returning them to the pool.
+        """
+        lease = Lease()
+        token = _current_lease.set(lease)
+        try:
+            yield lease
+        except BaseException:
+            lease.mark_failed()
+            raise
+        finally:
+            _current_lease.reset(token)
+            for toolset in lease.toolsets.values():
+                await self.pool.release(toolset, healthy=lease.healthy)
+
+    async def close(self):
+        await self.pool.shutdown()
@@ -0,0 +1,177 @@
+# metrics.py — per-agent timing, token and tool metrics from ADK events
+# ============================================
+#
+# Agent transitions come from event.author. An agent's activation starts when
+# the runner moves on to it (the previous event of the run) and ends at its
+# final response, measured on the monotonic clock. Tokens come from each
+# event's usage_metadata, tool latency from matching function_call and
+# function_response ids; agent.start names the model that answered (routing.py).
+# Loop iterations show up as separate activations of the same agent and are
+# summed in pipeline.metrics. Sampled runs also get agent and tool spans in
+# their trace file (tracing.py).
+
+import time
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING, Any, Dict, Optional
+
+if TYPE_CHECKING:
+    from google.adk.agents import BaseAgent
+    from google.adk.events import Event
+
+from adk_pipeline.events import emit_event
+from adk_pipeline.tracing import current_trace
+
+
+def _now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+class _Activation:
+    def __init__(self, agent: str, started: float):
+        self.agent = agent
+        self.started = started
+        self.first_token: Optional[float] = None
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.total_tokens = 0
+        self.tool_calls = 0
+        self.tool_ms = 0.0
+
+
+class PipelineMetrics:
+    def __init__(self, root_agent: Optional["BaseAgent"] = None):
+        self.root_agent = root_agent
+        self.started = time.monotonic()
+        self.last_event_at = self.started
+        self.active: Dict[str, _Activation] = {}
+        self.agents: Dict[str, Dict[str, Any]] = {}
+        self.order = []
+        self._tool_calls: Dict[str, tuple] = {}  # function call id -> (agent, tool, started)
+
+    def _ms(self, start: float, end: Optional[float] = None) -> float:
+        return round(((end if end is not None else time.monotonic()) - start) * 1000, 1)
+
+    def _description(self, name: str) -> str:
+        agent = self.root_agent.find_agent(name) if self.root_agent else None
+        return (agent.description if agent else "") or ""
+
+    def _start(self, agent: str, now: float, model: Optional[str] = None) -> _Activation:
+        # An agent that shows up while others are still open runs beside them
+        # (ParallelAgent) and was launched when they were
+        started = max(a.started for a in self.active.values()) if self.active else self.last_event_at
+        activation = _Activation(agent, started)
+        self.active[agent] = activation
+        if agent not in self.agents:
+            self.order.append(agent)
+        emit_event("agent.start", {
+            "agent": agent,
+            "description": self._description(agent),
+            "model": model,
+            "timestamp": _now_iso(),
+            "t": self._ms(self.started, activation.started),
+        })
+        return activation
+
+    def _end(self, activation: _Activation, now: float):
+        self.active.pop(activation.agent, None)
+        duration = self._ms(activation.started, now)
+        ttft = self._ms(activation.started, activation.first_token) if activation.first_token else None
+        emit_event("agent.end", {
+            "agent": activation.agent,
+            "timestamp": _now_iso(),
+            "t": self._ms(self.started, now),
+            "durationMs": duration,
+            "ttftMs": ttft,
+            "promptTokens": activation.prompt_tokens,
+            "completionTokens": activation.completion_tokens,
+            "totalTokens": activation.total_tokens,
+            "toolCalls": activation.tool_calls,
+            "toolMs": round(activation.tool_ms, 1),
+        })
+        trace = current_trace()
+        if trace is not None:
+            trace.add(activation.agent, "agent", activation.started, now,
+                      totalTokens=activation.total_tokens, toolCalls=activation.tool_calls)
+        totals = self.agents.setdefault(activation.agent, {
+            "runs": 0, "durationMs": 0.0, "ttftMs": None,
+            "promptTokens": 0, "completionTokens": 0, "totalTokens": 0,
+            "toolCalls": 0, "toolMs": 0.0,
+        })
+        totals["runs"] += 1
+        totals["durationMs"] = round(totals["durationMs"] + duration, 1)
+        if totals["ttftMs"] is None:
+            totals["ttftMs"] = ttft
+        totals["promptTokens"] += activation.prompt_tokens
+        totals["completionTokens"] += activation.completion_tokens
+        totals["totalTokens"] += activation.total_tokens
+        totals["toolCalls"] += activation.tool_calls
+        totals["toolMs"] = round(totals["toolMs"] + activation.tool_ms, 1)
+
+    def on_event(self, event: "Event"):
+        agent = event.author
+        if not agent or agent == "user":
+            return
+        now = time.monotonic()
+        # routing.RoutedLlm stamps the model that answered; native agents have none
+        model = (event.custom_metadata or {}).get("model")
+        activation = self.active.get(agent) or self._start(agent, now, model)
+
+        if event.partial:
+            if activation.first_token is None:
+                activation.first_token = now
+            self.last_event_at = now
+            return
+
+        usage = event.usage_metadata
+        if usage is not None:
+            activation.prompt_tokens += usage.prompt_token_count or 0
+            activation.completion_tokens += usage.candidates_token_count or 0
+            activation.total_tokens += usage.total_token_count or 0
+        if activation.first_token is None and usage is not None:
+            activation.first_token = now
+
+        for call in event.get_function_calls():
+            activation.tool_calls += 1
+            self._tool_calls[call.id or f"{agent}:{call.name}"] = (agent, call.name, now)
+            emit_event("tool.use", {"agent": agent, "tool": call.name, "timestamp": _now_iso()})
+        for response in event.get_function_responses():
+            started = self._tool_calls.pop(response.id or f"{agent}:{response.name}", None)
+            if started is None:
+                continue
+            caller, tool, t0 = started
+            latency = (now - t0) * 1000
+            if caller in self.active:
+                self.active[caller].tool_ms += latency
+            result = response.response or {}
+            failed = isinstance(result, dict) and "error" in result
+            trace = current_trace()
+            if trace is not None:
+                trace.add(f"tool {tool}", "tool", t0, now, agent=caller, error=failed)
+            emit_event("tool.result", {
+                "agent": caller,
+                "tool": tool,
+                "latencyMs": round(latency, 1),
+                "error": failed,
+            })
+
+        if event.is_final_response():
+            self._end(activation, now)
+        self.last_event_at = now
+
+    def finish(self, status: str = "success") -> Dict[str, Any]:
+        now = time.monotonic()
+        for activation in list(self.active.values()):
+            self._end(activation, now)
+        agents = {name: self.agents[name] for name in self.order if name in self.agents}
+        summary = {
+            "status": status,
+            "totalMs": self._ms(self.started, now),
+            "promptTokens": sum(a["promptTokens"] for a in agents.values()),
+            "completionTokens": sum(a["completionTokens"] for a in agents.values()),
+            "totalTokens": sum(a["totalTokens"] for a in agents.values()),
+            "slowestAgent": max(agents, key=lambda n: agents[n]["durationMs"], default=None),
+            "costliestAgent": max(agents, key=lambda n: agents[n]["totalTokens"], default=None),
+            "agents": agents,
+        }
+        emit_event("pipeline.metrics", summary)
+        return summary
@@ -0,0 +1,162 @@
+# project_index.py — persistent index of generated projects
+# ============================================
+#
+# The memory context lists the files of projects mentioned in "Artifacts at
+# <path>" notes, and refinement mode needs a sha256 manifest of the project it
+# patches. Both used to look at the disk from scratch on every run: a
+# top-level os.listdir for the notes, a .adk-manifest.json inside the project
+# for refinement. ProjectIndex keeps one SQLite row per project root instead:
+#
+#   manifest   relative path -> {sha256, bytes, mtime} for the whole tree
+#   stack      detected from package.json / Python requirements, e.g. "react+vite"
+#   listing    the ready-to-use file listing line for prompts
+#
+# refresh() walks the tree and re-hashes only files whose size or mtime
+# changed (refine.build_manifest). describe() is a single primary-key lookup
+# and only refreshes rows older than max_age_s, so a note costs one query.
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, NamedTuple, Optional, Tuple
+
+from adk_pipeline.refine import build_manifest
+
+LISTING_MAX_FILES = 40
+
+_NODE_STACKS = (
+    ("next", "next"), ("react", "react"), ("vue", "vue"), ("svelte", "svelte"),
+    ("express", "express"), ("fastify", "fastify"), ("vite", "vite"),
+)
+_PYTHON_STACKS = ("django", "flask", "fastapi", "streamlit")
+
+
+class ProjectRecord(NamedTuple):
+    root: str
+    stack: str
+    files: int
+    bytes: int
+    scanned_at: float
+    listing: str
+
+
+def _read(root: str, relative: str) -> str:
+    try:
+        with open(os.path.join(root, relative), "r", encoding="utf-8") as f:
+            return f.read()
+    except (OSError, UnicodeDecodeError):
+        return ""
+
+
+def detect_stack(root: str, manifest: Dict[str, Dict[str, Any]]) -> str:
+    """A short stack label from the shallowest manifests in the tree, e.g. "react+vite+express"."""
+    found = []
+    by_name: Dict[str, list] = {}
+    for relative in manifest:
+        by_name.setdefault(relative.rsplit("/", 1)[-1], []).append(relative)
+    for relative in sorted(by_name.get("package.json", []), key=lambda p: p.count("/"))[:2]:
+        try:
+            data = json.loads(_read(root, relative) or "{}")
+        except ValueError:
+            continue
+        deps = {**(data.get("devDependencies") or {}), **(data.get("dependencies") or {})}
+        found += [label for name, label in _NODE_STACKS if name in deps and label not in found]
+    python = " ".join(_read(root, p).lower() for name in ("requirements.txt", "pyproject.toml") for p in by_name.get(name, [])[:2])
+    found += [name for name in _PYTHON_STACKS if name in python and name not in found]
+    if found:
+        return "+".join(found)
+    if by_name.get("package.json"):
+        return "node"
+    if any(p.endswith(".py") for p in manifest):
+        return "python"
+    if any(p.endswith(".html") for p in manifest):
+        return "static"
+    return "unknown"
+
+
+def render_listing(root: str, stack: str, manifest: Dict[str, Dict[str, Any]]) -> str:
+    paths = sorted(manifest, key=lambda p: (p.count("/"), p))
+    shown = ", ".join(paths[:LISTING_MAX_FILES])
+    more = f" (+{len(paths) - LISTING_MAX_FILES} more)" if len(paths) > LISTING_MAX_FILES else ""
+    size_kb = sum(e["bytes"] for e in manifest.values()) / 1024
+    return f"  - Files in {os.path.basename(root.rstrip('/'))} ({stack}; {len(paths)} files, {size_kb:.1f} KB): {shown}{more}"
+
+
+class ProjectIndex:
+    def __init__(self, path: str = "", max_age_s: float = 60.0):
+        self.path = path  # empty = in-memory, for this process only
+        self.max_age_s = max_age_s
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            if self.path:
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            self._conn = sqlite3.connect(self.path or ":memory:", check_same_thread=False, timeout=5.0)
+            if self.path:
+                self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS adk_project_index ("
+                " root TEXT PRIMARY KEY, stack TEXT NOT NULL, files INTEGER NOT NULL, bytes INTEGER NOT NULL,"
+                " scanned_at REAL NOT NULL, listing TEXT NOT NULL, manifest TEXT NOT NULL)"
+            )
+        return self._conn
+
+    def get(self, root: str) -> Optional[ProjectRecord]:
+        with self._lock:
+            row = self._db().execute(
+                "SELECT root, stack, files, bytes, scanned_at, listing FROM adk_project_index WHERE root = ?",
+                (os.path.abspath(root),),
+            ).fetchone()
+        return ProjectRecord(*row) if row else None
+
+    def manifest(self, root: str) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            row = self._db().execute(
+                "SELECT manifest FROM adk_project_index WHERE root = ?", (os.path.abspath(root),)
+            ).fetchone()
+        return json.loads(row[0]) if row else {}
+
+    def refresh(self, root: str) -> Tuple[ProjectRecord, Dict[str, Dict[str, Any]], int]:
+        """Rescan `root`, re-hashing only changed files; returns the record, the manifest and how many were hashed."""
+        root = os.path.abspath(root)
+        manifest, hashed = build_manifest(root, self.manifest(root))
+        stack = detect_stack(root, manifest)
+        record = ProjectRecord(
+            root=root,
+            stack=stack,
+            files=len(manifest),
+            bytes=sum(e["bytes"] for e in manifest.values()),
+            scanned_at=time.time(),
+            listing=render_listing(root, stack, manifest),
+        )
+        with self._lock:
+            db = self._db()
+            db.execute(
+                "INSERT OR REPLACE INTO adk_project_index (root, stack, files, bytes, scanned_at, listing, manifest)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (*record, json.dumps(manifest, separators=(",", ":"))),
+            )
+            db.commit()
+        return record, manifest, hashed
+
+    def describe(self, root: str) -> Optional[str]:
+        """The listing line for a project, refreshed only when the row is missing or older than max_age_s."""
+        if not os.path.isdir(root):
+            return None
+        record = self.get(root)
+        if record is None or time.time() - record.scanned_at > self.max_age_s:
+            try:
+                record = self.refresh(root)[0]
+            except OSError:
+                return record.listing if record else None
+        return record.listing if record.files else None
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
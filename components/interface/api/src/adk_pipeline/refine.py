@@ -0,0 +1,476 @@
+# refine.py — incremental, patch-based refinement of an existing project
+# ============================================
+#
+# A refinement ("make the button blue") used to regenerate output.py for the
+# whole project. Refinement mode works on the project on disk instead:
+#
+#   ProjectManifestAgent  - sha256 manifest of every project file from the
+#                           project index (re-hashing only files whose size or
+#                           mtime changed), plus the few files relevant to the
+#                           request for the prompt
+#   RefinementWriterAgent - LLM; answers with SEARCH/REPLACE patches for the
+#                           affected files only (prompt lives in adk_service)
+#   PatchApplyAgent       - validates every patch against the manifest and the
+#                           file contents, then applies them all or none
+#
+# Patch format, one FILE header per file and any number of blocks:
+#
+#   FILE: src/App.jsx
+#   <<<<<<< SEARCH
+#   exact lines from the current file
+#   =======
+#   replacement lines
+#   >>>>>>> REPLACE
+#
+# An empty SEARCH creates a new file; "DELETE: path" removes one. Patches that
+# leave a file unchanged are skipped. A path under several FILE headers is
+# patched in order, each on the result of the last; a path the same response
+# already deleted cannot be edited.
+
+import hashlib
+import json
+import os
+import posixpath
+import re
+import tempfile
+from typing import Any, AsyncGenerator, Callable, Dict, List, Optional, Tuple
+
+from google.adk.agents import BaseAgent
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.events import Event, EventActions
+from google.genai import types as genai_types
+
+from adk_pipeline.events import emit_event
+
+SKIP_DIRS = {"node_modules", ".git", "dist", "build", "__pycache__", ".venv", "venv", ".next", ".cache"}
+MAX_FILE_BYTES = 256 * 1024
+
+_FILE_RE = re.compile(r"^FILE:\s*`?([^`]+?)`?\s*$")
+_DELETE_RE = re.compile(r"^DELETE:\s*`?([^`]+?)`?\s*$")
+_SEARCH = re.compile(r"^<{5,9} SEARCH\s*$")
+_DIVIDER = re.compile(r"^={5,9}\s*$")
+_REPLACE = re.compile(r"^>{5,9} REPLACE\s*$")
+_WORD_RE = re.compile(r"[a-z][a-z0-9]{2,}")
+_STOP_WORDS = {
+    "the", "and", "for", "with", "that", "this", "make", "change", "update", "fix", "please", "add",
+    "should", "from", "into", "when", "use", "can", "all", "are", "not", "but", "instead",
+}
+
+
+class PatchError(Exception):
+    pass
+
+
+# ============================================================================
+# MANIFEST
+# ============================================================================
+
+def _sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(65536), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def build_manifest(root: str, previous: Optional[Dict[str, Dict[str, Any]]] = None) -> Tuple[Dict[str, Dict[str, Any]], int]:
+    """relative path -> {sha256, bytes, mtime}; returns the manifest and how many files were hashed."""
+    previous = previous or {}
+    manifest: Dict[str, Dict[str, Any]] = {}
+    hashed = 0
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(d for d in dirnames if d not in SKIP_DIRS)
+        for name in sorted(filenames):
+            path = os.path.join(dirpath, name)
+            relative = os.path.relpath(path, root).replace(os.sep, "/")
+            if os.path.islink(path):
+                continue
+            stat = os.stat(path)
+            entry = previous.get(relative)
+            if entry and entry.get("bytes") == stat.st_size and entry.get("mtime") == stat.st_mtime_ns:
+                manifest[relative] = entry
+                continue
+            manifest[relative] = {"sha256": _sha256(path), "bytes": stat.st_size, "mtime": stat.st_mtime_ns}
+            hashed += 1
+    return manifest, hashed
+
+
+def _read_text(root: str, relative: str) -> Optional[str]:
+    try:
+        with open(os.path.join(root, relative), "r", encoding="utf-8") as f:
+            return f.read()
+    except (OSError, UnicodeDecodeError):
+        return None
+
+
+def select_files(
+    root: str, manifest: Dict[str, Dict[str, Any]], request: str, max_files: int = 8, max_chars: int = 40000
+) -> List[str]:
+    """The files most likely affected by `request`, within a file and size budget."""
+    words = {w for w in _WORD_RE.findall((request or "").lower()) if w not in _STOP_WORDS}
+    # Generated projects sit in one top-level folder, which every path would match
+    tops = {p.split("/", 1)[0] for p in manifest}
+    strip_top = len(tops) == 1 and all("/" in p for p in manifest)
+    scored = []
+    for relative, entry in manifest.items():
+        if entry["bytes"] > MAX_FILE_BYTES:
+            continue
+        text = _read_text(root, relative)
+        if text is None:
+            continue
+        lowered = text.lower()
+        name = (relative.split("/", 1)[1] if strip_top else relative).lower()
+        # A path mention counts far more than a word that merely occurs in the body
+        score = sum(5 for w in words if w in name) + sum(1 for w in words if w in lowered)
+        if posixpath.basename(relative).lower() in (request or "").lower():
+            score += 20
+        scored.append((score, entry["bytes"], relative))
+
+    scored.sort(key=lambda s: (-s[0], s[1]))
+    selected, used = [], 0
+    for score, size, relative in scored:
+        if len(selected) >= max_files:
+            break
+        if selected and score == 0:
+            break
+        if used + size > max_chars and selected:
+            continue
+        selected.append(relative)
+        used += size
+    return selected
+
+
+def render_context(root: str, files: List[str]) -> str:
+    blocks = []
+    for relative in files:
+        text = _read_text(root, relative) or ""
+        blocks.append(f"FILE: {relative}\n```\n{text}{'' if text.endswith(chr(10)) else chr(10)}```")
+    return "\n\n".join(blocks)
+
+
+# ============================================================================
+# PATCHES
+# ============================================================================
+
+class FilePatch:
+    def __init__(self, path: str, delete: bool = False):
+        self.path = path
+        self.delete = delete
+        self.edits: List[Tuple[str, str]] = []
+
+
+def parse_patches(text: str) -> List[FilePatch]:
+    patches: List[FilePatch] = []
+    current: Optional[FilePatch] = None
+    lines = (text or "").splitlines()
+    i = 0
+    while i < len(lines):
+        line = lines[i]
+        header = _FILE_RE.match(line)
+        deletion = _DELETE_RE.match(line)
+        if header:
+            current = FilePatch(header.group(1).strip())
+            patches.append(current)
+        elif deletion:
+            patches.append(FilePatch(deletion.group(1).strip(), delete=True))
+            current = None
+        elif _SEARCH.match(line):
+            if current is None:
+                raise PatchError(f"SEARCH block without a FILE header (line {i + 1})")
+            search, replace, section = [], [], "search"
+            i += 1
+            while i < len(lines) and not _REPLACE.match(lines[i]):
+                if section == "search" and _DIVIDER.match(lines[i]):
+                    section = "replace"
+                else:
+                    (search if section == "search" else replace).append(lines[i])
+                i += 1
+            if i >= len(lines) or section != "replace":
+                raise PatchError(f"Unterminated SEARCH/REPLACE block in {current.path}")
+            current.edits.append(("\n".join(search), "\n".join(replace)))
+        i += 1
+    return patches
+
+
+def _apply_edit(original: str, search: str, replace: str, path: str) -> str:
+    if original.count(search) == 1:
+        return original.replace(search, replace, 1)
+    if original.count(search) > 1:
+        raise PatchError(f"{path}: SEARCH text matches {original.count(search)} places; include more context")
+    # Models often get trailing whitespace wrong; retry line by line without it
+    lines = original.split("\n")
+    wanted = [l.rstrip() for l in search.split("\n")]
+    matches = [
+        i for i in range(len(lines) - len(wanted) + 1)
+        if [l.rstrip() for l in lines[i:i + len(wanted)]] == wanted
+    ]
+    if len(matches) != 1:
+        raise PatchError(f"{path}: SEARCH text not found" if not matches else f"{path}: SEARCH text is ambiguous")
+    start = matches[0]
+    return "\n".join(lines[:start] + replace.split("\n") + lines[start + len(wanted):])
+
+
+def _check_content(path: str, content: str) -> Optional[str]:
+    if path.endswith(".json"):
+        try:
+            json.loads(content)
+        except ValueError as e:
+            return f"{path}: invalid JSON after patch ({e})"
+    elif path.endswith(".py"):
+        try:
+            compile(content, path, "exec")
+        except SyntaxError as e:
+            return f"{path}: invalid Python after patch (line {e.lineno}: {e.msg})"
+    return None
+
+
+def _safe_relative(path: str) -> Optional[str]:
+    path = path.strip()
+    relative = posixpath.normpath(path[2:] if path.startswith("./") else path)
+    parts = relative.split("/")
+    if posixpath.isabs(relative) or ".." in parts or relative == "." or SKIP_DIRS & set(parts):
+        return None
+    return relative
+
+
+def plan_edits(
+    manifest: Dict[str, Dict[str, Any]],
+    patches: List[FilePatch],
+    read: Callable[[str], Optional[str]],
+    is_stale: Optional[Callable[[str, Dict[str, Any]], bool]] = None,
+) -> Tuple[Dict[str, Optional[str]], List[str], List[str]]:
+    """Validate patches against a manifest whose files `read` returns.
+
+    Returns (relative path -> new content or None to delete, unchanged paths, errors).
+    """
+    changes: Dict[str, Optional[str]] = {}
+    unchanged: List[str] = []
+    errors: List[str] = []
+    for patch in patches:
+        relative = _safe_relative(patch.path)
+        if relative is None:
+            errors.append(f"{patch.path}: path is outside the project or not editable")
+            continue
+        entry = manifest.get(relative)
+        if entry is not None and is_stale is not None and is_stale(relative, entry):
+            errors.append(f"{relative}: changed since the manifest was taken")
+            continue
+        if patch.delete:
+            if entry is None:
+                errors.append(f"{relative}: cannot delete a file that does not exist")
+            else:
+                changes[relative] = None
+            continue
+
+        # A file patched earlier in the same response builds on that result
+        if relative in changes:
+            original = changes[relative]
+            if original is None:
+                errors.append(f"{relative}: edited after it was deleted in the same patch")
+                continue
+        else:
+            original = read(relative) if entry is not None else ""
+            if original is None:
+                errors.append(f"{relative}: not a text file")
+                continue
+        content = original
+        try:
+            for search, replace in patch.edits:
+                if not search.strip():
+                    if entry is not None or content:
+                        raise PatchError(f"{relative}: empty SEARCH is only allowed for new files")
+                    content = replace + ("" if replace.endswith("\n") else "\n")
+                else:
+                    content = _apply_edit(content, search, replace, relative)
+        except PatchError as e:
+            errors.append(str(e))
+            continue
+        problem = _check_content(relative, content)
+        if problem:
+            errors.append(problem)
+        elif content == original and (entry is not None or relative in changes):
+            if relative not in changes:
+                unchanged.append(relative)
+        else:
+            changes[relative] = content
+    return changes, unchanged, errors
+
+
+def plan_changes(
+    root: str, manifest: Dict[str, Dict[str, Any]], patches: List[FilePatch]
+) -> Tuple[Dict[str, Optional[str]], List[str], List[str]]:
+    """plan_edits() against the project on disk."""
+    return plan_edits(
+        manifest,
+        patches,
+        lambda relative: _read_text(root, relative),
+        lambda relative, entry: _sha256(os.path.join(root, relative)) != entry["sha256"],
+    )
+
+
+def _read_bytes(path: str) -> Optional[bytes]:
+    try:
+        with open(path, "rb") as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+def commit_changes(root: str, changes: Dict[str, Optional[str]]):
+    """Apply every change or none: stage temp files, swap them in, and roll back on failure."""
+    staged: Dict[str, str] = {}
+    backups: Dict[str, Optional[bytes]] = {}
+    try:
+        for relative, content in changes.items():
+            full = os.path.join(root, relative)
+            if content is not None:
+                os.makedirs(os.path.dirname(full), exist_ok=True)
+                fd, tmp = tempfile.mkstemp(prefix=".tmp-", dir=os.path.dirname(full))
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    f.write(content)
+                staged[relative] = tmp
+        for relative, content in changes.items():
+            full = os.path.join(root, relative)
+            backups[relative] = _read_bytes(full)
+            if content is None:
+                os.remove(full)
+            else:
+                os.replace(staged.pop(relative), full)
+    except OSError:
+        for relative, original in backups.items():
+            full = os.path.join(root, relative)
+            if original is None:
+                if os.path.exists(full):
+                    os.remove(full)
+            else:
+                with open(full, "wb") as f:
+                    f.write(original)
+        raise
+    finally:
+        for tmp in staged.values():
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+
+# ============================================================================
+# AGENTS
+# ============================================================================
+
+class ProjectManifestAgent(BaseAgent):
+    """Hashes the project and picks the files the refinement prompt shows in full."""
+
+    index: Any  # project_index.ProjectIndex
+    root_key: str = "refine_path"
+    max_files: int = 8
+    max_context_chars: int = 40000
+
+    async def _run_async_impl(self, ctx: InvocationContext) -> AsyncGenerator[Event, None]:
+        state = ctx.session.state
+        root = state[self.root_key]
+        record, manifest, hashed = self.index.refresh(root)
+        selected = select_files(root, manifest, state.get("user_request") or "", self.max_files, self.max_context_chars)
+        listing = "\n".join(f"- {path} ({entry['bytes']} bytes)" for path, entry in manifest.items())
+        emit_event("refine.manifest", {
+            "stack": record.stack,
+            "files": len(manifest),
+            "bytes": sum(e["bytes"] for e in manifest.values()),
+            "rehashed": hashed,
+            "selected": selected,
+            "selectedBytes": sum(manifest[p]["bytes"] for p in selected),
+        })
+        yield Event(
+            author=self.name,
+            invocation_id=ctx.invocation_id,
+            branch=ctx.branch,
+            actions=EventActions(state_delta={
+                "refine_manifest": manifest,
+                "refine_selected": selected,
+                "refine_files": f"Stack: {record.stack}\n{listing}" if listing else "(empty project)",
+                "refine_context": render_context(root, selected),
+                "refine_errors": "",
+                "refine_attempt": 0,
+            }),
+        )
+
+
+class PatchApplyAgent(BaseAgent):
+    """Validates and applies the writer's patches; retries the loop with the errors otherwise."""
+
+    index: Any  # project_index.ProjectIndex
+    root_key: str = "refine_path"
+    patches_key: str = "refine_patches"
+    max_attempts: int = 2
+
+    async def _run_async_impl(self, ctx: InvocationContext) -> AsyncGenerator[Event, None]:
+        state = ctx.session.state
+        root = state[self.root_key]
+        manifest = state.get("refine_manifest") or {}
+        attempt = int(state.get("refine_attempt") or 0) + 1
+        delta: Dict[str, Any] = {"refine_attempt": attempt}
+
+        try:
+            patches = parse_patches(state.get(self.patches_key) or "")
+            changes, unchanged, errors = plan_changes(root, manifest, patches)
+        except PatchError as e:
+            patches, changes, unchanged, errors = [], {}, [], [str(e)]
+
+        if errors and attempt < self.max_attempts:
+            # Show the files the model patched blind, then let it try again
+            selected = list(state.get("refine_selected") or [])
+            for patch in patches:
+                relative = _safe_relative(patch.path)
+                if relative in manifest and relative not in selected:
+                    selected.append(relative)
+            delta.update({
+                "refine_errors": "\n".join(f"- {e}" for e in errors),
+                "refine_selected": selected,
+                "refine_context": render_context(root, selected),
+            })
+            emit_event("refine.retry", {"attempt": attempt, "errors": errors})
+            yield Event(
+                author=self.name,
+                invocation_id=ctx.invocation_id,
+                branch=ctx.branch,
+                actions=EventActions(state_delta=delta),
+            )
+            return
+
+        applied = not errors
+        if applied and changes:
+            try:
+                commit_changes(root, changes)
+                self.index.refresh(root)
+            except OSError as e:
+                applied, errors = False, [f"Could not write the changes: {e}"]
+
+        created = [p for p, c in changes.items() if c is not None and p not in manifest]
+        deleted = [p for p, c in changes.items() if c is None]
+        updated = [p for p, c in changes.items() if c is not None and p in manifest]
+        emit_event("refine.apply", {
+            "applied": applied,
+            "attempts": attempt,
+            "updated": updated if applied else [],
+            "created": created if applied else [],
+            "deleted": deleted if applied else [],
+            "unchanged": unchanged,
+            "bytesWritten": sum(len(c.encode("utf-8")) for c in changes.values() if c) if applied else 0,
+            "errors": errors,
+        })
+
+        if not applied:
+            report = "# Refinement Failed\n\nNo files were changed.\n\n" + "\n".join(f"- {e}" for e in errors)
+        elif not changes:
+            report = "# Refinement Complete\n\nNo changes were needed."
+        else:
+            sections = [("Updated", updated), ("Created", created), ("Deleted", deleted), ("Unchanged", unchanged)]
+            report = "# Refinement Complete\n\n" + "\n\n".join(
+                f"## {title}\n" + "\n".join(f"- {p}" for p in paths) for title, paths in sections if paths
+            )
+        delta["refine_report"] = report
+        yield Event(
+            author=self.name,
+            invocation_id=ctx.invocation_id,
+            branch=ctx.branch,
+            content=genai_types.Content(role="model", parts=[genai_types.Part(text=report)]),
+            actions=EventActions(state_delta=delta, escalate=True),
+        )
@@ -0,0 +1,191 @@
+# resilience.py — retries and hedged requests for model calls
+# ============================================
+#
+# One transient 429 or 5xx from the provider used to fail the whole pipeline:
+# the error reached the runner and run_pipeline_async gave up. RoutedLlm
+# (routing.py) now sorts a call that fails before its first chunk with
+# classify_error:
+#
+#   rate_limit   429 / RESOURCE_EXHAUSTED: retried after the provider's
+#                retry delay when it names one, and the model is throttled
+#                for that long for every agent
+#   transient    408, 5xx, timeouts, dropped connections: retried
+#   None         anything else (bad request, auth, ...): no retry
+#
+# Retries wait a full-jitter exponential backoff (RetryPolicy), so agents
+# that failed together do not come back together. When the retries are spent
+# the route fails over to its next model as before.
+#
+# Short agents can also be hedged (HedgePolicy): when the first chunk has not
+# arrived after the agent's p95 first-chunk latency, a duplicate request goes
+# out and whichever answers first is streamed, the other one is cancelled.
+# Without streaming the first chunk is the whole response, so the faster call
+# wins outright. A hedge needs a free ModelLimiter permit and a model that is
+# not throttled.
+
+import asyncio
+import random
+import re
+from collections import deque
+from contextlib import aclosing
+from fnmatch import fnmatchcase
+from typing import TYPE_CHECKING, AsyncGenerator, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    from google.adk.models.llm_response import LlmResponse
+
+RATE_LIMIT = "rate_limit"
+TRANSIENT = "transient"
+
+_RATE_LIMIT_STATUSES = {"RESOURCE_EXHAUSTED"}
+_TRANSIENT_STATUSES = {"UNAVAILABLE", "DEADLINE_EXCEEDED", "INTERNAL"}
+_TRANSIENT_CODES = {408, 500, 502, 503, 504}
+# Transport failures, by class name so httpx/aiohttp/litellm need not be imported
+_TRANSIENT_CLASSES = {
+    "TimeoutError", "ConnectionError", "TransportError", "TimeoutException",
+    "ClientConnectionError", "ServerDisconnectedError", "APIConnectionError", "ServiceUnavailableError",
+}
+_RETRY_DELAY = re.compile(r"retryDelay['\"]?\s*[:=]\s*['\"]?(\d+(?:\.\d+)?)s")
+
+
+def classify_error(error: BaseException) -> Optional[str]:
+    """RATE_LIMIT, TRANSIENT, or None when retrying cannot help."""
+    code = getattr(error, "code", None)
+    if not isinstance(code, int):
+        code = getattr(error, "status_code", None)
+    status = getattr(error, "status", None)
+    if code == 429 or status in _RATE_LIMIT_STATUSES or "RateLimit" in type(error).__name__:
+        return RATE_LIMIT
+    if code in _TRANSIENT_CODES or status in _TRANSIENT_STATUSES:
+        return TRANSIENT
+    if any(cls.__name__ in _TRANSIENT_CLASSES for cls in type(error).__mro__):
+        return TRANSIENT
+    return None
+
+
+def retry_after_s(error: BaseException) -> Optional[float]:
+    """The wait the provider asked for: a Retry-After header or a RetryInfo retryDelay."""
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    if headers is not None:
+        try:
+            return float(headers.get("retry-after"))
+        except (TypeError, ValueError):
+            pass
+    match = _RETRY_DELAY.search(str(getattr(error, "details", None) or error))
+    return float(match.group(1)) if match else None
+
+
+class RetryPolicy:
+    def __init__(self, retries: int = 3, base_s: float = 0.5, max_s: float = 20.0):
+        self.retries = retries
+        self.base_s = base_s
+        self.max_s = max_s
+
+    def delay_s(self, attempt: int, retry_after: Optional[float] = None) -> Optional[float]:
+        """How long to wait before retry `attempt` (0-based), or None when no retry is left.
+
+        A provider asking for a longer wait than max_s is not retried; the
+        route's next model is the better bet.
+        """
+        if attempt >= self.retries or (retry_after is not None and retry_after > self.max_s):
+            return None
+        backoff = random.uniform(0, min(self.max_s, self.base_s * 2 ** attempt))
+        return max(backoff, retry_after or 0.0)
+
+
+class HedgePolicy:
+    def __init__(
+        self,
+        agents: List[str],
+        percentile: float = 0.95,
+        min_delay_s: float = 1.0,
+        min_samples: int = 5,
+        history: int = 200,
+    ):
+        self.agents = agents  # fnmatch patterns
+        self.percentile = percentile
+        self.min_delay_s = min_delay_s
+        self.min_samples = min_samples
+        self._latencies: Dict[str, Deque[float]] = {}
+        self._history = history
+
+    def record(self, agent: str, latency_s: float):
+        self._latencies.setdefault(agent, deque(maxlen=self._history)).append(latency_s)
+
+    def delay_s(self, agent: str) -> Optional[float]:
+        """When to send the duplicate of `agent`'s call, or None when it is not hedged (yet)."""
+        if not any(fnmatchcase(agent, pattern) for pattern in self.agents):
+            return None
+        latencies = sorted(self._latencies.get(agent, ()))
+        if len(latencies) < self.min_samples:
+            return None
+        return max(self.min_delay_s, latencies[min(len(latencies) - 1, int(self.percentile * len(latencies)))])
+
+
+_DONE = object()
+
+
+async def _pump(lane: int, start: Callable[[], AsyncGenerator["LlmResponse", None]], queue: asyncio.Queue):
+    # The whole stream runs inside this task, so the client's context managers
+    # are entered and left in the same task
+    try:
+        async with aclosing(start()) as responses:
+            async for response in responses:
+                await queue.put((lane, response))
+        await queue.put((lane, _DONE))
+    except Exception as e:
+        await queue.put((lane, e))
+
+
+async def hedged(
+    start: Callable[[], AsyncGenerator["LlmResponse", None]],
+    hedge_after_s: float,
+    try_hedge: Callable[[], Awaitable[bool]],
+    release: Callable[[], None],
+) -> AsyncGenerator[Tuple["LlmResponse", int], None]:
+    """Stream start()'s responses as (response, lane); lane 1 is the duplicate.
+
+    When nothing arrived after hedge_after_s and try_hedge() agrees, start()
+    runs a second time and the first lane to answer is streamed. release() is
+    called once the duplicate is done.
+    """
+    queue: asyncio.Queue = asyncio.Queue()
+    lanes: Dict[int, asyncio.Task] = {0: asyncio.create_task(_pump(0, start, queue))}
+    winner: Optional[int] = None
+    waited = False
+    try:
+        while True:
+            if winner is None and not waited:
+                try:
+                    lane, item = await asyncio.wait_for(queue.get(), hedge_after_s)
+                except asyncio.TimeoutError:
+                    waited = True
+                    if await try_hedge():
+                        lanes[1] = asyncio.create_task(_pump(1, start, queue))
+                        lanes[1].add_done_callback(lambda _: release())
+                    continue
+            else:
+                lane, item = await queue.get()
+            if winner is None:
+                failed = isinstance(item, Exception) or item is _DONE or (
+                    getattr(item, "error_code", None) and len(lanes) > 1
+                )
+                if failed and len(lanes) > 1:
+                    # The other lane may still answer
+                    lanes.pop(lane)
+                    continue
+                winner = lane
+                waited = True
+                for other, task in lanes.items():
+                    if other != winner:
+                        task.cancel()
+            if lane != winner:
+                continue
+            if item is _DONE:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item, lane
+    finally:
+        for task in lanes.values():
+            task.cancel()
@@ -0,0 +1,335 @@
+# review_rules.py — rule-based pre-review for the CodeImprovementLoop
+# ============================================
+#
+# Half of CodeReviewerAgent's checklist is pattern matching: TODO markers,
+# <%= BASE_URL %>, vue.config.js, outdated React/Vue/Express, broken quotes.
+# RuleReviewAgent runs those checks locally on the files embedded in
+# generated_code and decides whether the LLM reviewer is needed this round:
+#
+#   rules fail                      -> findings become review_comments, reviewer skipped
+#   rules pass, not yet approved    -> LLM reviewer runs
+#   rules pass, approved earlier    -> approved without another LLM review
+#
+# ReviewLoopControlAgent then ends the loop once both the rules and the reviewer
+# pass, or when the iteration's time/token budget is spent. The refactor gates
+# skip an approved round on their own as well (approved_promotion), and the
+# LLM reviewer's stream is cut once its APPROVED line is out (approval_settled).
+
+import json
+import posixpath
+import re
+import time
+from typing import Any, AsyncGenerator, Dict, List, Mapping, NamedTuple, Optional, Tuple
+
+from google.adk.agents import BaseAgent
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.events import Event, EventActions
+from google.genai import types as genai_types
+
+from adk_pipeline.events import emit_event
+from adk_pipeline.script import analyze_script, has_placeholder, strip_code_fences
+
+APPROVED_TEXT = "APPROVED: Code is production-ready and ready to save."
+
+_APPROVED_RE = re.compile(r"^\W*APPROVED\b", re.IGNORECASE)
+_BASE_URL_RE = re.compile(r"<%=\s*BASE_URL\s*%>")
+_JS_EXTENSIONS = (".js", ".jsx", ".ts", ".tsx", ".vue", ".mjs", ".cjs")
+_DEP_RE = re.compile(r"""["'](react|vue|express|react-scripts|@vue/cli-service)["']\s*:\s*["']([^"']*)["']""")
+_VERSION_RE = re.compile(r"(\d+)(?:\.(\d+|x|\*))?")
+
+# package -> (minimum major, minimum minor, requirement text)
+_MIN_VERSIONS = {
+    "react": (18, 0, "React projects must use React 18+ (\"react\": \"^18.2.0\")"),
+    "vue": (3, 0, "Vue projects must use Vue 3+ (\"vue\": \"^3.3.0\")"),
+    "express": (4, 18, "Express projects must use Express 4.18+ (\"express\": \"^4.18.0\")"),
+}
+_BANNED_PACKAGES = {
+    "react-scripts": "create-react-app (react-scripts) is not allowed; use Vite",
+    "@vue/cli-service": "Vue CLI (@vue/cli-service) is not allowed; use Vite",
+}
+
+
+class Finding(NamedTuple):
+    rule: str
+    file: str
+    line: Optional[int]
+    message: str
+
+    def render(self) -> str:
+        where = f"{self.file}:{self.line}" if self.line else self.file
+        return f"- [{self.rule}] {where}: {self.message}"
+
+
+def is_approved(review: Optional[str]) -> bool:
+    return bool(review) and bool(_APPROVED_RE.match(review))
+
+
+def approval_settled(streamed: str) -> bool:
+    """True once a streamed review has finished its APPROVED verdict line; the rest would be commentary."""
+    text = streamed.strip()
+    return is_approved(text) and ("\n" in text or text.endswith(APPROVED_TEXT.split(":", 1)[1]))
+
+
+def approved_promotion(state: Mapping[str, Any]) -> Dict[str, Any]:
+    """What a skipped refactor leaves behind on approval: the reviewed code, unchanged."""
+    if not is_approved(state.get("review_comments")):
+        return {}
+    return {"refactored_code": strip_code_fences(state.get("generated_code") or "")}
+
+
+def _parse_version(spec: str) -> Optional[Tuple[int, int]]:
+    match = _VERSION_RE.search(spec or "")
+    if not match:
+        return None  # "latest", git URLs, workspace refs
+    minor = match.group(2)
+    return int(match.group(1)), int(minor) if minor and minor.isdigit() else 0
+
+
+def _check_dependencies(findings: List[Finding], path: str, deps: Dict[str, Any], line_of):
+    for name, spec in deps.items():
+        if name in _BANNED_PACKAGES:
+            findings.append(Finding("outdated-tooling", path, line_of(name), _BANNED_PACKAGES[name]))
+        if name in _MIN_VERSIONS and isinstance(spec, str):
+            version = _parse_version(spec)
+            major, minor, requirement = _MIN_VERSIONS[name]
+            if version is not None and version < (major, minor):
+                findings.append(Finding(
+                    "outdated-version", path, line_of(name), f"{name} {spec} is too old. {requirement}"
+                ))
+
+
+def _line_finder(text: str):
+    def line_of(needle: str) -> Optional[int]:
+        for i, line in enumerate(text.splitlines(), 1):
+            if f'"{needle}"' in line or f"'{needle}'" in line:
+                return i
+        return None
+    return line_of
+
+
+def _unclosed_double_quotes(text: str) -> List[int]:
+    """Lines of a JS/TS file where a double-quoted string is still open at the end of the line.
+
+    A small tokenizer: quotes inside '...' strings, template literals (which may
+    span lines, like /* */ comments) and // comments do not count.
+    """
+    lines = []
+    template = block_comment = False
+    for number, line in enumerate(text.splitlines(), 1):
+        quote = None
+        i = 0
+        while i < len(line):
+            ch = line[i]
+            if block_comment:
+                if line.startswith("*/", i):
+                    block_comment = False
+                    i += 1
+            elif template or quote:
+                if ch == "\\":
+                    i += 1
+                elif template and ch == "`":
+                    template = False
+                elif ch == quote:
+                    quote = None
+            elif line.startswith("//", i):
+                break
+            elif line.startswith("/*", i):
+                block_comment = True
+                i += 1
+            elif ch == "`":
+                template = True
+            elif ch in "'\"":
+                quote = ch
+            i += 1
+        if quote == '"':
+            lines.append(number)
+    return lines
+
+
+def _check_text(findings: List[Finding], path: str, text: str):
+    for i, line in enumerate(text.splitlines(), 1):
+        if has_placeholder(line):
+            findings.append(Finding("placeholder", path, i, f"placeholder text: {line.strip()[:80]}"))
+        if _BASE_URL_RE.search(line):
+            findings.append(Finding(
+                "vue-cli-syntax", path, i, "<%= BASE_URL %> is Vue CLI syntax; use a relative path for Vite"
+            ))
+    if path.endswith(_JS_EXTENSIONS):
+        for i in _unclosed_double_quotes(text):
+            findings.append(Finding("unbalanced-quotes", path, i, "unmatched double quote"))
+
+
+def run_rules(code: str) -> Tuple[List[Finding], bool]:
+    """Check the project embedded in a build script.
+
+    Returns the findings and whether the embedded files could all be recovered
+    (when they could not, the raw script text is scanned instead).
+    """
+    source = strip_code_fences(code)
+    findings: List[Finding] = []
+    analysis = analyze_script(source)
+    if analysis.syntax_error:
+        findings.append(Finding(
+            "syntax", "output.py", None,
+            f"Python syntax error ({analysis.syntax_error}) - check for unclosed strings or unmatched quotes",
+        ))
+        return findings, False
+
+    base = analysis.project_path
+    files = {
+        posixpath.relpath(path, base) if base and path.startswith(base + "/") else path: content
+        for path, content in analysis.files().items()
+    }
+    names = {posixpath.basename(p) for p in files}
+    names |= {posixpath.basename(op.path) for op in analysis.writes if op.path}
+
+    for path, content in files.items():
+        _check_text(findings, path, content)
+        if path.endswith(".json"):
+            try:
+                data = json.loads(content)
+            except ValueError as e:
+                findings.append(Finding("invalid-json", path, None, f"invalid JSON: {e}"))
+                continue
+            if posixpath.basename(path) == "package.json" and isinstance(data, dict):
+                deps = {**(data.get("devDependencies") or {}), **(data.get("dependencies") or {})}
+                _check_dependencies(findings, path, deps, _line_finder(content))
+
+    if not analysis.complete:
+        # Some content is computed at runtime; fall back to scanning the script itself
+        _check_text(findings, "output.py", source)
+        deps = {name: spec for name, spec in _DEP_RE.findall(source)}
+        _check_dependencies(findings, "output.py", deps, _line_finder(source))
+        if "vue.config.js" in source:
+            names.add("vue.config.js")
+
+    if "vue.config.js" in names:
+        findings.append(Finding(
+            "vue-cli-config", "vue.config.js", None, "Vue projects must use vite.config.js, not vue.config.js"
+        ))
+
+    return findings, analysis.complete
+
+
+def render_findings(findings: List[Finding]) -> str:
+    """Findings in the reviewer's "ISSUES FOUND" format, so the refactorer reads them unchanged."""
+    return "ISSUES FOUND:\n" + "\n".join(f.render() for f in findings)
+
+
+class RuleReviewAgent(BaseAgent):
+    """First step of each review iteration: promote the last refactor, run the rules."""
+
+    source_key: str = "generated_code"
+    refactored_key: str = "refactored_code"
+    review_key: str = "review_comments"
+    llm_review_mode: str = "auto"  # "auto" | "always" | "never"
+
+    async def _run_async_impl(self, ctx: InvocationContext) -> AsyncGenerator[Event, None]:
+        state = ctx.session.state
+        delta: Dict[str, Any] = {}
+
+        if "review_loop_started_at" not in state:
+            delta["review_loop_started_at"] = time.time()
+            delta["review_loop_tokens_start"] = invocation_tokens(ctx)
+            delta["review_iteration"] = 1
+        else:
+            delta["review_iteration"] = state.get("review_iteration", 1) + 1
+
+        # Review the refactored code from the previous iteration, not the first draft
+        code = state.get(self.source_key) or ""
+        refactored = state.get(self.refactored_key)
+        if refactored and strip_code_fences(refactored) != strip_code_fences(code):
+            code = strip_code_fences(refactored)
+            delta[self.source_key] = code
+
+        start = time.monotonic()
+        findings, complete = run_rules(code)
+        rules_passed = not findings
+        delta["rule_findings"] = [f._asdict() for f in findings]
+        delta["rules_passed"] = rules_passed
+
+        content = None
+        if not rules_passed:
+            # Already a rejection; an LLM review would only add cost
+            review_source = "rules"
+            delta[self.review_key] = render_findings(findings)
+        elif self.llm_review_mode == "always" or (
+            self.llm_review_mode == "auto" and not state.get("review_approved")
+        ):
+            review_source = "llm"
+            delta[self.review_key] = ""
+        else:
+            review_source = "rules"
+            delta[self.review_key] = APPROVED_TEXT
+        delta["review_source"] = review_source
+        if review_source == "rules":
+            content = genai_types.Content(role="model", parts=[genai_types.Part(text=delta[self.review_key])])
+
+        emit_event("review.rules", {
+            "iteration": delta["review_iteration"],
+            "passed": rules_passed,
+            "findings": len(findings),
+            "filesRecovered": complete,
+            "llmReview": review_source == "llm",
+            "ms": round((time.monotonic() - start) * 1000, 1),
+        })
+
+        yield Event(
+            author=self.name,
+            invocation_id=ctx.invocation_id,
+            branch=ctx.branch,
+            content=content,
+            actions=EventActions(state_delta=delta),
+        )
+
+
+def invocation_tokens(ctx: InvocationContext) -> int:
+    total = 0
+    for event in ctx.session.events:
+        usage = getattr(event, "usage_metadata", None)
+        if event.invocation_id == ctx.invocation_id and usage is not None:
+            total += usage.total_token_count or 0
+    return total
+
+
+class ReviewLoopControlAgent(BaseAgent):
+    """Ends the review loop on approval or when the time/token budget is spent."""
+
+    review_key: str = "review_comments"
+    time_budget_s: float = 300.0
+    token_budget: int = 0  # 0 = unlimited
+
+    async def _run_async_impl(self, ctx: InvocationContext) -> AsyncGenerator[Event, None]:
+        state = ctx.session.state
+        delta: Dict[str, Any] = {}
+        approved = bool(state.get("rules_passed")) and is_approved(state.get(self.review_key))
+        if approved and state.get("review_source") == "llm":
+            delta["review_approved"] = True
+        if approved:
+            # The loop ends before the refactor gates; hand the reviewed code on as they would
+            delta.update(approved_promotion(state))
+
+        elapsed = time.time() - state.get("review_loop_started_at", time.time())
+        tokens = invocation_tokens(ctx) - state.get("review_loop_tokens_start", 0)
+        reason = None
+        if approved:
+            reason = "approved"
+        elif self.time_budget_s and elapsed >= self.time_budget_s:
+            reason = "time_budget"
+        elif self.token_budget and tokens >= self.token_budget:
+            reason = "token_budget"
+
+        emit_event("review.iteration", {
+            "iteration": state.get("review_iteration", 1),
+            "approved": approved,
+            "elapsedS": round(elapsed, 2),
+            "tokens": tokens,
+            "exit": reason,
+        })
+
+        yield Event(
+            author=self.name,
+            invocation_id=ctx.invocation_id,
+            branch=ctx.branch,
+            actions=EventActions(state_delta=delta, escalate=True if reason else None),
+        )
@@ -0,0 +1,361 @@
+# routing.py — per-agent model routes with latency-aware failover
+# ============================================
+#
+# Every LlmAgent used to call the one global LLM_MODEL, so mechanical stages
+# paid flagship latency and a slow or rate-limited model slowed the whole
+# pipeline. A route maps agent names to a primary model and ordered fallbacks:
+#
+#   "TestingAgent=gemini-2.5-flash-lite|gemini-2.5-flash,Code*Agent=gemini-2.5-pro|gemini-2.5-flash"
+#
+# Names are fnmatch patterns, tried in order; "default" (or an agent nobody
+# matched) gets the default route. Each agent gets a RoutedLlm that tries the
+# route's models in order, skipping models that currently breach their SLO:
+#
+#   - p95 latency to the first response chunk above slo_p95_ms (the first
+#     chunk does not depend on how much the agent writes; the clock starts
+#     once the call holds its ModelLimiter permit), or
+#   - error rate above slo_error_rate,
+#
+# both over the calls of the last window_s seconds, once min_samples calls
+# were seen. A breaching model is skipped for cooldown_s and then gets a fresh
+# window. When every model of a route breaches, the route order is kept. A
+# call that fails before its first chunk moves on to the next model
+# (model.failover); once output has been streamed, the error is raised as is.
+# The model that answered is stamped into the response's custom_metadata and
+# reported in agent.start (metrics.py).
+#
+# Before failing over, a model gets its retries: rate limits and transient
+# errors are retried after a jittered backoff, and short agents can be hedged
+# (resilience.py). Retry and hedge counts are part of the router's metrics.
+
+import asyncio
+import time
+from collections import deque
+from fnmatch import fnmatchcase
+from typing import Any, AsyncGenerator, Deque, Dict, List, Optional, Tuple
+
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.adk.models.registry import LLMRegistry
+
+from adk_pipeline.events import emit_event
+from adk_pipeline.resilience import RATE_LIMIT, HedgePolicy, RetryPolicy, classify_error, hedged, retry_after_s
+
+Route = Tuple[str, ...]
+
+
+def parse_model_routes(spec: str, default_model: Optional[str]) -> Tuple[List[Tuple[str, Route]], Route]:
+    """"TestingAgent=a|b,default=c" -> ([("TestingAgent", ("a", "b"))], ("c",)); the default falls back to default_model."""
+    routes: List[Tuple[str, Route]] = []
+    default: Route = (default_model,) if default_model else ()
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        pattern, _, models = item.partition("=")
+        route = tuple(filter(None, (m.strip() for m in models.split("|"))))
+        if not route:
+            raise ValueError(f"model route {item!r} names no model")
+        if pattern.strip() == "default":
+            default = route
+        else:
+            routes.append((pattern.strip(), route))
+    return routes, default
+
+
+class _ModelHealth:
+    def __init__(self):
+        self.samples: Deque[Tuple[float, Optional[float]]] = deque()  # (at, latency ms or None for an error)
+        self.down_until = 0.0
+        self.throttled_until = 0.0  # the provider asked us to back off
+        self.calls = 0
+        self.errors = 0
+        self.breaches = 0
+        self.retries = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    def trim(self, now: float, window_s: float):
+        while self.samples and now - self.samples[0][0] > window_s:
+            self.samples.popleft()
+
+    def p95_ms(self) -> Optional[float]:
+        latencies = sorted(ms for _, ms in self.samples if ms is not None)
+        if not latencies:
+            return None
+        return latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))]
+
+    def error_rate(self) -> float:
+        return sum(1 for _, ms in self.samples if ms is None) / len(self.samples) if self.samples else 0.0
+
+
+class ModelRouter:
+    def __init__(
+        self,
+        routes: List[Tuple[str, Route]],
+        default: Route,
+        slo_p95_ms: float = 30000.0,
+        slo_error_rate: float = 0.25,
+        window_s: float = 300.0,
+        min_samples: int = 5,
+        cooldown_s: float = 60.0,
+        retry: Optional[RetryPolicy] = None,
+        hedge: Optional[HedgePolicy] = None,
+        limiter: Any = None,  # scheduler.ModelLimiter; every attempt holds a permit, hedges only take free ones
+    ):
+        self.routes = routes
+        self.default = default
+        self.slo_p95_ms = slo_p95_ms
+        self.slo_error_rate = slo_error_rate
+        self.window_s = window_s
+        self.min_samples = min_samples
+        self.cooldown_s = cooldown_s
+        self.retry = retry or RetryPolicy(retries=0)
+        self.hedge = hedge
+        self.limiter = limiter
+        self._health: Dict[str, _ModelHealth] = {}
+        self._llms: Dict[str, BaseLlm] = {}
+        self._agents: Dict[str, Dict[str, int]] = {}
+
+    def route(self, agent: str) -> Route:
+        for pattern, route in self.routes:
+            if fnmatchcase(agent, pattern):
+                return route
+        return self.default
+
+    def llm(self, agent: str) -> Any:
+        """The `model` argument for LlmAgent `agent`: a RoutedLlm, or None when no model is configured at all."""
+        route = self.route(agent)
+        return RoutedLlm(model=route[0], agent=agent, router=self) if route else None
+
+    def resolve(self, model: str) -> BaseLlm:
+        if model not in self._llms:
+            self._llms[model] = LLMRegistry.new_llm(model)
+        return self._llms[model]
+
+    def _model_health(self, model: str) -> _ModelHealth:
+        return self._health.setdefault(model, _ModelHealth())
+
+    def available(self, model: str) -> bool:
+        health = self._model_health(model)
+        if not health.down_until:
+            return True
+        if time.monotonic() < health.down_until:
+            return False
+        # Cooldown over: judge the model on new calls only
+        health.down_until = 0.0
+        health.samples.clear()
+        return True
+
+    def candidates(self, agent: str) -> List[str]:
+        """The agent's route, models within their SLO first."""
+        route = self.route(agent)
+        healthy = [m for m in route if self.available(m)]
+        return healthy + [m for m in route if m not in healthy]
+
+    def record(self, model: str, latency_ms: Optional[float]):
+        """Count one call: its first-chunk latency, or None when it failed."""
+        now = time.monotonic()
+        health = self._model_health(model)
+        health.calls += 1
+        health.errors += latency_ms is None
+        health.samples.append((now, latency_ms))
+        health.trim(now, self.window_s)
+        if health.down_until or len(health.samples) < self.min_samples:
+            return
+        p95, error_rate = health.p95_ms(), health.error_rate()
+        if (p95 is not None and p95 > self.slo_p95_ms) or error_rate > self.slo_error_rate:
+            health.down_until = now + self.cooldown_s
+            health.breaches += 1
+            emit_event("model.breach", {
+                "model": model,
+                "p95Ms": round(p95, 1) if p95 is not None else None,
+                "errorRate": round(error_rate, 3),
+                "samples": len(health.samples),
+                "sloP95Ms": self.slo_p95_ms,
+                "sloErrorRate": self.slo_error_rate,
+                "cooldownS": self.cooldown_s,
+            })
+
+    def _count(self, agent: str, model: str, key: str):
+        health = self._model_health(model)
+        setattr(health, key, getattr(health, key) + 1)
+        counts = self._agents.setdefault(agent, {"retries": 0, "hedges": 0, "hedge_wins": 0})
+        counts[key] += 1
+
+    def retry_delay_s(self, agent: str, model: str, attempt: int, error: Exception) -> Optional[float]:
+        """How long to wait before retrying `model` after `error`, or None when it should not be retried."""
+        kind = classify_error(error)
+        if kind is None:
+            return None
+        retry_after = retry_after_s(error) if kind == RATE_LIMIT else None
+        delay = self.retry.delay_s(attempt, retry_after)
+        if delay is None:
+            return None
+        if kind == RATE_LIMIT:
+            # The other agents on this model wait too
+            health = self._model_health(model)
+            health.throttled_until = max(health.throttled_until, time.monotonic() + delay)
+        self._count(agent, model, "retries")
+        emit_event("model.retry", {
+            "agent": agent,
+            "model": model,
+            "attempt": attempt + 1,
+            "kind": kind,
+            "delayMs": round(delay * 1000, 1),
+            "error": str(error)[:300],
+        })
+        return delay
+
+    def throttled_s(self, model: str) -> float:
+        return max(0.0, self._model_health(model).throttled_until - time.monotonic())
+
+    async def call(
+        self, agent: str, model: str, llm_request: LlmRequest, stream: bool
+    ) -> AsyncGenerator[Tuple[LlmResponse, Optional[float]], None]:
+        """One attempt at `model`: waits out a throttle, then streams the call under one of the model's
+        limiter permits, hedged when the agent is.
+
+        Yields (response, first-chunk latency in ms); the latency is set on the
+        first response only and is measured from when the permit was held, so
+        the throttle and local queueing do not count against the model's SLO.
+        """
+        wait = self.throttled_s(model)
+        if wait > 0:
+            emit_event("model.wait", {"agent": agent, "model": model, "waitMs": round(wait * 1000, 1), "reason": "rate limit"})
+            await asyncio.sleep(wait)
+        if self.limiter:
+            async with self.limiter.permit(agent, model):
+                async for item in self._call(agent, model, llm_request, stream):
+                    yield item
+        else:
+            async for item in self._call(agent, model, llm_request, stream):
+                yield item
+
+    async def _call(
+        self, agent: str, model: str, llm_request: LlmRequest, stream: bool
+    ) -> AsyncGenerator[Tuple[LlmResponse, Optional[float]], None]:
+        llm = self.resolve(model)
+        hedge_after = self.hedge.delay_s(agent) if self.hedge else None
+        started = time.monotonic()
+        if hedge_after is None:
+            first = True
+            async for response in llm.generate_content_async(llm_request, stream=stream):
+                latency_s = None
+                if first:
+                    first = False
+                    latency_s = time.monotonic() - started
+                    if self.hedge:
+                        # Unhedged calls set the agent's p95 as well
+                        self.hedge.record(agent, latency_s)
+                yield response, latency_s * 1000 if latency_s is not None else None
+            return
+
+        requests = iter([llm_request])
+
+        def start():
+            # The duplicate gets its own request; the client may adjust it in place
+            request = next(requests, None) or llm_request.model_copy(
+                update={"config": llm_request.config.model_copy(deep=True)}
+            )
+            return llm.generate_content_async(request, stream=stream)
+
+        async def try_hedge() -> bool:
+            if self.throttled_s(model) > 0 or (self.limiter and not await self.limiter.try_acquire(model)):
+                return False
+            self._count(agent, model, "hedges")
+            emit_event("model.hedge", {"agent": agent, "model": model, "afterMs": round(hedge_after * 1000, 1)})
+            return True
+
+        def release():
+            if self.limiter:
+                self.limiter.release(model)
+
+        first = True
+        async for response, lane in hedged(start, hedge_after, try_hedge, release):
+            latency_s = None
+            if first:
+                first = False
+                latency_s = time.monotonic() - started
+                self.hedge.record(agent, latency_s)
+                if lane == 1:
+                    self._count(agent, model, "hedge_wins")
+            yield response, latency_s * 1000 if latency_s is not None else None
+
+    def metrics(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        models = {}
+        for model, health in self._health.items():
+            health.trim(now, self.window_s)
+            p95 = health.p95_ms()
+            models[model] = {
+                "calls": health.calls,
+                "errors": health.errors,
+                "p95Ms": round(p95, 1) if p95 is not None else None,
+                "errorRate": round(health.error_rate(), 3),
+                "breaches": health.breaches,
+                "retries": health.retries,
+                "hedges": health.hedges,
+                "hedgeWins": health.hedge_wins,
+                "down": health.down_until > now,
+            }
+        agents = {
+            agent: {"retries": c["retries"], "hedges": c["hedges"], "hedgeWins": c["hedge_wins"]}
+            for agent, c in self._agents.items()
+        }
+        return {"models": models, "agents": agents}
+
+
+class RoutedLlm(BaseLlm):
+    """An LlmAgent's model: the first available model of its route, failing over on errors."""
+
+    agent: str
+    router: Any  # ModelRouter
+
+    @property
+    def capabilities(self):
+        # The first model of the route that resolves speaks for the route
+        for model in self.router.route(self.agent)[:-1]:
+            try:
+                return self.router.resolve(model).capabilities
+            except ValueError:
+                continue
+        return self.router.resolve(self.router.route(self.agent)[-1]).capabilities
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        candidates = self.router.candidates(self.agent)
+        for i, model in enumerate(candidates):
+            last = i == len(candidates) - 1
+            llm_request.model = model
+            attempt = 0
+            while True:
+                first = True
+                try:
+                    async for response, latency_ms in self.router.call(self.agent, model, llm_request, stream):
+                        if first:
+                            if response.error_code and not last:
+                                raise RuntimeError(f"{response.error_code}: {response.error_message}")
+                            first = False
+                            self.router.record(model, None if response.error_code else latency_ms)
+                        response.custom_metadata = {**(response.custom_metadata or {}), "model": model}
+                        yield response
+                    return
+                except Exception as e:
+                    if not first:
+                        # Output already reached the user; a retry would duplicate it
+                        raise
+                    self.router.record(model, None)
+                    delay = self.router.retry_delay_s(self.agent, model, attempt, e)
+                    if delay is None:
+                        error = e
+                        break
+                    attempt += 1
+                    await asyncio.sleep(delay)
+            if last:
+                raise error
+            emit_event("model.failover", {
+                "agent": self.agent,
+                "from": model,
+                "to": candidates[i + 1],
+                "error": str(error)[:300],
+            })
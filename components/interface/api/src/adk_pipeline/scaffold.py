@@ -0,0 +1,261 @@
+# scaffold.py — pre-validated scaffold snapshots for common stacks
+# ============================================
+#
+# React, Vue and Express requests all start from the same Vite config,
+# package.json skeleton, .gitignore and README. Those live here as versioned
+# snapshots (scaffolds/*.json). When the business analysis clearly names one
+# stack, CodeWriterAgent is told which files already exist and writes only the
+# application-specific ones; ScaffoldMergeAgent then injects the snapshot into
+# its script as SCAFFOLD_FILES + create_scaffold(), so output.py stays a single
+# self-contained builder for every later stage.
+
+import ast
+import json
+import os
+import re
+import sys
+from typing import Any, AsyncGenerator, Dict, List, Optional
+
+from google.adk.agents import BaseAgent
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.events import Event, EventActions
+
+from adk_pipeline.events import emit_event
+from adk_pipeline.review_rules import run_rules
+from adk_pipeline.script import analyze_script, calls_scaffold, extra_dependencies, strip_code_fences
+
+SNAPSHOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "scaffolds")
+PROJECT_NAME_PLACEHOLDER = "__PROJECT_NAME__"
+
+_STACK_SECTION_RE = re.compile(r"##[^\n]*Technical Stack[^\n]*\n(.*?)(?=\n##\s|\Z)", re.DOTALL | re.IGNORECASE)
+_MAIN_GUARD_RE = re.compile(r"__name__\s*==\s*['\"]__main__['\"]")
+
+
+class Snapshot:
+    def __init__(self, data: Dict[str, Any]):
+        self.id: str = data["id"]
+        self.version: int = int(data["version"])
+        self.stack: str = data["stack"]
+        self.keywords: List[str] = [k.lower() for k in data["keywords"]]
+        self.exclude: List[str] = [k.lower() for k in data.get("exclude", [])]
+        self.files: Dict[str, str] = data["files"]
+        self.app_files: List[str] = data.get("app_files", [])
+
+    @property
+    def label(self) -> str:
+        return f"{self.id} v{self.version}"
+
+    def matches(self, text: str) -> bool:
+        text = text.lower()
+        return any(re.search(rf"\b{re.escape(k)}\b", text) for k in self.keywords) and not any(
+            re.search(rf"\b{re.escape(k)}\b", text) for k in self.exclude
+        )
+
+    def brief(self) -> str:
+        """Prompt section telling CodeWriterAgent what already exists and what to write."""
+        provided = "\n".join(f"- {path}" for path in self.files)
+        wanted = "\n".join(f"- {item}" for item in self.app_files)
+        return f"""**Scaffold Snapshot: {self.label} ({self.stack})**
+These files are ALREADY PROVIDED, pre-validated, and written before your files:
+{provided}
+
+Do NOT generate them again. Generate ONLY the application-specific files, for example:
+{wanted}
+
+Script rules for this scaffold:
+- In main(), call create_scaffold(project_path) right after computing project_path. It is injected into your script automatically - do NOT define it.
+- Need extra npm packages? Add module-level dicts EXTRA_DEPENDENCIES = {{...}} and EXTRA_DEV_DEPENDENCIES = {{...}} instead of writing package.json.
+- You MAY overwrite README.md with project-specific documentation.
+"""
+
+
+# package.json key for each of the script's extra dependency dicts
+_PACKAGE_KEYS = {"EXTRA_DEPENDENCIES": "dependencies", "EXTRA_DEV_DEPENDENCIES": "devDependencies"}
+
+
+def _scaffold_block(snapshot: Snapshot, files: Dict[str, str], needs_os_import: bool) -> str:
+    entries = "\n".join(f"    {path!r}: {content!r}," for path, content in files.items())
+    header = "import os\n\n" if needs_os_import else ""
+    return f"""{header}# --- scaffold snapshot {snapshot.label}: {snapshot.stack} ---
+# Written first by create_scaffold(); application files created afterwards override it.
+SCAFFOLD_FILES = {{
+{entries}
+}}
+
+
+def create_scaffold(project_path):
+    project_name = os.path.basename(os.path.normpath(project_path))
+    for relative_path, content in SCAFFOLD_FILES.items():
+        path = os.path.join(project_path, relative_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(content.replace({PROJECT_NAME_PLACEHOLDER!r}, project_name))
+    print("✓ Scaffold {snapshot.label}: " + str(len(SCAFFOLD_FILES)) + " files")
+
+
+"""
+
+
+def merge_scaffold(code: str, snapshot: Snapshot) -> Optional[str]:
+    """Inject the snapshot into CodeWriterAgent's delta script.
+
+    Returns None when the script gives no way to know where the scaffold goes
+    (no create_scaffold() call and no statically known project path).
+    """
+    source = strip_code_fences(code)
+    try:
+        tree = ast.parse(source)
+    except SyntaxError:
+        return None
+    if any(isinstance(n, ast.FunctionDef) and n.name == "create_scaffold" for n in tree.body):
+        return source  # already merged (e.g. a refactored script)
+
+    files = dict(snapshot.files)
+    extras = extra_dependencies(tree)
+    if extras and "package.json" in files:
+        pkg = json.loads(files["package.json"])
+        for name, deps in extras.items():
+            key = _PACKAGE_KEYS[name]
+            pkg[key] = {**pkg.get(key, {}), **deps}
+        files["package.json"] = json.dumps(pkg, indent=2) + "\n"
+
+    lines = source.splitlines()
+    if not calls_scaffold(tree):
+        # The writer forgot the call: run the scaffold first thing under the main guard
+        project_path = analyze_script(source).project_path
+        guard = next((
+            n for n in tree.body
+            if isinstance(n, ast.If) and _MAIN_GUARD_RE.search(ast.get_source_segment(source, n.test) or "")
+        ), None)
+        if not project_path or guard is None:
+            return None
+        first = guard.body[0]
+        indent = lines[first.lineno - 1][:first.col_offset]
+        lines.insert(first.lineno - 1, f"{indent}create_scaffold({project_path!r})")
+
+    imports_os = any(
+        isinstance(n, ast.Import) and any(a.name == "os" and not a.asname for a in n.names) for n in tree.body
+    )
+    # Insert before the first top-level definition so the writer's imports stay on top
+    anchor = next((n for n in tree.body if isinstance(n, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef))), None)
+    if anchor is None:
+        anchor = next((n for n in tree.body if not isinstance(n, (ast.Import, ast.ImportFrom, ast.Expr))), None)
+    at = (min([anchor.lineno] + [d.lineno for d in getattr(anchor, "decorator_list", [])]) - 1) if anchor else len(lines)
+    block = _scaffold_block(snapshot, files, needs_os_import=not imports_os)
+    return "\n".join(lines[:at] + block.splitlines() + lines[at:]).rstrip() + "\n"
+
+
+_SELF_CHECK_SCRIPT = """import os
+
+
+def main():
+    project_path = os.path.join("/scaffold-check", "app")
+    create_scaffold(project_path)
+
+
+if __name__ == "__main__":
+    main()
+"""
+
+
+def _self_check(snapshot: Snapshot) -> List[str]:
+    problems = []
+    for path, content in snapshot.files.items():
+        if path.endswith(".json"):
+            try:
+                json.loads(content.replace(PROJECT_NAME_PLACEHOLDER, "app"))
+            except ValueError as e:
+                problems.append(f"{path}: {e}")
+    merged = merge_scaffold(_SELF_CHECK_SCRIPT, snapshot)
+    if merged is None:
+        problems.append("snapshot could not be merged into a minimal script")
+    else:
+        findings, complete = run_rules(merged)
+        problems += [f.render() for f in findings]
+        if not complete:
+            problems.append("merged snapshot is not statically analyzable")
+    return problems
+
+
+def load_snapshots(directory: str = SNAPSHOT_DIR) -> Dict[str, Snapshot]:
+    """Load every snapshot that passes validation; broken ones are skipped with a warning."""
+    snapshots = {}
+    if not os.path.isdir(directory):
+        return snapshots
+    for name in sorted(os.listdir(directory)):
+        if not name.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(directory, name), "r", encoding="utf-8") as f:
+                snapshot = Snapshot(json.load(f))
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Skipping scaffold {name}: {e}", file=sys.stderr, flush=True)
+            continue
+        problems = _self_check(snapshot)
+        if problems:
+            print(f"Skipping scaffold {snapshot.label}: {'; '.join(problems)}", file=sys.stderr, flush=True)
+            continue
+        snapshots[snapshot.id] = snapshot
+    return snapshots
+
+
+def select_snapshot(snapshots: Dict[str, Snapshot], analysis: str, request: str = "") -> Optional[Snapshot]:
+    """Pick a snapshot only when the analysis names exactly one known stack."""
+    match = _STACK_SECTION_RE.search(analysis or "")
+    text = match.group(1) if match else f"{request}\n{analysis}"
+    candidates = [s for s in snapshots.values() if s.matches(text)]
+    return candidates[0] if len(candidates) == 1 else None
+
+
+class ScaffoldSelectorAgent(BaseAgent):
+    """Runs after BusinessAnalystAgent; sets scaffold_id and the writer's scaffold_brief."""
+
+    snapshots: Dict[str, Any]
+    analysis_key: str = "requirements_analysis"
+
+    async def _run_async_impl(self, ctx: InvocationContext) -> AsyncGenerator[Event, None]:
+        state = ctx.session.state
+        snapshot = select_snapshot(self.snapshots, state.get(self.analysis_key) or "", state.get("user_request") or "")
+        if snapshot is not None:
+            delta = {"scaffold_id": snapshot.id, "scaffold_brief": snapshot.brief()}
+            emit_event("scaffold.select", {"scaffold": snapshot.id, "version": snapshot.version})
+        else:
+            delta = {"scaffold_id": "", "scaffold_brief": ""}
+            emit_event("scaffold.select", {"scaffold": None})
+        yield Event(
+            author=self.name,
+            invocation_id=ctx.invocation_id,
+            branch=ctx.branch,
+            actions=EventActions(state_delta=delta),
+        )
+
+
+class ScaffoldMergeAgent(BaseAgent):
+    """Runs after CodeWriterAgent; folds the selected snapshot into generated_code."""
+
+    snapshots: Dict[str, Any]
+    code_key: str = "generated_code"
+
+    async def _run_async_impl(self, ctx: InvocationContext) -> AsyncGenerator[Event, None]:
+        state = ctx.session.state
+        snapshot = self.snapshots.get(state.get("scaffold_id") or "")
+        delta = {}
+        if snapshot is not None:
+            merged = merge_scaffold(state.get(self.code_key) or "", snapshot)
+            if merged is None:
+                emit_event("scaffold.merge", {"scaffold": snapshot.id, "merged": False})
+            else:
+                delta[self.code_key] = merged
+                emit_event("scaffold.merge", {
+                    "scaffold": snapshot.id,
+                    "version": snapshot.version,
+                    "merged": True,
+                    "scaffoldFiles": len(snapshot.files),
+                    "scaffoldBytes": sum(len(c.encode("utf-8")) for c in snapshot.files.values()),
+                })
+        yield Event(
+            author=self.name,
+            invocation_id=ctx.invocation_id,
+            branch=ctx.branch,
+            actions=EventActions(state_delta=delta),
+        )
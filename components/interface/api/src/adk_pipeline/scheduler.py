@@ -0,0 +1,188 @@
+# scheduler.py — bounded concurrent pipeline runs inside one worker process
+# ============================================
+#
+# JobScheduler runs up to `max_concurrent` pipelines at once. Jobs beyond that
+# wait in FIFO order, at most `max_queue` of them; anything past that is
+# rejected straight away (admission control), so a burst fails fast instead of
+# timing out in a queue nobody drains.
+#
+# ModelLimiter bounds concurrent calls per model name. RoutedLlm (routing.py)
+# takes the permit for the model it is actually calling, so a call that failed
+# over counts against the fallback model rather than the route's primary. The
+# provider's rate limit, not the worker, is usually what saturates first, and
+# one pipeline only ever has a single call in flight.
+#
+# Queue depth and waits are reported as scheduler.queued / scheduler.admitted
+# and model.wait events on the job's own event stream.
+
+import asyncio
+import time
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterator, Optional, Tuple
+
+from adk_pipeline.events import emit_event
+
+
+class QueueFull(Exception):
+    pass
+
+
+class JobScheduler:
+    def __init__(self, max_concurrent: int = 2, max_queue: int = 16):
+        self.max_concurrent = max(1, max_concurrent)
+        self.max_queue = max_queue
+        self.running = 0
+        self.waiting = 0
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._stats = {"admitted": 0, "rejected": 0, "waitMsTotal": 0.0, "waitMsMax": 0.0}
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        # Created on first use so it belongs to the worker's event loop
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_concurrent)
+        return self._slots
+
+    async def run(self, job_id: str, job: Callable[[], Awaitable[Any]]) -> Any:
+        """Run `job` once a slot is free. Raises QueueFull when the queue is at its limit."""
+        slots = self._semaphore()
+        must_wait = self.running >= self.max_concurrent or self.waiting > 0
+        if must_wait and self.waiting >= self.max_queue:
+            self._stats["rejected"] += 1
+            emit_event("scheduler.rejected", {"jobId": job_id, "queueDepth": self.waiting, "running": self.running})
+            raise QueueFull(f"ADK worker queue is full ({self.waiting} waiting, {self.running} running)")
+
+        enqueued = time.monotonic()
+        if must_wait:
+            emit_event("scheduler.queued", {
+                "jobId": job_id,
+                "position": self.waiting + 1,
+                "queueDepth": self.waiting + 1,
+                "running": self.running,
+            })
+        self.waiting += 1
+        try:
+            await slots.acquire()
+        finally:
+            self.waiting -= 1
+
+        wait_ms = (time.monotonic() - enqueued) * 1000
+        self.running += 1
+        self._stats["admitted"] += 1
+        self._stats["waitMsTotal"] += wait_ms
+        self._stats["waitMsMax"] = max(self._stats["waitMsMax"], wait_ms)
+        emit_event("scheduler.admitted", {
+            "jobId": job_id,
+            "waitMs": round(wait_ms, 1),
+            "queueDepth": self.waiting,
+            "running": self.running,
+            "maxConcurrent": self.max_concurrent,
+        })
+        try:
+            return await job()
+        finally:
+            self.running -= 1
+            slots.release()
+
+    def metrics(self) -> Dict[str, Any]:
+        admitted = self._stats["admitted"]
+        return {
+            "running": self.running,
+            "queued": self.waiting,
+            "maxConcurrent": self.max_concurrent,
+            "maxQueue": self.max_queue,
+            "admitted": admitted,
+            "rejected": self._stats["rejected"],
+            "waitMsAvg": round(self._stats["waitMsTotal"] / admitted, 1) if admitted else None,
+            "waitMsMax": round(self._stats["waitMsMax"], 1),
+        }
+
+
+def parse_model_limits(spec: str) -> Tuple[Dict[str, int], int]:
+    """"gemini-2.5-flash=4,default=8" -> ({"gemini-2.5-flash": 4}, 8). 0 means unlimited."""
+    limits: Dict[str, int] = {}
+    default = 0
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, value = item.rpartition("=")
+        if name in ("", "default"):
+            default = int(value)
+        else:
+            limits[name] = int(value)
+    return limits, default
+
+
+# Permits held by the current job, one key per call
+_held_permits: ContextVar[Optional[Dict[object, asyncio.Semaphore]]] = ContextVar(
+    "adk_model_permits", default=None
+)
+
+
+class ModelLimiter:
+    def __init__(self, limits: Optional[Dict[str, int]] = None, default: int = 0):
+        self.limits = limits or {}
+        self.default = default
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+
+    def _semaphore(self, model: str) -> Optional[asyncio.Semaphore]:
+        limit = self.limits.get(model, self.default)
+        if limit <= 0:
+            return None
+        if model not in self._semaphores:
+            self._semaphores[model] = asyncio.Semaphore(limit)
+        return self._semaphores[model]
+
+    @contextmanager
+    def job_scope(self) -> Iterator[None]:
+        """Track this job's permits; any a cancelled call still holds are returned on exit."""
+        held: Dict[object, asyncio.Semaphore] = {}
+        token = _held_permits.set(held)
+        try:
+            yield
+        finally:
+            _held_permits.reset(token)
+            for semaphore in held.values():
+                semaphore.release()
+            held.clear()
+
+    @asynccontextmanager
+    async def permit(self, agent: str, model: str) -> AsyncIterator[None]:
+        """Hold one of `model`'s permits for the duration of a call `agent` makes to it."""
+        semaphore = self._semaphore(model)
+        if semaphore is None:
+            yield
+            return
+        started = time.monotonic()
+        await semaphore.acquire()
+        held = _held_permits.get()
+        key = object()
+        if held is not None:
+            held[key] = semaphore
+        wait_ms = (time.monotonic() - started) * 1000
+        if wait_ms >= 1:
+            emit_event("model.wait", {
+                "agent": agent,
+                "model": model,
+                "waitMs": round(wait_ms, 1),
+                "limit": self.limits.get(model, self.default),
+            })
+        try:
+            yield
+        finally:
+            # job_scope may have returned it already for a call cancelled midway
+            if held is None or held.pop(key, None) is not None:
+                semaphore.release()
+
+    async def try_acquire(self, model: str) -> bool:
+        """Take a permit for an extra call (a hedged request) only if one is free right now."""
+        semaphore = self._semaphore(model)
+        if semaphore is None:
+            return True
+        if semaphore.locked():
+            return False
+        await semaphore.acquire()
+        return True
+
+    def release(self, model: str):
+        semaphore = self._semaphore(model)
+        if semaphore is not None:
+            semaphore.release()
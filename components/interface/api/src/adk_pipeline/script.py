@@ -0,0 +1,609 @@
+# script.py — helpers for the generated project-builder script (output.py)
+# ============================================
+
+import ast
+import json
+import os
+import posixpath
+import re
+import tempfile
+import textwrap
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+_OPEN_FENCE_RE = re.compile(r"^[ \t]*```[ \t]*(python3?|py)?[ \t]*$", re.IGNORECASE)
+_CLOSE_FENCE_RE = re.compile(r"^[ \t]*```[ \t]*$")
+_SHEBANG = "#!/usr/bin/env python"
+_CODE_START_RE = re.compile(r"^(#!|import |from \S+ import |def |class |if __name__)")
+
+
+def strip_code_fences(text: str) -> str:
+    """Return just the Python source from an LLM reply.
+
+    Models sometimes wrap the script in ```python fences or put a short
+    analysis in front of it. The script itself often writes READMEs that
+    contain fences, so the code runs from the first opening fence to the
+    *last* closing one rather than to the next fence.
+    """
+    if not text:
+        return ""
+    lines = text.splitlines()
+    start = next((i for i, line in enumerate(lines) if _OPEN_FENCE_RE.match(line)), None)
+    # A fence that only shows up after code has started belongs to a string in the script
+    if start is not None and any(_CODE_START_RE.match(line) for line in lines[:start]):
+        start = None
+    if start is not None:
+        end = next(
+            (i for i in range(len(lines) - 1, start, -1) if _CLOSE_FENCE_RE.match(lines[i])),
+            len(lines),
+        )
+        code = "\n".join(lines[start + 1:end])
+    elif _SHEBANG in text:
+        code = text[text.index(_SHEBANG):]
+    else:
+        code = text
+    return code.strip() + "\n"
+
+
+def write_atomic(path: str, content: str):
+    """Write via a temp file in the same directory and rename over the target,
+    so readers never see a half-written script."""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix=".tmp-", suffix=os.path.basename(path), dir=directory)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+# TODO/FIXME count as markers only in a comment and in capitals, so a todo
+# app's `const todo` or <h1>Todo list</h1> is not a placeholder; the filler
+# phrases count anywhere
+_MARKER_RE = re.compile(r"(?://|#|/\*|<!--|^\s*\*)[^\n]*?\b(?:TODO|FIXME)\b")
+_FILLER_RE = re.compile(r"add your code here|implement this later|content goes here", re.IGNORECASE)
+
+
+def has_placeholder(line: str) -> bool:
+    """Whether a line of generated code is left unfinished (the reviewer's and the validator's rule)."""
+    return bool(_MARKER_RE.search(line) or _FILLER_RE.search(line))
+
+
+# ============================================================================
+# STATIC ANALYSIS OF THE BUILD SCRIPT
+# ============================================================================
+# Generated scripts are straight-line builders: compute a project path, then
+# call a create_file() helper and os.makedirs() with literal content. Walking
+# the AST with simple constant propagation recovers most targets and contents
+# without executing anything. Whatever cannot be resolved is reported as such
+# so callers can tell "checked" from "could not check".
+
+UNKNOWN = object()
+
+_MAX_LOOP_ITERATIONS = 10_000
+_MAX_CALL_DEPTH = 8
+# The scripts are model-written, so evaluating them is bounded: a string or
+# list that would grow past _MAX_VALUE_CHARS evaluates to UNKNOWN, and the
+# walk stops (marking the analysis truncated) after _MAX_STATEMENTS
+# statements in total, however the loops and calls nest
+_MAX_VALUE_CHARS = 1 << 20
+_MAX_STATEMENTS = 50_000
+_DIGITS_RE = re.compile(r"\d+")
+
+
+class FileOp(NamedTuple):
+    kind: str               # "create_file" | "makedirs" | "mkdir" | "open" | "write_text"
+    path: Optional[str]     # None when the target could not be resolved statically
+    content: Optional[str]  # file body for writes, when it resolved to a string
+    lineno: int
+
+
+class ScriptAnalysis:
+    def __init__(self):
+        self.tree: Optional[ast.AST] = None
+        self.syntax_error: Optional[str] = None
+        self.ops: List[FileOp] = []
+        self.calls: List[Tuple[str, int]] = []   # dotted names of every call, for safety checks
+        self.project_path: Optional[str] = None
+        self.truncated = False  # the statement budget ran out before the walk finished
+
+    @property
+    def writes(self) -> List[FileOp]:
+        return [op for op in self.ops if op.kind in ("create_file", "open", "write_text")]
+
+    @property
+    def unresolved(self) -> List[FileOp]:
+        return [op for op in self.ops if op.path is None]
+
+    def files(self) -> Dict[str, str]:
+        """path -> content for every write whose path and content both resolved."""
+        return {
+            op.path: op.content for op in self.writes
+            if op.path is not None and op.content is not None
+        }
+
+    @property
+    def complete(self) -> bool:
+        """True when every file the script writes was recovered with its content."""
+        return self.syntax_error is None and not self.truncated and bool(self.writes) and all(
+            op.path is not None and op.content is not None for op in self.writes
+        )
+
+
+def _dotted(node: ast.AST) -> str:
+    if isinstance(node, ast.Name):
+        return node.id
+    if isinstance(node, ast.Attribute):
+        base = _dotted(node.value)
+        return f"{base}.{node.attr}" if base else node.attr
+    if isinstance(node, ast.Call):
+        return _dotted(node.func) + "()"
+    return ""
+
+
+def _find_writer_helpers(tree: ast.AST) -> Dict[str, Tuple[int, Optional[int]]]:
+    """Functions like create_file(path, content): name -> (path arg index, content arg index)."""
+    helpers = {}
+    for fn in ast.walk(tree):
+        if not isinstance(fn, ast.FunctionDef):
+            continue
+        params = [a.arg for a in fn.args.args]
+        path_idx = content_idx = None
+        for node in ast.walk(fn):
+            if not isinstance(node, ast.Call):
+                continue
+            name = _dotted(node.func)
+            if name == "open" and node.args and isinstance(node.args[0], ast.Name):
+                mode = node.args[1] if len(node.args) > 1 else next(
+                    (k.value for k in node.keywords if k.arg == "mode"), None)
+                if isinstance(mode, ast.Constant) and isinstance(mode.value, str) and mode.value[:1] in "wax":
+                    if node.args[0].id in params:
+                        path_idx = params.index(node.args[0].id)
+            elif name.endswith(".write_text") and node.args and isinstance(node.args[0], ast.Name):
+                if node.args[0].id in params:
+                    content_idx = params.index(node.args[0].id)
+                    base = node.func.value
+                    if isinstance(base, ast.Call) and base.args and isinstance(base.args[0], ast.Name) \
+                            and base.args[0].id in params:
+                        path_idx = params.index(base.args[0].id)
+            elif name.endswith(".write") and node.args and isinstance(node.args[0], ast.Name):
+                if node.args[0].id in params:
+                    content_idx = params.index(node.args[0].id)
+        if path_idx is not None:
+            helpers[fn.name] = (path_idx, content_idx)
+    return helpers
+
+
+def _size(value: Any, limit: int = _MAX_VALUE_CHARS, indent: int = 0, escape: int = 1, depth: int = 0) -> int:
+    """Upper bound on the length of `value` as text; stops counting once past `limit`.
+
+    indent and escape size json.dumps output: per-item indentation and the
+    worst-case growth of an escaped character.
+    """
+    if isinstance(value, str):
+        return len(value) * escape + 2
+    if isinstance(value, (list, tuple, dict)):
+        total = 2
+        for item in (value.items() if isinstance(value, dict) else value):
+            total += 2 + indent * (depth + 1) + _size(item, limit - total, indent, escape, depth + 1)
+            if total > limit:
+                break
+        return total
+    return 24  # numbers, booleans, None
+
+
+def _bounded(*values: Any) -> bool:
+    return sum(_size(v) for v in values) <= _MAX_VALUE_CHARS
+
+
+def _format_bounded(fmt: str, args: List[Any]) -> bool:
+    # Widths and precisions pad far past the inputs, whether they are written
+    # in the format ("%400000000s") or passed as arguments ("{:{}}", "%*s")
+    widths = sum(int(d) if len(d) < 8 else _MAX_VALUE_CHARS + 1 for d in _DIGITS_RE.findall(fmt))
+    numbers = sum(abs(a) for a in args if isinstance(a, int))
+    return widths + numbers + sum(_size(v) for v in (fmt, *args)) <= _MAX_VALUE_CHARS
+
+
+def _add(left: Any, right: Any) -> Any:
+    return left + right if _bounded(left, right) else UNKNOWN
+
+
+class _Walker:
+    def __init__(self, analysis: ScriptAnalysis, tree: ast.Module):
+        self.analysis = analysis
+        self.functions = {n.name: n for n in tree.body if isinstance(n, ast.FunctionDef)}
+        self.writers = _find_writer_helpers(tree)
+        self.call_stack: List[str] = []
+        self.statements = 0
+
+    # -- expression evaluation ---------------------------------------------
+    def eval(self, node: ast.AST, env: Dict[str, Any]) -> Any:
+        try:
+            return self._eval(node, env)
+        except Exception:
+            return UNKNOWN
+
+    def _eval(self, node, env):
+        if isinstance(node, ast.Constant):
+            return node.value
+        if isinstance(node, ast.Name):
+            return env.get(node.id, UNKNOWN)
+        if isinstance(node, ast.JoinedStr):
+            parts = []
+            for value in node.values:
+                if isinstance(value, ast.Constant):
+                    parts.append(str(value.value))
+                    continue
+                if value.format_spec is not None:
+                    return UNKNOWN
+                inner = self._eval(value.value, env)
+                if inner is UNKNOWN or not _bounded(inner, *parts):
+                    return UNKNOWN
+                parts.append(repr(inner) if value.conversion == ord("r") else str(inner))
+            return "".join(parts)
+        if isinstance(node, ast.BinOp):
+            left, right = self._eval(node.left, env), self._eval(node.right, env)
+            if left is UNKNOWN or right is UNKNOWN:
+                return UNKNOWN
+            if isinstance(node.op, ast.Add):
+                return _add(left, right)
+            if isinstance(node.op, ast.Div) and isinstance(left, str) and isinstance(right, str):
+                return posixpath.join(left, right) if _bounded(left, right) else UNKNOWN  # Path(...) / "name"
+            if isinstance(node.op, ast.Mod) and isinstance(left, str):
+                args = list(right.values()) if isinstance(right, dict) else list(right) if isinstance(right, tuple) else [right]
+                return left % right if _format_bounded(left, args) else UNKNOWN
+            return UNKNOWN
+        if isinstance(node, (ast.List, ast.Tuple)):
+            items = [self._eval(e, env) for e in node.elts]
+            return UNKNOWN if any(i is UNKNOWN for i in items) else (list(items) if isinstance(node, ast.List) else tuple(items))
+        if isinstance(node, ast.Dict):
+            result = {}
+            for k, v in zip(node.keys, node.values):
+                if k is None:
+                    return UNKNOWN
+                key, value = self._eval(k, env), self._eval(v, env)
+                if key is UNKNOWN or value is UNKNOWN:
+                    return UNKNOWN
+                result[key] = value
+            return result
+        if isinstance(node, ast.Subscript):
+            base, key = self._eval(node.value, env), self._eval(node.slice, env)
+            if base is UNKNOWN or key is UNKNOWN:
+                return UNKNOWN
+            return base[key]
+        if isinstance(node, ast.Attribute):
+            base = self._eval(node.value, env)
+            if isinstance(base, str) and node.attr == "parent":
+                return posixpath.dirname(base)
+            if isinstance(base, str) and node.attr == "name":
+                return posixpath.basename(base)
+            return UNKNOWN
+        if isinstance(node, ast.Call):
+            return self._eval_call(node, env)
+        return UNKNOWN
+
+    def _eval_call(self, node: ast.Call, env):
+        name = _dotted(node.func)
+        args = [self._eval(a, env) for a in node.args]
+        kwargs = {k.arg: self._eval(k.value, env) for k in node.keywords if k.arg}
+        known = all(a is not UNKNOWN for a in args)
+        if known and not _bounded(*args):
+            return UNKNOWN
+        if name in ("os.path.join", "Path", "pathlib.Path", "PurePath", "PosixPath") and known and args:
+            return posixpath.join(*[str(a) for a in args])
+        if name in ("os.path.dirname", "os.path.abspath", "os.path.normpath", "os.path.basename", "str") \
+                and known and len(args) == 1 and isinstance(args[0], str):
+            fn = {"os.path.dirname": posixpath.dirname, "os.path.abspath": posixpath.normpath,
+                  "os.path.normpath": posixpath.normpath, "os.path.basename": posixpath.basename,
+                  "str": str}[name]
+            return fn(args[0])
+        if name in ("json.dumps",) and known and args:
+            if any(v is UNKNOWN for v in kwargs.values()):
+                return UNKNOWN
+            options = {k: v for k, v in kwargs.items() if k in ("indent", "sort_keys", "ensure_ascii", "separators")}
+            indent = options.get("indent")
+            indent = len(indent) if isinstance(indent, str) else indent if isinstance(indent, int) else 0
+            # \uXXXX escapes make a character up to six long
+            if _size(args[0], indent=indent, escape=6) > _MAX_VALUE_CHARS:
+                return UNKNOWN
+            return json.dumps(args[0], **options)
+        if name in ("textwrap.dedent", "dedent") and known and len(args) == 1:
+            return textwrap.dedent(args[0])
+        if isinstance(node.func, ast.Attribute):
+            base = self._eval(node.func.value, env)
+            method = node.func.attr
+            if isinstance(base, str) and known:
+                if method in ("strip", "lstrip", "rstrip", "lower", "upper"):
+                    return getattr(base, method)(*args)
+                if method == "replace" and len(args) >= 2 and isinstance(args[0], str) and isinstance(args[1], str):
+                    matches = base.count(args[0]) if args[0] else len(base) + 1
+                    if len(base) + matches * len(args[1]) > _MAX_VALUE_CHARS:
+                        return UNKNOWN
+                    return base.replace(*args)
+                if method == "join" and len(args) == 1:
+                    if _size(args[0]) + len(base) * len(args[0]) > _MAX_VALUE_CHARS:
+                        return UNKNOWN
+                    return base.join(args[0])
+                if method == "format" and all(v is not UNKNOWN for v in kwargs.values()):
+                    if not _format_bounded(base, [*args, *kwargs.values()]):
+                        return UNKNOWN
+                    return base.format(*args, **kwargs)
+                if method in ("resolve", "absolute", "as_posix"):
+                    return base
+        return UNKNOWN
+
+    # -- statements ----------------------------------------------------------
+    def bind(self, target: ast.AST, value: Any, env: Dict[str, Any]):
+        if isinstance(target, ast.Name):
+            env[target.id] = value
+        elif isinstance(target, (ast.Tuple, ast.List)):
+            values = list(value) if isinstance(value, (list, tuple)) and len(value) == len(target.elts) else None
+            for i, elt in enumerate(target.elts):
+                self.bind(elt, values[i] if values is not None else UNKNOWN, env)
+
+    def walk(self, body: List[ast.stmt], env: Dict[str, Any]):
+        for stmt in body:
+            if self.analysis.truncated:
+                return
+            self.walk_stmt(stmt, env)
+
+    def walk_stmt(self, stmt: ast.stmt, env: Dict[str, Any]):
+        self.statements += 1
+        if self.statements > _MAX_STATEMENTS:
+            self.analysis.truncated = True
+            return
+        if isinstance(stmt, ast.Assign):
+            self.scan_calls(stmt.value, env)
+            value = self.eval(stmt.value, env)
+            for target in stmt.targets:
+                self.bind(target, value, env)
+        elif isinstance(stmt, ast.AnnAssign) and stmt.value is not None:
+            self.scan_calls(stmt.value, env)
+            self.bind(stmt.target, self.eval(stmt.value, env), env)
+        elif isinstance(stmt, ast.AugAssign) and isinstance(stmt.target, ast.Name):
+            self.scan_calls(stmt.value, env)
+            current, extra = env.get(stmt.target.id, UNKNOWN), self.eval(stmt.value, env)
+            ok = isinstance(stmt.op, ast.Add) and current is not UNKNOWN and extra is not UNKNOWN
+            try:
+                env[stmt.target.id] = _add(current, extra) if ok else UNKNOWN
+            except Exception:
+                env[stmt.target.id] = UNKNOWN
+        elif isinstance(stmt, ast.Expr):
+            self.scan_calls(stmt.value, env)
+        elif isinstance(stmt, ast.For):
+            iterable = self.eval(stmt.iter, env)
+            if isinstance(stmt.iter, ast.Call) and isinstance(stmt.iter.func, ast.Attribute) \
+                    and stmt.iter.func.attr == "items":
+                base = self.eval(stmt.iter.func.value, env)
+                iterable = list(base.items()) if isinstance(base, dict) else UNKNOWN
+            if isinstance(iterable, (list, tuple, dict, str)) and len(iterable) <= _MAX_LOOP_ITERATIONS:
+                for item in iterable:
+                    if self.analysis.truncated:
+                        break
+                    self.bind(stmt.target, item, env)
+                    self.walk(stmt.body, env)
+            else:
+                self.bind(stmt.target, UNKNOWN, env)
+                self.walk(stmt.body, env)
+            self.walk(stmt.orelse, env)
+        elif isinstance(stmt, ast.If):
+            test = self.eval(stmt.test, env)
+            if isinstance(stmt.test, ast.Compare) and _dotted(stmt.test.left) == "__name__":
+                test = True
+            if test is UNKNOWN:
+                self.walk(stmt.body, env)
+                self.walk(stmt.orelse, env)
+            else:
+                self.walk(stmt.body if test else stmt.orelse, env)
+        elif isinstance(stmt, ast.With):
+            for item in stmt.items:
+                expr = item.context_expr
+                if isinstance(expr, ast.Call) and _dotted(expr.func) == "open":
+                    path = self.eval(expr.args[0], env) if expr.args else UNKNOWN
+                    mode = self.eval(expr.args[1], env) if len(expr.args) > 1 else next(
+                        (self.eval(k.value, env) for k in expr.keywords if k.arg == "mode"), "r")
+                    if isinstance(mode, str) and mode[:1] in "wax" and not self._in_writer_helper():
+                        content = self._with_written_content(stmt.body, item.optional_vars, env)
+                        self.record("open", path, content, stmt.lineno)
+                    if item.optional_vars is not None:
+                        self.bind(item.optional_vars, UNKNOWN, env)
+                else:
+                    self.scan_calls(expr, env)
+            self.walk(stmt.body, env)
+        elif isinstance(stmt, ast.Try):
+            self.walk(stmt.body, env)
+            self.walk(stmt.orelse, env)
+            self.walk(stmt.finalbody, env)
+        elif isinstance(stmt, ast.Return) and stmt.value is not None:
+            self.scan_calls(stmt.value, env)
+
+    def _with_written_content(self, body, handle, env):
+        if handle is None:
+            return None
+        writes = [
+            n for n in ast.walk(ast.Module(body=body, type_ignores=[]))
+            if isinstance(n, ast.Call) and _dotted(n.func) == f"{_dotted(handle)}.write"
+        ]
+        if len(writes) != 1 or not writes[0].args:
+            return None
+        value = self.eval(writes[0].args[0], env)
+        return value if isinstance(value, str) else None
+
+    def _in_writer_helper(self) -> bool:
+        # Inside create_file(path, ...) the path is a parameter; call sites are checked instead
+        return bool(self.call_stack) and self.call_stack[-1] in self.writers
+
+    def scan_calls(self, node: ast.AST, env: Dict[str, Any]):
+        for call in [n for n in ast.walk(node) if isinstance(n, ast.Call)]:
+            name = _dotted(call.func)
+            self.analysis.calls.append((name, call.lineno))
+            if name in self.writers:
+                path_idx, content_idx = self.writers[name]
+                path = self.eval(call.args[path_idx], env) if len(call.args) > path_idx else UNKNOWN
+                content = None
+                if content_idx is not None and len(call.args) > content_idx:
+                    content = self.eval(call.args[content_idx], env)
+                self.record("create_file", path, content, call.lineno)
+            elif name in ("os.makedirs", "os.mkdir"):
+                if not self._in_writer_helper():
+                    path = self.eval(call.args[0], env) if call.args else UNKNOWN
+                    self.record("makedirs", path, None, call.lineno)
+            elif name.endswith(".mkdir") and isinstance(call.func, ast.Attribute):
+                if not self._in_writer_helper():
+                    self.record("mkdir", self.eval(call.func.value, env), None, call.lineno)
+            elif name.endswith(".write_text") and isinstance(call.func, ast.Attribute):
+                if not self._in_writer_helper():
+                    content = self.eval(call.args[0], env) if call.args else UNKNOWN
+                    self.record("write_text", self.eval(call.func.value, env), content, call.lineno)
+            elif name in self.functions and name not in self.call_stack \
+                    and len(self.call_stack) < _MAX_CALL_DEPTH:
+                self.call_function(self.functions[name], call, env)
+
+    def call_function(self, fn: ast.FunctionDef, call: ast.Call, caller_env: Dict[str, Any]):
+        # Module-level names stay visible; parameters bind to the evaluated arguments
+        env = dict(self.module_env)
+        params = fn.args.args
+        defaults = fn.args.defaults
+        for i, param in enumerate(params):
+            default_idx = i - (len(params) - len(defaults))
+            env[param.arg] = self.eval(defaults[default_idx], env) if default_idx >= 0 else UNKNOWN
+        for i, arg in enumerate(call.args[:len(params)]):
+            env[params[i].arg] = self.eval(arg, caller_env)
+        for kw in call.keywords:
+            if kw.arg:
+                env[kw.arg] = self.eval(kw.value, caller_env)
+        self.call_stack.append(fn.name)
+        try:
+            self.walk(fn.body, env)
+        finally:
+            self.call_stack.pop()
+        if "project_path" in env and isinstance(env["project_path"], str) and not self.analysis.project_path:
+            self.analysis.project_path = env["project_path"]
+
+    def record(self, kind: str, path: Any, content: Any, lineno: int):
+        self.analysis.ops.append(FileOp(
+            kind=kind,
+            path=posixpath.normpath(path) if isinstance(path, str) else None,
+            content=content if isinstance(content, str) else None,
+            lineno=lineno,
+        ))
+
+    def run(self, tree: ast.Module):
+        self.module_env: Dict[str, Any] = {"__name__": "__main__"}
+        for stmt in tree.body:
+            if isinstance(stmt, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef, ast.Import, ast.ImportFrom)):
+                continue
+            self.walk_stmt(stmt, self.module_env)
+        if not self.analysis.project_path and isinstance(self.module_env.get("project_path"), str):
+            self.analysis.project_path = self.module_env["project_path"]
+
+
+def analyze_script(source: str) -> ScriptAnalysis:
+    """Statically recover the directories and files a build script creates."""
+    analysis = ScriptAnalysis()
+    try:
+        tree = ast.parse(source)
+        compile(tree, "output.py", "exec")
+    except SyntaxError as e:
+        analysis.syntax_error = f"line {e.lineno}: {e.msg}"
+        return analysis
+    analysis.tree = tree
+    _Walker(analysis, tree).run(tree)
+    return analysis
+
+
+# Scripts built on a scaffold snapshot (scaffold.py) ask for npm packages
+# through these module-level dicts instead of writing package.json
+EXTRA_DEPENDENCY_NAMES = ("EXTRA_DEPENDENCIES", "EXTRA_DEV_DEPENDENCIES")
+
+
+def extra_dependencies(tree: ast.AST) -> Dict[str, Dict[str, str]]:
+    """EXTRA_DEPENDENCIES / EXTRA_DEV_DEPENDENCIES name -> the packages the script assigns to it."""
+    extras: Dict[str, Dict[str, str]] = {}
+    for stmt in getattr(tree, "body", []):
+        if isinstance(stmt, ast.Assign) and len(stmt.targets) == 1 and isinstance(stmt.targets[0], ast.Name):
+            name = stmt.targets[0].id
+            if name in EXTRA_DEPENDENCY_NAMES:
+                try:
+                    value = ast.literal_eval(stmt.value)
+                except ValueError:
+                    continue
+                if isinstance(value, dict):
+                    extras.setdefault(name, {}).update({str(k): str(v) for k, v in value.items()})
+    return extras
+
+
+def calls_scaffold(tree: ast.AST) -> bool:
+    """True when the script calls create_scaffold() anywhere."""
+    return any(
+        isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id == "create_scaffold"
+        for node in ast.walk(tree)
+    )
+
+
+# ============================================================================
+# RENDERING
+# ============================================================================
+
+def project_files(analysis: ScriptAnalysis) -> Optional[Dict[str, str]]:
+    """Relative path -> content, or None unless every write resolved to a file under project_path."""
+    base = analysis.project_path
+    if not base or not analysis.complete:
+        return None
+    files = {}
+    for path, content in analysis.files().items():
+        relative = posixpath.relpath(path, base)
+        if relative.startswith(".."):
+            return None
+        files[relative] = content
+    return files
+
+
+def render_script(
+    project_path: str,
+    files: Dict[str, str],
+    extras: Optional[Dict[str, Dict[str, str]]] = None,
+    scaffold: bool = False,
+) -> str:
+    """One straight-line builder that writes `files` (relative path -> content) under project_path."""
+    header = "".join(f"{name} = {value!r}\n" for name, value in (extras or {}).items())
+    if header:
+        header += "\n\n"
+    writes = "\n".join(
+        f"    create_file(os.path.join(project_path, {path!r}), {content!r})" for path, content in files.items()
+    )
+    scaffold_call = "    create_scaffold(project_path)\n" if scaffold else ""
+    return f"""#!/usr/bin/env python3
+import os
+
+
+{header}def create_file(path, content):
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        print("✓ Created: " + path)
+    except Exception as e:
+        print("✗ Error creating " + path + ": " + str(e))
+
+
+def main():
+    base_path = {posixpath.dirname(project_path)!r}
+    project_name = {posixpath.basename(project_path)!r}
+    project_path = os.path.join(base_path, project_name)
+    print("Creating " + project_name + " at: " + project_path)
+    os.makedirs(project_path, exist_ok=True)
+{scaffold_call}{writes}
+    print("✓ Project created successfully! (" + str({len(files)}) + " files)")
+
+
+if __name__ == "__main__":
+    main()
+"""
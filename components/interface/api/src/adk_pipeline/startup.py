@@ -0,0 +1,123 @@
+# startup.py — cold-start profiling for adk_service.py
+# ============================================
+#
+#   python3 adk_service.py --profile-startup [--budget-ms 1000]
+#
+# Starts a fresh interpreter with `-X importtime`, imports adk_service and
+# builds the agent graph, then reports where the time went: the import and
+# build phases, adk_service's direct imports by cumulative time, and the
+# slowest modules and packages by their own time. The exit status is non-zero
+# when import + build exceed the startup budget (ADK_STARTUP_BUDGET_MS), so the
+# check can run in CI. `-X importtime` itself adds a little overhead, so the
+# numbers are slightly pessimistic.
+
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List
+
+_IMPORTTIME_RE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+_PROBE = """
+import json, time
+started = time.perf_counter()
+import adk_service
+imported = time.perf_counter()
+adk_service.get_runner()
+built = time.perf_counter()
+print(json.dumps({"importMs": (imported - started) * 1000, "buildMs": (built - imported) * 1000}))
+"""
+
+
+def parse_importtime(output: str) -> List[Dict[str, Any]]:
+    """Rows of `-X importtime` output as {module, selfMs, cumulativeMs, depth}."""
+    rows = []
+    for line in output.splitlines():
+        match = _IMPORTTIME_RE.match(line)
+        if match:
+            rows.append({
+                "module": match.group(4),
+                "selfMs": int(match.group(1)) / 1000,
+                "cumulativeMs": int(match.group(2)) / 1000,
+                "depth": len(match.group(3)) // 2,
+            })
+    return rows
+
+
+def _direct_imports(rows: List[Dict[str, Any]], parent: str) -> List[Dict[str, Any]]:
+    # importtime prints children before their parent, one level deeper
+    index = next((i for i, r in enumerate(rows) if r["module"] == parent), None)
+    if index is None:
+        return []
+    depth = rows[index]["depth"] + 1
+    children = []
+    for row in reversed(rows[:index]):
+        if row["depth"] < depth:
+            break
+        if row["depth"] == depth:
+            children.append(row)
+    return children
+
+
+def _package(module: str) -> str:
+    parts = module.split(".")
+    return ".".join(parts[:2]) if parts[0] == "google" else parts[0]
+
+
+def profile_startup(src_dir: str, budget_ms: float, top: int = 15) -> Dict[str, Any]:
+    started = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _PROBE],
+        cwd=src_dir, env=os.environ.copy(), capture_output=True, text=True, timeout=300,
+    )
+    wall_ms = (time.perf_counter() - started) * 1000
+    if proc.returncode != 0:
+        raise RuntimeError("startup probe failed:\n" + "\n".join(proc.stderr.strip().splitlines()[-15:]))
+    phases = json.loads(proc.stdout.strip().splitlines()[-1])
+    rows = parse_importtime(proc.stderr)
+
+    packages: Dict[str, float] = {}
+    for row in rows:
+        packages[_package(row["module"])] = packages.get(_package(row["module"]), 0.0) + row["selfMs"]
+
+    startup_ms = phases["importMs"] + phases["buildMs"]
+    return {
+        "processMs": round(wall_ms, 1),
+        "interpreterMs": round(wall_ms - startup_ms, 1),
+        "importMs": round(phases["importMs"], 1),
+        "buildMs": round(phases["buildMs"], 1),
+        "startupMs": round(startup_ms, 1),
+        "budgetMs": budget_ms,
+        "withinBudget": startup_ms <= budget_ms,
+        "modulesImported": len(rows),
+        "directImports": [
+            {"module": r["module"], "cumulativeMs": round(r["cumulativeMs"], 1)}
+            for r in sorted(_direct_imports(rows, "adk_service"), key=lambda r: -r["cumulativeMs"])[:top]
+        ],
+        "packages": [
+            {"package": name, "selfMs": round(ms, 1)}
+            for name, ms in sorted(packages.items(), key=lambda kv: -kv[1])[:top]
+        ],
+        "slowestModules": [
+            {"module": r["module"], "selfMs": round(r["selfMs"], 1)}
+            for r in sorted(rows, key=lambda r: -r["selfMs"])[:top]
+        ],
+    }
+
+
+def main(src_dir: str, argv: List[str], default_budget_ms: float) -> int:
+    budget_ms = default_budget_ms
+    if "--budget-ms" in argv:
+        budget_ms = float(argv[argv.index("--budget-ms") + 1])
+    report = profile_startup(src_dir, budget_ms)
+    print(json.dumps(report, indent=2))
+    if not report["withinBudget"]:
+        print(
+            f"Startup {report['startupMs']}ms exceeds the {budget_ms:g}ms budget",
+            file=sys.stderr, flush=True,
+        )
+        return 1
+    return 0
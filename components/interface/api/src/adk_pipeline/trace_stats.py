@@ -0,0 +1,113 @@
+# trace_stats.py — latency percentiles per stage across saved traces
+# ============================================
+#
+#   python3 -m adk_pipeline.trace_stats ../data/traces
+#   python3 -m adk_pipeline.trace_stats ../data/traces --json
+#
+# Reads every Chrome trace-event and OTLP-JSON file written by tracing.py and
+# groups spans by stage: the pipeline, each agent, each agent's model calls
+# (llm <agent>), each tool (tool <name>) and context building.
+
+import argparse
+import json
+import math
+import os
+import sys
+from typing import Dict, Iterator, List, Optional, Tuple
+
+PERCENTILES = (50, 90, 95, 99)
+
+
+def _chrome_spans(data: Dict) -> Iterator[Tuple[str, str, float]]:
+    for event in data.get("traceEvents", []):
+        if event.get("ph") == "X":
+            yield event.get("cat", ""), event["name"], event.get("dur", 0) / 1000
+
+
+def _otlp_spans(data: Dict) -> Iterator[Tuple[str, str, float]]:
+    for resource in data.get("resourceSpans", []):
+        for scope in resource.get("scopeSpans", []):
+            for span in scope.get("spans", []):
+                cat = next((
+                    a["value"].get("stringValue", "") for a in span.get("attributes", [])
+                    if a.get("key") == "adk.category"
+                ), "")
+                duration_ns = int(span["endTimeUnixNano"]) - int(span["startTimeUnixNano"])
+                yield cat, span["name"], duration_ns / 1_000_000
+
+
+def load_durations(directory: str) -> Tuple[Dict[Tuple[str, str], List[float]], int]:
+    """Span durations in ms keyed by (category, stage), plus the number of traces read."""
+    durations: Dict[Tuple[str, str], List[float]] = {}
+    runs = 0
+    for name in sorted(os.listdir(directory)):
+        if not name.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(directory, name), "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Skipping {name}: {e}", file=sys.stderr)
+            continue
+        spans = _otlp_spans(data) if "resourceSpans" in data else _chrome_spans(data)
+        runs += 1
+        for cat, stage, ms in spans:
+            durations.setdefault((cat, stage), []).append(ms)
+    return durations, runs
+
+
+def percentile(values: List[float], p: float) -> Optional[float]:
+    """Nearest-rank percentile."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(math.ceil(p / 100 * len(ordered)) - 1, 0)]
+
+
+def summarize(durations: Dict[Tuple[str, str], List[float]]) -> List[Dict]:
+    rows = []
+    for (cat, stage), values in durations.items():
+        row = {"category": cat, "stage": stage, "count": len(values), "meanMs": round(sum(values) / len(values), 1)}
+        for p in PERCENTILES:
+            row[f"p{p}Ms"] = round(percentile(values, p), 1)
+        row["maxMs"] = round(max(values), 1)
+        rows.append(row)
+    # Slowest stages first within each category
+    order = {"pipeline": 0, "context": 1, "agent": 2, "llm": 3, "tool": 4}
+    rows.sort(key=lambda r: (order.get(r["category"], 9), -r["p50Ms"]))
+    return rows
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Latency percentiles per stage across ADK trace files")
+    parser.add_argument("directory", help="directory containing adk-trace-*.json files")
+    parser.add_argument("--category", help="only show one category (pipeline, context, agent, llm, tool)")
+    parser.add_argument("--json", action="store_true", help="print the rows as JSON")
+    args = parser.parse_args(argv)
+
+    if not os.path.isdir(args.directory):
+        print(f"Not a directory: {args.directory}", file=sys.stderr)
+        return 1
+    durations, runs = load_durations(args.directory)
+    rows = [r for r in summarize(durations) if not args.category or r["category"] == args.category]
+
+    if args.json:
+        print(json.dumps({"runs": runs, "stages": rows}, indent=2))
+        return 0
+
+    print(f"{runs} trace(s) in {args.directory}")
+    if not rows:
+        return 0
+    width = max(len(r["stage"]) for r in rows)
+    header = f"{'category':<9} {'stage':<{width}} {'n':>5} " + " ".join(f"{'p' + str(p):>9}" for p in PERCENTILES) + f" {'max':>9}"
+    print(header)
+    print("-" * len(header))
+    for r in rows:
+        cells = " ".join(f"{r[f'p{p}Ms']:>9.1f}" for p in PERCENTILES)
+        print(f"{r['category']:<9} {r['stage']:<{width}} {r['count']:>5} {cells} {r['maxMs']:>9.1f}")
+    print("(milliseconds)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
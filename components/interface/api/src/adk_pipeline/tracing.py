@@ -0,0 +1,247 @@
+# tracing.py — per-run trace files for Perfetto / chrome://tracing
+# ============================================
+#
+# Each sampled run records nested spans and writes them to ADK_TRACE_DIR when
+# it finishes:
+#
+#   pipeline      - the whole run (job input, context building, agents)
+#   agent         - one activation of an agent (from PipelineMetrics)
+#   llm           - one model call (LlmAgent model callbacks)
+#   tool          - one tool call, e.g. an MCP filesystem call
+#   context       - memory-context parsing and summarizing
+#
+# Files are Chrome trace-event JSON by default, or OTLP-JSON (ADK_TRACE_FORMAT=otlp)
+# for OpenTelemetry tooling. The active run is held in a ContextVar like the
+# event sink, so callbacks deep inside the runner find it without plumbing.
+# Aggregate a directory of traces with `python3 -m adk_pipeline.trace_stats`.
+
+import json
+import os
+import random
+import sys
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    from google.adk.agents.callback_context import CallbackContext
+    from google.adk.models.llm_request import LlmRequest
+    from google.adk.models.llm_response import LlmResponse
+
+from adk_pipeline.events import emit_event
+from adk_pipeline.script import write_atomic
+
+SERVICE_NAME = "adk_pipeline"
+
+
+class Span:
+    __slots__ = ("name", "cat", "start", "end", "args")
+
+    def __init__(self, name: str, cat: str, start: float, end: float, args: Dict[str, Any]):
+        self.name = name
+        self.cat = cat
+        self.start = start
+        self.end = end
+        self.args = args
+
+
+class RunTrace:
+    def __init__(self, run_id: str):
+        self.run_id = run_id
+        self.started_wall = time.time()
+        self.started = time.monotonic()
+        self.spans: List[Span] = []
+
+    def add(self, name: str, cat: str, start: float, end: Optional[float] = None, **args):
+        self.spans.append(Span(name, cat, start, end if end is not None else time.monotonic(), args))
+
+    @contextmanager
+    def span(self, name: str, cat: str, **args) -> Iterator[Dict[str, Any]]:
+        """Time the block; the yielded dict can be filled with span arguments."""
+        start = time.monotonic()
+        try:
+            yield args
+        finally:
+            self.add(name, cat, start, **args)
+
+    def _wall_us(self, t: float) -> int:
+        return int((self.started_wall + (t - self.started)) * 1_000_000)
+
+    def to_chrome(self) -> Dict[str, Any]:
+        pid = os.getpid()
+        events: List[Dict[str, Any]] = [
+            {"name": "process_name", "ph": "M", "pid": pid, "tid": 0, "args": {"name": SERVICE_NAME}},
+            {"name": "thread_name", "ph": "M", "pid": pid, "tid": 1, "args": {"name": f"run {self.run_id}"}},
+        ]
+        # Parents first so viewers nest equal-start spans correctly
+        for span in sorted(self.spans, key=lambda s: (s.start, -s.end)):
+            events.append({
+                "name": span.name,
+                "cat": span.cat,
+                "ph": "X",
+                "ts": self._wall_us(span.start),
+                "dur": max(int((span.end - span.start) * 1_000_000), 1),
+                "pid": pid,
+                "tid": 1,
+                "args": span.args,
+            })
+        return {
+            "traceEvents": events,
+            "displayTimeUnit": "ms",
+            "otherData": {"runId": self.run_id, "service": SERVICE_NAME},
+        }
+
+    def _parents(self) -> List[Tuple[Span, Optional[int]]]:
+        """Pair each span with the index of the innermost span containing it."""
+        ordered = sorted(self.spans, key=lambda s: (s.start, -s.end))
+        stack: List[int] = []
+        result = []
+        for i, span in enumerate(ordered):
+            while stack and ordered[stack[-1]].end < span.end:
+                stack.pop()
+            result.append((span, stack[-1] if stack else None))
+            stack.append(i)
+        return result
+
+    def to_otlp(self) -> Dict[str, Any]:
+        trace_id = uuid.uuid5(uuid.NAMESPACE_URL, self.run_id).hex
+        span_ids = [uuid.uuid4().hex[:16] for _ in self.spans]
+        spans = []
+        for i, (span, parent) in enumerate(self._parents()):
+            attributes = [{"key": "adk.category", "value": {"stringValue": span.cat}}]
+            for key, value in span.args.items():
+                if isinstance(value, bool):
+                    attributes.append({"key": key, "value": {"boolValue": value}})
+                elif isinstance(value, int):
+                    attributes.append({"key": key, "value": {"intValue": str(value)}})
+                elif isinstance(value, float):
+                    attributes.append({"key": key, "value": {"doubleValue": value}})
+                elif value is not None:
+                    attributes.append({"key": key, "value": {"stringValue": str(value)}})
+            spans.append({
+                "traceId": trace_id,
+                "spanId": span_ids[i],
+                "parentSpanId": span_ids[parent] if parent is not None else "",
+                "name": span.name,
+                "kind": 1,  # SPAN_KIND_INTERNAL
+                "startTimeUnixNano": str(self._wall_us(span.start) * 1000),
+                "endTimeUnixNano": str(self._wall_us(span.end) * 1000),
+                "attributes": attributes,
+            })
+        return {"resourceSpans": [{
+            "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": SERVICE_NAME}}]},
+            "scopeSpans": [{"scope": {"name": SERVICE_NAME}, "spans": spans}],
+        }]}
+
+
+_current_trace: ContextVar[Optional[RunTrace]] = ContextVar("adk_run_trace", default=None)
+
+
+def current_trace() -> Optional[RunTrace]:
+    return _current_trace.get()
+
+
+@contextmanager
+def trace_span(name: str, cat: str, **args) -> Iterator[Dict[str, Any]]:
+    """Span on the active run's trace; a no-op when the run is not sampled."""
+    trace = _current_trace.get()
+    if trace is None:
+        yield args
+        return
+    with trace.span(name, cat, **args) as span_args:
+        yield span_args
+
+
+class Tracer:
+    def __init__(self, directory: str, sample_rate: float = 1.0, fmt: str = "chrome"):
+        self.directory = directory
+        self.sample_rate = sample_rate
+        self.fmt = fmt
+        self._model_calls: Dict[Tuple[str, str], Tuple[float, Optional[float]]] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.directory) and self.sample_rate > 0
+
+    @contextmanager
+    def run(self, name: str = "pipeline", **args) -> Iterator[Optional[RunTrace]]:
+        """Trace one pipeline run. Nested calls join the run that is already active."""
+        active = _current_trace.get()
+        if active is not None or not self.enabled or random.random() >= self.sample_rate:
+            yield active
+            return
+        trace = RunTrace(uuid.uuid4().hex[:12])
+        token = _current_trace.set(trace)
+        status = "error"
+        try:
+            yield trace
+            status = "success"
+        finally:
+            _current_trace.reset(token)
+            trace.add(name, "pipeline", trace.started, status=status, **args)
+            self._write(trace)
+
+    def _write(self, trace: RunTrace):
+        stamp = datetime.fromtimestamp(trace.started_wall, timezone.utc).strftime("%Y%m%dT%H%M%S")
+        if self.fmt == "otlp":
+            path, payload = f"adk-trace-{stamp}-{trace.run_id}.otlp.json", trace.to_otlp()
+        else:
+            path, payload = f"adk-trace-{stamp}-{trace.run_id}.json", trace.to_chrome()
+        path = os.path.join(self.directory, path)
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            write_atomic(path, json.dumps(payload))
+        except OSError as e:
+            print(f"Trace write failed: {e}", file=sys.stderr, flush=True)
+            return
+        emit_event("trace.saved", {"runId": trace.run_id, "path": path, "spans": len(trace.spans)})
+
+    def callbacks(self) -> Dict[str, Any]:
+        """LlmAgent keyword arguments that record each model call as an llm span."""
+        return {
+            "before_model_callback": self.before_model,
+            "after_model_callback": self.after_model,
+            "on_model_error_callback": self.on_model_error,
+        }
+
+    async def before_model(self, callback_context: "CallbackContext", llm_request: "LlmRequest") -> Optional["LlmResponse"]:
+        if _current_trace.get() is not None:
+            self._model_calls[(callback_context.invocation_id, callback_context.agent_name)] = (time.monotonic(), None)
+        return None
+
+    async def after_model(self, callback_context: "CallbackContext", llm_response: "LlmResponse") -> Optional["LlmResponse"]:
+        key = (callback_context.invocation_id, callback_context.agent_name)
+        call = self._model_calls.get(key)
+        if call is None:
+            return None
+        if llm_response.partial:
+            # Streaming: remember the first chunk, close the span on the final response
+            if call[1] is None:
+                self._model_calls[key] = (call[0], time.monotonic())
+            return None
+        self._close(key, llm_response=llm_response)
+        return None
+
+    async def on_model_error(self, callback_context: "CallbackContext", llm_request: "LlmRequest", error: Exception):
+        self._close((callback_context.invocation_id, callback_context.agent_name), error=str(error)[:200])
+        return None
+
+    def _close(self, key: Tuple[str, str], llm_response: Optional["LlmResponse"] = None, error: Optional[str] = None):
+        call = self._model_calls.pop(key, None)
+        trace = _current_trace.get()
+        if call is None or trace is None:
+            return
+        started, first_chunk = call
+        args: Dict[str, Any] = {"agent": key[1]}
+        if first_chunk is not None:
+            args["ttftMs"] = round((first_chunk - started) * 1000, 1)
+        usage = llm_response.usage_metadata if llm_response is not None else None
+        if usage is not None:
+            args["promptTokens"] = usage.prompt_token_count or 0
+            args["completionTokens"] = usage.candidates_token_count or 0
+        if error:
+            args["error"] = error
+        trace.add(f"llm {key[1]}", "llm", started, **args)
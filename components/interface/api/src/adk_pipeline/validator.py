@@ -0,0 +1,370 @@
+# validator.py — local static validation of the saved build script
+# ============================================
+#
+# Most of what TestingAgent was asked to do is mechanical: does output.py parse,
+# does it write inside the target folder, is package.json valid JSON with
+# dependencies, is there a README. StaticValidatorAgent answers those from the
+# AST in milliseconds and produces the same "# Validation Report". Only when a
+# check cannot be decided statically (unresolvable paths, external commands)
+# does the LLM tester run, and then it gets the findings instead of starting
+# from scratch.
+
+import ast
+import json
+import os
+import posixpath
+import re
+import sys
+import time
+from typing import AsyncGenerator, List, Optional
+
+from google.adk.agents import BaseAgent
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.events import Event, EventActions
+from google.genai import types as genai_types
+
+from adk_pipeline.events import emit_event
+from adk_pipeline.script import ScriptAnalysis, analyze_script, has_placeholder
+
+_SECRET_RES = [
+    re.compile(r"AKIA[0-9A-Z]{16}"),
+    re.compile(r"\bsk-[A-Za-z0-9_-]{20,}"),
+    re.compile(r"\bghp_[A-Za-z0-9]{36}\b"),
+    re.compile(r"-----BEGIN (?:RSA |EC |OPENSSH )?PRIVATE KEY-----"),
+]
+_STDLIB_MODULES = set(getattr(sys, "stdlib_module_names", ())) | {"__future__"}
+_WELL_KNOWN_MODULES = {"os", "sys", "json", "shutil", "pathlib", "subprocess", "textwrap", "stat"}
+_COMMAND_CALLS = {"os.system", "os.popen", "eval", "exec"}
+_DESTRUCTIVE_CALLS = ("shutil.rmtree", "os.remove", "os.unlink", "os.rmdir")
+_MAX_LISTED_FILES = 40
+
+
+class ValidationReport:
+    def __init__(self):
+        self.passed: List[str] = []
+        self.failed: List[str] = []
+        self.inconclusive: List[str] = []
+        self.recommendations: List[str] = []
+        self.next_steps: List[str] = []
+        self.files: List[str] = []
+
+    @property
+    def conclusive(self) -> bool:
+        return not self.inconclusive
+
+    @property
+    def status(self) -> str:
+        return "FAIL" if self.failed else "PASS"
+
+    def render(self) -> str:
+        total = len(self.passed) + len(self.failed)
+        lines = ["# Validation Report", "", "## ✅ Passed Checks"]
+        lines += [f"- {c}" for c in self.passed] or ["- None"]
+        if self.failed:
+            lines += ["", "## ❌ Failed Checks"]
+            lines += [f"- {c}" for c in self.failed]
+        lines += [
+            "", "## 📊 Summary",
+            f"- Total checks: {total}",
+            f"- Passed: {len(self.passed)}",
+            f"- Failed: {len(self.failed)}",
+            f"- Status: {self.status}",
+        ]
+        lines += ["", "## 🎯 Recommendations"]
+        lines += [f"- {r}" for r in self.recommendations] or ["- None"]
+        lines += ["", "## 🚀 Next Steps"]
+        lines += [f"{i}. {s}" for i, s in enumerate(self.next_steps, 1)] or ["Run output.py to create the project."]
+        return "\n".join(lines) + "\n"
+
+    def findings(self) -> str:
+        """Compact summary handed to the LLM tester when static checks are inconclusive."""
+        lines = [
+            f"Static checks: {len(self.passed)} passed, {len(self.failed)} failed, "
+            f"{len(self.inconclusive)} inconclusive."
+        ]
+        if self.failed:
+            lines.append("Failed:")
+            lines += [f"- {c}" for c in self.failed]
+        if self.inconclusive:
+            lines.append("Could not be checked statically (verify these):")
+            lines += [f"- {c}" for c in self.inconclusive]
+        if self.files:
+            shown = self.files[:_MAX_LISTED_FILES]
+            more = len(self.files) - len(shown)
+            lines.append("Files the script writes: " + ", ".join(shown) + (f" (+{more} more)" if more > 0 else ""))
+        return "\n".join(lines)
+
+
+def _inside(path: str, root: str) -> bool:
+    root = posixpath.normpath(root)
+    return posixpath.isabs(path) and posixpath.commonpath([path, root]) == root
+
+
+def _rel(path: str, base: Optional[str]) -> str:
+    if base and _inside(path, base):
+        return posixpath.relpath(path, base)
+    return path
+
+
+def validate_script(script_path: str, target_root: str) -> ValidationReport:
+    report = ValidationReport()
+
+    # 1. File verification
+    try:
+        with open(script_path, "r", encoding="utf-8") as f:
+            source = f.read()
+    except OSError as e:
+        report.failed.append(f"output.py could not be read: {e}")
+        return report
+    if not source.strip():
+        report.failed.append("output.py is empty")
+        return report
+    report.passed.append(f"output.py exists at {script_path} ({len(source.encode('utf-8'))} bytes)")
+
+    analysis = analyze_script(source)
+    if analysis.syntax_error:
+        report.failed.append(f"Python syntax error ({analysis.syntax_error}); the file may be truncated")
+        return report
+    report.passed.append("Python syntax is valid")
+
+    _check_code_quality(report, source, analysis)
+    _check_structure(report, analysis, target_root)
+    _check_safety(report, source, analysis)
+    _next_steps(report, analysis)
+    return report
+
+
+def _check_code_quality(report: ValidationReport, source: str, analysis: ScriptAnalysis):
+    placeholders = [
+        f"line {i}" for i, line in enumerate(source.splitlines(), 1) if has_placeholder(line)
+    ]
+    if placeholders:
+        report.failed.append(f"Placeholder/TODO text found ({', '.join(placeholders[:5])})")
+    else:
+        report.passed.append("No TODO comments or placeholder text")
+
+    imported = set()
+    for node in ast.walk(analysis.tree):
+        if isinstance(node, ast.Import):
+            imported.update(a.asname or a.name.split(".")[0] for a in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            imported.update(a.asname or a.name for a in node.names)
+    used = {name.split(".")[0] for name, _ in analysis.calls if "." in name}
+    missing = sorted((used & _WELL_KNOWN_MODULES) - imported)
+    if missing:
+        report.failed.append(f"Modules used without an import: {', '.join(missing)}")
+    else:
+        report.passed.append("All imports are present")
+
+    stubs = [
+        fn.name for fn in ast.walk(analysis.tree)
+        if isinstance(fn, (ast.FunctionDef, ast.AsyncFunctionDef)) and all(
+            isinstance(s, ast.Pass) or (isinstance(s, ast.Expr) and isinstance(s.value, ast.Constant))
+            for s in fn.body
+        )
+    ]
+    if stubs:
+        report.failed.append(f"Functions without an implementation: {', '.join(stubs)}")
+    else:
+        report.passed.append("All functions have implementations")
+
+    if any(isinstance(n, ast.Try) for n in ast.walk(analysis.tree)):
+        report.passed.append("File operations have error handling")
+    else:
+        report.recommendations.append("Wrap file operations in try/except so a failure is reported clearly")
+
+
+def _check_structure(report: ValidationReport, analysis: ScriptAnalysis, target_root: str):
+    if not analysis.ops:
+        report.failed.append("The script does not create any files or directories")
+        return
+
+    base = analysis.project_path
+    resolved = [op for op in analysis.ops if op.path is not None]
+    report.files = sorted({_rel(op.path, base) for op in analysis.writes if op.path is not None})
+
+    if analysis.truncated:
+        report.inconclusive.append("The script runs too many statements to follow statically; later file operations were not checked")
+    if analysis.unresolved:
+        lines = ", ".join(str(op.lineno) for op in analysis.unresolved[:10])
+        report.inconclusive.append(
+            f"{len(analysis.unresolved)} file operation(s) use paths computed at runtime (lines {lines})"
+        )
+
+    relative = [op.path for op in resolved if not posixpath.isabs(op.path)]
+    if relative:
+        report.failed.append(f"Relative paths depend on the working directory: {', '.join(relative[:5])}")
+    outside = [op.path for op in resolved if posixpath.isabs(op.path) and not _inside(op.path, target_root)]
+    if outside:
+        report.failed.append(f"Paths outside {target_root}: {', '.join(outside[:5])}")
+    elif resolved and not relative:
+        report.passed.append(f"All {len(resolved)} resolved paths are absolute and within {target_root}")
+
+    files = {_rel(path, base): content for path, content in analysis.files().items()}
+    names = {posixpath.basename(p) for p in report.files}
+
+    if "README.md" in names:
+        report.passed.append("README.md is generated")
+        readme = next((c for p, c in files.items() if posixpath.basename(p) == "README.md"), None)
+        if readme is not None and not re.search(r"install|npm|pip|run|start|setup", readme, re.IGNORECASE):
+            report.recommendations.append("README.md has no setup or run instructions")
+    else:
+        report.failed.append("No README.md is generated")
+
+    if ".gitignore" in names:
+        report.passed.append(".gitignore is generated")
+    else:
+        report.recommendations.append("Add a .gitignore (node_modules/, __pycache__/, .env)")
+
+    json_files = [p for p in report.files if p.endswith(".json")]
+    bad_json = []
+    for path in json_files:
+        content = files.get(path)
+        if content is None:
+            report.inconclusive.append(f"Content of {path} is computed at runtime")
+            continue
+        try:
+            json.loads(content)
+        except ValueError as e:
+            bad_json.append(f"{path} ({e})")
+    if bad_json:
+        report.failed.append(f"Invalid JSON: {'; '.join(bad_json)}")
+    elif json_files:
+        report.passed.append(f"{len(json_files)} JSON config file(s) are valid")
+
+    for path in [p for p in json_files if posixpath.basename(p) == "package.json"]:
+        _check_package_json(report, path, files.get(path), report.files)
+
+    py_files = [p for p in files if p.endswith(".py")]
+    local_modules = {posixpath.splitext(posixpath.basename(p))[0] for p in report.files}
+    local_modules |= {part for p in report.files for part in p.split("/")[:-1]}
+    third_party = sorted({
+        mod for p in py_files for mod in _third_party_imports(files[p]) if mod not in local_modules
+    })
+    if third_party:
+        if names & {"requirements.txt", "pyproject.toml", "setup.py"}:
+            report.passed.append("Python dependencies are declared")
+        else:
+            report.failed.append(f"No requirements.txt for third-party imports: {', '.join(third_party[:8])}")
+
+
+def _check_package_json(report: ValidationReport, path: str, content: Optional[str], all_files: List[str]):
+    try:
+        pkg = json.loads(content) if content is not None else None
+    except ValueError:
+        return
+    if not isinstance(pkg, dict):
+        return
+    deps = {**(pkg.get("dependencies") or {}), **(pkg.get("devDependencies") or {})}
+    if not deps:
+        report.failed.append(f"{path} declares no dependencies")
+        return
+    uses_react = any(p.endswith((".jsx", ".tsx")) for p in all_files)
+    uses_vue = any(p.endswith(".vue") for p in all_files)
+    if uses_react and "react" not in deps:
+        report.failed.append(f"{path} is missing the react dependency")
+    elif uses_vue and "vue" not in deps:
+        report.failed.append(f"{path} is missing the vue dependency")
+    else:
+        report.passed.append(f"{path} declares {len(deps)} dependencies")
+    if not pkg.get("scripts"):
+        report.recommendations.append(f"Add npm scripts (dev/start/build) to {path}")
+
+
+def _third_party_imports(source: str) -> List[str]:
+    try:
+        tree = ast.parse(source)
+    except SyntaxError:
+        return []
+    mods = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            mods.update(a.name.split(".")[0] for a in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            mods.add(node.module.split(".")[0])
+    return [m for m in mods if m not in _STDLIB_MODULES and not m.startswith("_")]
+
+
+def _check_safety(report: ValidationReport, source: str, analysis: ScriptAnalysis):
+    commands = sorted({
+        name for name, _ in analysis.calls if name in _COMMAND_CALLS or name.startswith("subprocess.")
+    })
+    if commands:
+        report.inconclusive.append(f"Script runs external commands or dynamic code: {', '.join(commands)}")
+    destructive = sorted({name for name, _ in analysis.calls if name in _DESTRUCTIVE_CALLS})
+    if destructive:
+        report.inconclusive.append(f"Script deletes files: {', '.join(destructive)}")
+    if not commands and not destructive:
+        report.passed.append("No potentially harmful operations")
+
+    if any(r.search(source) for r in _SECRET_RES):
+        report.failed.append("Hardcoded credentials or secrets found")
+    else:
+        report.passed.append("No hardcoded credentials or secrets")
+
+
+def _next_steps(report: ValidationReport, analysis: ScriptAnalysis):
+    names = {posixpath.basename(p): p for p in report.files}
+    report.next_steps.append("Run `python3 output.py` to create the project")
+    if analysis.project_path:
+        report.next_steps.append(f"`cd {analysis.project_path}`")
+    if "package.json" in names:
+        content = {_rel(p, analysis.project_path): c for p, c in analysis.files().items()}.get(names["package.json"])
+        try:
+            scripts = json.loads(content).get("scripts") or {}
+        except (TypeError, ValueError, AttributeError):
+            scripts = {}
+        report.next_steps.append("`npm install`")
+        run = next((s for s in ("dev", "start") if s in scripts), None)
+        if run:
+            report.next_steps.append(f"`npm run {run}`" if run != "start" else "`npm start`")
+    if "requirements.txt" in names:
+        report.next_steps.append("`pip install -r requirements.txt`")
+    if "README.md" in names:
+        report.next_steps.append("Follow README.md for anything project-specific")
+
+
+class StaticValidatorAgent(BaseAgent):
+    """Runs the static checks and decides whether the LLM tester is needed.
+
+    Conclusive results are written to `output_key` (the tester's key) and shown
+    as the report; otherwise only `findings_key` is set for the tester prompt.
+    """
+
+    script_path: str
+    target_root: str
+    work_dir_key: Optional[str] = None  # state key of the job's work dir; overrides both paths
+    output_key: str = "test_results"
+    findings_key: str = "validation_findings"
+    conclusive_key: str = "validation_conclusive"
+
+    async def _run_async_impl(self, ctx: InvocationContext) -> AsyncGenerator[Event, None]:
+        start = time.monotonic()
+        work_dir = ctx.session.state.get(self.work_dir_key) if self.work_dir_key else None
+        if work_dir:
+            report = validate_script(os.path.join(work_dir, "output.py"), work_dir)
+        else:
+            report = validate_script(self.script_path, self.target_root)
+        emit_event("validation.static", {
+            "status": report.status,
+            "conclusive": report.conclusive,
+            "passed": len(report.passed),
+            "failed": len(report.failed),
+            "inconclusive": len(report.inconclusive),
+            "ms": round((time.monotonic() - start) * 1000, 1),
+        })
+
+        delta = {self.findings_key: report.findings(), self.conclusive_key: report.conclusive}
+        content = None
+        if report.conclusive:
+            text = report.render()
+            delta[self.output_key] = text
+            content = genai_types.Content(role="model", parts=[genai_types.Part(text=text)])
+
+        yield Event(
+            author=self.name,
+            invocation_id=ctx.invocation_id,
+            branch=ctx.branch,
+            content=content,
+            actions=EventActions(state_delta=delta),
+        )
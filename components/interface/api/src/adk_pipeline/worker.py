@@ -0,0 +1,159 @@
+# worker.py — long-lived job loop for `adk_service.py --worker`
+# ============================================
+#
+# A worker keeps the imported ADK/genai/MCP modules, the agent graph and the
+# MCP toolset alive between requests, so only the first job pays cold start.
+#
+# Protocol: JSON lines in both directions (stdin/stdout, or one unix socket
+# connection). Plain-text logs stay on stderr.
+#
+#   in : {"type": "job", "id": "...", "task": "...", "context": {...}}
+#        {"type": "cancel", "id": "..."}
+#        {"type": "ping", "id": "..."}
+#        {"type": "shutdown"}
+#   out: {"type": "ready", "pid": 123, "concurrency": 2}
+#        {"type": "event", "id": "...", "event": "agent.start", ...}
+#        {"type": "result", "id": "...", "outputs": [...]}
+#        {"type": "error", "id": "...", "error": "..."}
+#        {"type": "pong", "id": "...", "busy": true, "running": 1, "jobsCompleted": 4}
+#
+# Jobs run concurrently; the job runner decides how many make progress at once
+# (see adk_pipeline.scheduler) and `concurrency` tells the client how many to
+# send before it should queue on its side.
+
+import asyncio
+import json
+import os
+import sys
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from adk_pipeline.events import event_sink
+
+JobRunner = Callable[[Dict[str, Any]], Awaitable[Any]]
+Writer = Callable[[Dict[str, Any]], None]
+
+
+class WorkerSession:
+    """Serves one JSON-lines connection, running each job in its own task."""
+
+    def __init__(
+        self,
+        run_job: JobRunner,
+        write: Writer,
+        capacity: int = 1,
+        status: Optional[Callable[[], Dict[str, Any]]] = None,
+    ):
+        self.run_job = run_job
+        self.write = write
+        self.capacity = capacity
+        self.status = status
+        self.tasks: Dict[str, asyncio.Task] = {}
+        self.jobs_completed = 0
+
+    def _start(self, job: Dict[str, Any]):
+        job_id = job.get("id")
+        if job_id in self.tasks:
+            self.write({"type": "error", "id": job_id, "error": "duplicate job id"})
+            return
+        task = asyncio.ensure_future(self._run_one(job))
+        self.tasks[job_id] = task
+        task.add_done_callback(lambda t: self._finished(job_id, t))
+
+    def _finished(self, job_id: str, task: asyncio.Task):
+        self.tasks.pop(job_id, None)
+        self.jobs_completed += 1
+        if task.cancelled():
+            self.write({"type": "error", "id": job_id, "error": "cancelled"})
+
+    async def _run_one(self, job: Dict[str, Any]):
+        job_id = job.get("id")
+
+        def sink(payload: Dict[str, Any]):
+            self.write({"type": "event", "id": job_id, **payload})
+
+        try:
+            with event_sink(sink):
+                outputs = await self.run_job(job)
+            self.write({"type": "result", "id": job_id, "outputs": outputs})
+        except Exception as e:
+            print(f"Worker job {job_id} failed: {e}", file=sys.stderr, flush=True)
+            self.write({"type": "error", "id": job_id, "error": str(e)})
+
+    def _cancel(self, job_id: str):
+        task = self.tasks.get(job_id)
+        if task is not None:
+            task.cancel()
+
+    def handle_line(self, line: str) -> bool:
+        """Dispatch one request line. Returns False when the session should end."""
+        line = line.strip()
+        if not line:
+            return True
+        try:
+            msg = json.loads(line)
+        except json.JSONDecodeError as e:
+            print(f"Worker ignoring malformed line: {e}", file=sys.stderr, flush=True)
+            return True
+
+        msg_type = msg.get("type")
+        if msg_type == "job":
+            self._start(msg)
+        elif msg_type == "ping":
+            self.write({
+                "type": "pong",
+                "id": msg.get("id"),
+                "busy": bool(self.tasks),
+                "running": len(self.tasks),
+                "jobsCompleted": self.jobs_completed,
+                **({"scheduler": self.status()} if self.status else {}),
+            })
+        elif msg_type == "cancel":
+            self._cancel(msg.get("id"))
+        elif msg_type == "shutdown":
+            return False
+        return True
+
+    async def serve(self, reader: asyncio.StreamReader):
+        self.write({"type": "ready", "pid": os.getpid(), "concurrency": self.capacity})
+        try:
+            while True:
+                line = await reader.readline()
+                if not line or not self.handle_line(line.decode("utf-8")):
+                    break
+        finally:
+            pending = list(self.tasks.values())
+            for job_id in list(self.tasks):
+                self._cancel(job_id)
+            await asyncio.gather(*pending, return_exceptions=True)
+
+
+async def serve_stdio(run_job: JobRunner, **options):
+    loop = asyncio.get_running_loop()
+    # Jobs can carry the whole chat context, well past the default 64 KiB line limit
+    reader = asyncio.StreamReader(limit=64 * 1024 * 1024)
+    await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), sys.stdin)
+
+    def write(msg: Dict[str, Any]):
+        sys.stdout.write(json.dumps(msg) + "\n")
+        sys.stdout.flush()
+
+    await WorkerSession(run_job, write, **options).serve(reader)
+
+
+async def serve_socket(socket_path: str, run_job: JobRunner, **options):
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        def write(msg: Dict[str, Any]):
+            writer.write((json.dumps(msg) + "\n").encode("utf-8"))
+
+        try:
+            await WorkerSession(run_job, write, **options).serve(reader)
+        finally:
+            writer.close()
+
+    server = await asyncio.start_unix_server(handle, path=socket_path, limit=64 * 1024 * 1024)
+    print(f"ADK worker listening on {socket_path}", file=sys.stderr, flush=True)
+    async with server:
+        await server.serve_forever()
@@ -4,19 +4,39 @@
 import json
 import sys
 import asyncio
-from google.adk.agents.llm_agent import LlmAgent
-from google.adk.agents.sequential_agent import SequentialAgent
-from google.adk.sessions import InMemorySessionService
-from google.adk.runners import Runner
-from google.genai import types as genai_types
-from google.adk.agents import Agent, LoopAgent
-from google.adk.tools.mcp_tool.mcp_toolset import McpToolset
-from google.adk.tools.mcp_tool.mcp_session_manager import StdioConnectionParams
-from google.adk.code_executors import BuiltInCodeExecutor
-from mcp import StdioServerParameters
+import time
+
+_IMPORT_STARTED = time.perf_counter()  # startup tracking; keep above the other imports
+
 import os
-import subprocess
-from typing import Any, Dict
+import shlex
+from contextlib import nullcontext
+import uuid
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Set
+
+# Nothing imported here loads ADK. The framework, the agents and the services
+# built on it are imported by get_runner() (build_services, build_pipeline), so
+# reading and rejecting a job does not wait for them
+from adk_pipeline.cache import MemoryTier, ResponseCache, SqliteTier
+from adk_pipeline.context_pack import pack_context
+from adk_pipeline.event_channel import EventChannel, events_fd_from_argv
+from adk_pipeline.events import DeltaCoalescer, emit_event, event_sink
+from adk_pipeline.job_input import JobInputError, read_job_input
+from adk_pipeline.resilience import HedgePolicy, RetryPolicy
+from adk_pipeline.scheduler import JobScheduler, ModelLimiter, parse_model_limits
+from adk_pipeline.tracing import Tracer, trace_span
+
+if TYPE_CHECKING:
+    from google.adk.runners import Runner
+    from google.adk.tools.mcp_tool.mcp_toolset import McpToolset
+
+    from adk_pipeline.artifacts import ArtifactStore
+    from adk_pipeline.checkpoint import CheckpointStore
+    from adk_pipeline.mcp_pool import McpToolsetPool, PooledMcpToolset
+    from adk_pipeline.project_index import ProjectIndex
+    from adk_pipeline.routing import ModelRouter
+
+_startup = {"importMs": round((time.perf_counter() - _IMPORT_STARTED) * 1000, 1), "buildMs": None}
 
 
 # ============================================================================
@@ -25,118 +45,314 @@ from typing import Any, Dict
 LLM_MODEL = os.getenv("LLM_MODEL")  # Use Flash model for faster performance
 TARGET_FOLDER_PATH = os.getenv("TARGET_FOLDER_PATH", "/home/coder/project/")
 SCRIPT = os.path.join(TARGET_FOLDER_PATH, "output.py")
-
-# Ensure target directory exists
-os.makedirs(TARGET_FOLDER_PATH, exist_ok=True)
+APP_NAME = "node_adk_bridge"
+USER_ID = "node_user"
+# LLM TestingAgent: "auto" = only when static validation is inconclusive, "always", "never"
+LLM_TESTER_MODE = os.getenv("ADK_LLM_TESTER", "auto").lower()
+# LLM CodeReviewerAgent: "auto" = when the rules pass and it has not approved yet, "always", "never"
+LLM_REVIEW_MODE = os.getenv("ADK_LLM_REVIEW", "auto").lower()
+REVIEW_MAX_ITERATIONS = int(os.getenv("ADK_REVIEW_MAX_ITERATIONS", "3"))
+REVIEW_TIME_BUDGET_S = float(os.getenv("ADK_REVIEW_TIME_BUDGET_S", "300"))
+REVIEW_TOKEN_BUDGET = int(os.getenv("ADK_REVIEW_TOKEN_BUDGET", "0"))  # 0 = unlimited
+# Token streaming: partial model output is forwarded as coalesced agent.delta events
+STREAMING_ENABLED = os.getenv("ADK_STREAMING", "on").lower() not in ("0", "off", "false", "no")
+STREAM_DELTA_MAX_CHARS = int(os.getenv("ADK_STREAM_DELTA_MAX_CHARS", "200"))
+STREAM_DELTA_INTERVAL_S = float(os.getenv("ADK_STREAM_DELTA_INTERVAL_MS", "100")) / 1000
+# With --events-fd, events are written in batches at most this far apart (adk_pipeline/event_channel.py)
+EVENT_BATCH_MS = float(os.getenv("ADK_EVENT_BATCH_MS", "25"))
+# Write the project from the final script's recovered files instead of having Node run
+# output.py, with this many writer threads (adk_pipeline/materialize.py)
+MATERIALIZE_ENABLED = os.getenv("ADK_MATERIALIZE", "on").lower() not in ("0", "off", "false", "no")
+MATERIALIZE_WORKERS = int(os.getenv("ADK_MATERIALIZE_WORKERS", "8"))
+# Pre-validated scaffold snapshots for common stacks (adk_pipeline/scaffolds/)
+SCAFFOLDS_ENABLED = os.getenv("ADK_SCAFFOLDS", "on").lower() not in ("0", "off", "false", "no")
+# Parallel code generation by file group: "auto" = when the deliverables split into
+# two or more groups with at least ADK_FANOUT_MIN_FILES items, "always", "never"
+FANOUT_MODE = os.getenv("ADK_FANOUT", "auto").lower()
+FANOUT_MIN_FILES = int(os.getenv("ADK_FANOUT_MIN_FILES", "8"))
+# Refinement of an existing project: files shown to the model in full, and patch attempts
+REFINE_MAX_FILES = int(os.getenv("ADK_REFINE_MAX_FILES", "8"))
+REFINE_MAX_CONTEXT_CHARS = int(os.getenv("ADK_REFINE_MAX_CONTEXT_CHARS", "40000"))
+REFINE_MAX_ATTEMPTS = int(os.getenv("ADK_REFINE_MAX_ATTEMPTS", "2"))
+# Import + agent graph construction budget; checked by --profile-startup and logged when exceeded
+STARTUP_BUDGET_MS = float(os.getenv("ADK_STARTUP_BUDGET_MS", "1000"))
 
 # ============================================================================
 # MCP TOOLSETS
 # ============================================================================
-filesystem_toolset = McpToolset(
-    connection_params=StdioConnectionParams(
-        server_params=StdioServerParameters(
-            command="npx",
-            args=[
-                "-y",
-                "@modelcontextprotocol/server-filesystem",
-                os.path.abspath(TARGET_FOLDER_PATH),
-            ],
+# Prefer the server installed with the API's node_modules; npx re-resolves the
+# package on every launch
+MCP_FILESYSTEM_BIN = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "node_modules", ".bin", "mcp-server-filesystem"
+)
+MCP_POOL_SIZE = int(os.getenv("ADK_MCP_POOL_SIZE", "4"))
+MCP_IDLE_TTL_S = float(os.getenv("ADK_MCP_IDLE_TTL_S", "300"))
+MCP_PREWARM = int(os.getenv("ADK_MCP_PREWARM", "1"))  # connections opened at worker start
+# Launch a different filesystem server (e.g. the offline stand-in in api/bench);
+# the target folder is appended to its arguments
+MCP_FILESYSTEM_CMD = os.getenv("ADK_MCP_FILESYSTEM_CMD", "")
+
+
+def make_filesystem_toolset() -> "McpToolset":
+    # The MCP client stack is the heaviest import here; load it on first connect
+    from google.adk.tools.mcp_tool.mcp_session_manager import StdioConnectionParams
+    from google.adk.tools.mcp_tool.mcp_toolset import McpToolset
+    from mcp import StdioServerParameters
+
+    if MCP_FILESYSTEM_CMD:
+        command, *args = shlex.split(MCP_FILESYSTEM_CMD)
+    elif os.path.exists(MCP_FILESYSTEM_BIN):
+        command, args = MCP_FILESYSTEM_BIN, []
+    else:
+        command, args = "npx", ["-y", "@modelcontextprotocol/server-filesystem"]
+    return McpToolset(
+        connection_params=StdioConnectionParams(
+            server_params=StdioServerParameters(
+                command=command,
+                args=[*args, os.path.abspath(TARGET_FOLDER_PATH)],
+            )
         )
     )
+
+
+# Agents share one pooled toolset; each pipeline run leases its own connection.
+# Like the stores and the router below, they are made by build_services()
+mcp_pool: Optional["McpToolsetPool"] = None
+filesystem_toolset: Optional["PooledMcpToolset"] = None
+
+
+# ============================================================================
+# RESPONSE CACHE
+# ============================================================================
+# Repeated requests replay earlier model answers; ADK_CACHE=off disables it
+CACHE_ENABLED = os.getenv("ADK_CACHE", "on").lower() not in ("0", "off", "false", "no")
+CACHE_PATH = os.getenv(
+    "ADK_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data", "adk_response_cache.db"),
+)  # empty = memory tier only
+CACHE_MEMORY_ENTRIES = int(os.getenv("ADK_CACHE_MEMORY_ENTRIES", "256"))
+CACHE_TTL_S = float(os.getenv("ADK_CACHE_TTL_S", "86400"))
+CACHE_MAX_BYTES = int(os.getenv("ADK_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+response_cache = ResponseCache(
+    memory=MemoryTier(CACHE_MEMORY_ENTRIES),
+    disk=SqliteTier(CACHE_PATH, ttl_s=CACHE_TTL_S, max_bytes=CACHE_MAX_BYTES) if CACHE_PATH else None,
+) if CACHE_ENABLED else None
+
+
+# ============================================================================
+# ARTIFACT STORE
+# ============================================================================
+# Generated files are stored once by content hash; the review loop and the
+# tester get an index and read files through read_project_file. Blobs are kept
+# in memory and, when ADK_ARTIFACT_DIR is set, on disk as well
+ARTIFACT_DIR = os.getenv("ADK_ARTIFACT_DIR", "")
+ARTIFACT_MEMORY_BYTES = int(os.getenv("ADK_ARTIFACT_MEMORY_BYTES", str(64 * 1024 * 1024)))
+
+artifact_store: Optional["ArtifactStore"] = None
+
+
+# ============================================================================
+# PROJECT INDEX
+# ============================================================================
+# Generated projects by root: recursive file manifest, stack and listing, for
+# the memory context and refinement. Rows older than ADK_PROJECT_INDEX_MAX_AGE_S
+# are rescanned (only changed files are re-hashed); an empty path keeps the
+# index in memory
+PROJECT_INDEX_PATH = os.getenv(
+    "ADK_PROJECT_INDEX_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data", "adk_project_index.db"),
 )
+PROJECT_INDEX_MAX_AGE_S = float(os.getenv("ADK_PROJECT_INDEX_MAX_AGE_S", "60"))
+
+project_index: Optional["ProjectIndex"] = None
 
 
 # ============================================================================
-# EVENT EMITTER FOR STREAMING
+# CHECKPOINTS
 # ============================================================================
-def emit_event(event_type: str, data: Dict[str, Any]):
-    event_data = {"event": event_type, **data}
-    print(json.dumps(event_data), file=sys.stderr, flush=True)
+# Runs with a job id save their session state after each pipeline stage, so a
+# failed or cancelled job can be resumed ({"id": ..., "resume": true}) from the
+# last completed stage. The table lives in Node's SQLiteStore file by default;
+# checkpoints older than ADK_CHECKPOINT_TTL_S are dropped and an empty path
+# keeps them in memory
+CHECKPOINT_PATH = os.getenv(
+    "ADK_CHECKPOINT_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data", "memory.db"),
+)
+CHECKPOINT_TTL_S = float(os.getenv("ADK_CHECKPOINT_TTL_S", str(7 * 86400)))
 
+checkpoint_store: Optional["CheckpointStore"] = None
 
 
-async def run_pipeline_async(user_message: str):
+# ============================================================================
+# TRACING
+# ============================================================================
+# Sampled runs write a trace file (Perfetto / chrome://tracing, or OTLP-JSON);
+# an empty ADK_TRACE_DIR or a sample rate of 0 disables them
+TRACE_DIR = os.getenv(
+    "ADK_TRACE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data", "traces"),
+)
+TRACE_SAMPLE_RATE = float(os.getenv("ADK_TRACE_SAMPLE_RATE", "1.0"))
+TRACE_FORMAT = os.getenv("ADK_TRACE_FORMAT", "chrome").lower()  # "chrome" | "otlp"
+
+tracer = Tracer(TRACE_DIR, sample_rate=TRACE_SAMPLE_RATE, fmt=TRACE_FORMAT)
 
-    # Create async in-memory session
-    session_service = InMemorySessionService()
-    print(f"Current PATH is: {TARGET_FOLDER_PATH}", file=sys.stderr, flush=True)
 
-    await session_service.create_session(
-        app_name="node_adk_bridge",
-        user_id="node_user",
-        session_id="adk_session",
+# ============================================================================
+# CONCURRENCY
+# ============================================================================
+# A worker runs up to ADK_MAX_CONCURRENT_JOBS pipelines at once, each in its
+# own session and work directory (TARGET_FOLDER_PATH/jobs/<job id>); up to
+# ADK_MAX_QUEUED_JOBS more wait for a slot and the rest are rejected.
+MAX_CONCURRENT_JOBS = int(os.getenv("ADK_MAX_CONCURRENT_JOBS", "2"))
+MAX_QUEUED_JOBS = int(os.getenv("ADK_MAX_QUEUED_JOBS", "16"))
+# Concurrent model calls per model, e.g. "gemini-2.5-flash=4,default=8"; empty = unlimited
+MODEL_CONCURRENCY = os.getenv("ADK_MODEL_CONCURRENCY", "")
+
+scheduler = JobScheduler(MAX_CONCURRENT_JOBS, MAX_QUEUED_JOBS)
+model_limiter = ModelLimiter(*parse_model_limits(MODEL_CONCURRENCY))
+
+
+# ============================================================================
+# MODEL ROUTING
+# ============================================================================
+# Per-agent models with ordered fallbacks (adk_pipeline/routing.py), e.g.
+# "TestingAgent=gemini-2.5-flash-lite|gemini-2.5-flash,CodeReviewerAgent=gemini-2.5-flash";
+# names are fnmatch patterns and agents without a route use "default" or LLM_MODEL
+MODEL_ROUTES = os.getenv("ADK_MODEL_ROUTES", "")
+# A model is skipped for ADK_MODEL_COOLDOWN_S once, over the calls of the last
+# ADK_MODEL_WINDOW_S, its p95 first-chunk latency or its error rate breaches the SLO
+MODEL_SLO_P95_MS = float(os.getenv("ADK_MODEL_SLO_P95_MS", "30000"))
+MODEL_SLO_ERROR_RATE = float(os.getenv("ADK_MODEL_SLO_ERROR_RATE", "0.25"))
+MODEL_WINDOW_S = float(os.getenv("ADK_MODEL_WINDOW_S", "300"))
+MODEL_MIN_SAMPLES = int(os.getenv("ADK_MODEL_MIN_SAMPLES", "5"))
+MODEL_COOLDOWN_S = float(os.getenv("ADK_MODEL_COOLDOWN_S", "60"))
+# Rate limits and transient errors (429, 5xx, timeouts) are retried
+# ADK_MODEL_RETRIES times per model with jittered exponential backoff before
+# the route fails over (adk_pipeline/resilience.py)
+MODEL_RETRIES = int(os.getenv("ADK_MODEL_RETRIES", "3"))
+MODEL_RETRY_BASE_MS = float(os.getenv("ADK_MODEL_RETRY_BASE_MS", "500"))
+MODEL_RETRY_MAX_MS = float(os.getenv("ADK_MODEL_RETRY_MAX_MS", "20000"))
+# Agents (fnmatch patterns, e.g. "CodeReviewerAgent,BusinessAnalystAgent") whose
+# calls get a duplicate request once they wait past their p95 first-chunk
+# latency (at least ADK_MODEL_HEDGE_MIN_MS); empty = no hedging
+MODEL_HEDGE_AGENTS = [a.strip() for a in os.getenv("ADK_MODEL_HEDGE_AGENTS", "").split(",") if a.strip()]
+MODEL_HEDGE_MIN_MS = float(os.getenv("ADK_MODEL_HEDGE_MIN_MS", "1000"))
+
+model_router: Optional["ModelRouter"] = None
+
+
+# ============================================================================
+# SERVICES
+# ============================================================================
+# The MCP pool, the stores and the router live in modules built on ADK, so they
+# are made with the agent graph (get_runner) rather than at import
+def build_services():
+    global mcp_pool, filesystem_toolset, artifact_store, project_index, checkpoint_store, model_router
+    if model_router is not None:
+        return
+    from adk_pipeline.artifacts import ArtifactStore
+    from adk_pipeline.checkpoint import CheckpointStore
+    from adk_pipeline.mcp_pool import McpToolsetPool, PooledMcpToolset
+    from adk_pipeline.project_index import ProjectIndex
+    from adk_pipeline.routing import ModelRouter, parse_model_routes
+
+    mcp_pool = McpToolsetPool(make_filesystem_toolset, max_size=MCP_POOL_SIZE, idle_ttl_s=MCP_IDLE_TTL_S)
+    filesystem_toolset = PooledMcpToolset(mcp_pool)
+    artifact_store = ArtifactStore(ARTIFACT_DIR, max_memory_bytes=ARTIFACT_MEMORY_BYTES)
+    project_index = ProjectIndex(PROJECT_INDEX_PATH, max_age_s=PROJECT_INDEX_MAX_AGE_S)
+    checkpoint_store = CheckpointStore(CHECKPOINT_PATH, ttl_s=CHECKPOINT_TTL_S)
+    model_router = ModelRouter(
+        *parse_model_routes(MODEL_ROUTES, LLM_MODEL),
+        slo_p95_ms=MODEL_SLO_P95_MS,
+        slo_error_rate=MODEL_SLO_ERROR_RATE,
+        window_s=MODEL_WINDOW_S,
+        min_samples=MODEL_MIN_SAMPLES,
+        cooldown_s=MODEL_COOLDOWN_S,
+        retry=RetryPolicy(MODEL_RETRIES, MODEL_RETRY_BASE_MS / 1000, MODEL_RETRY_MAX_MS / 1000),
+        hedge=HedgePolicy(MODEL_HEDGE_AGENTS, min_delay_s=MODEL_HEDGE_MIN_MS / 1000, min_samples=MODEL_MIN_SAMPLES)
+        if MODEL_HEDGE_AGENTS else None,
+        limiter=model_limiter,
     )
 
-    # Pull optional memory context passed from Node (JSON in ADK_CONTEXT)
-    ctx_raw = os.getenv("ADK_CONTEXT", "")
-    ctx_summary = ""
+
+# ============================================================================
+# MEMORY CONTEXT
+# ============================================================================
+# Memory context is packed into ADK_CONTEXT_TOKEN_BUDGET tokens (about four
+# characters each); 0 lifts the budget but still drops repeats
+CONTEXT_TOKEN_BUDGET = int(os.getenv("ADK_CONTEXT_TOKEN_BUDGET", "1500"))
+
+
+def build_context_summary(ctx: Optional[Dict[str, Any]], query: str = "") -> str:
+    # ctx is the payload Node passes along ({userId, sessionId, projectId, context})
     try:
-        if ctx_raw:
-            ctx = json.loads(ctx_raw)
-            c = ctx.get("context", {})
-            summary = (c.get("summary") or "").strip()
-            recent_msgs = c.get("recentMessages") or []
-            notes = c.get("recentMemories") or []
-            lines = []
-            
-            if summary:
-                lines.append("Session summary:\n" + summary)
-            
-            if recent_msgs:
-                # Use all messages provided in context (already limited by caller)
-                # Format: "role: content"
-                msg_lines = [f"- {m.get('role')}: {m.get('content')}" for m in recent_msgs if m.get('content')]
-                if msg_lines:
-                    lines.append("Recent messages:\n" + "\n".join(msg_lines))
-            
-            if notes:
-                note_lines = []
-                for n in notes:
-                    text = n.get('text', '')
-                    note_lines.append(f"- {text}")
-                    
-                    # Check for "Artifacts at" pattern to include file listing
-                    # Pattern matches: "Artifacts at /path/to/dir"
-                    if "Artifacts at " in text:
-                        try:
-                            # Extract path (assuming it's the last part or clearly delimited)
-                            # Simple heuristic: split by "Artifacts at " and take the rest of the line
-                            parts = text.split("Artifacts at ")
-                            if len(parts) > 1:
-                                path_part = parts[1].split(".")[0].strip() # Stop at dot if present
-                                if os.path.exists(path_part) and os.path.isdir(path_part):
-                                    files = os.listdir(path_part)
-                                    # Filter for relevant files (skip hidden, etc.)
-                                    visible_files = [f for f in files if not f.startswith('.')]
-                                    if visible_files:
-                                        note_lines.append(f"  - Files in {os.path.basename(path_part)}: {', '.join(visible_files)}")
-                        except Exception as e:
-                            print(f"Error listing artifacts: {e}", file=sys.stderr)
-
-                if note_lines:
-                    lines.append("Relevant project notes:\n" + "\n".join(note_lines))
-            
-            if lines:
-                ctx_summary = "\n\n### Context from memory\n" + "\n".join(lines) + "\n\n"
+        ctx_summary, report = pack_context(ctx, query, CONTEXT_TOKEN_BUDGET, project_index.describe)
     except Exception as e:
-        print(f"Error parsing ADK_CONTEXT: {e}", file=sys.stderr)
-        ctx_summary = ""
+        print(f"Error building memory context: {e}", file=sys.stderr)
+        return ""
+    if ctx:
+        emit_event("context.pack", report)
+    return ctx_summary
+
+
+# ============================================================================
+# PIPELINE CONSTRUCTION
+def shared_model_callbacks() -> Dict[str, list]:
+    # Model callbacks shared by every LLM agent; the cache runs first so a hit
+    # opens no llm span (and never reaches the router's model permits)
+    model_callbacks: Dict[str, list] = {}
+    for callbacks in (
+        response_cache.callbacks() if response_cache else {},
+        tracer.callbacks(),
+    ):
+        for name, callback in callbacks.items():
+            model_callbacks.setdefault(name, []).append(callback)
+    return model_callbacks
+
+
+# ============================================================================
+# The agent graph does not depend on the request: the user message and memory
+# context reach the prompts through session state ({user_request} and
+# {memory_context}), so a long-lived worker builds it once and reuses it.
+def build_pipeline():
+    from google.adk.agents import LlmAgent, LoopAgent, ParallelAgent, SequentialAgent
+
+    from adk_pipeline.artifacts import ArtifactIndexAgent, ArtifactPatchAgent, read_project_file_tool
+    from adk_pipeline.checkpoint import CheckpointedSequenceAgent
+    from adk_pipeline.fanout import GROUPS as FANOUT_GROUPS, FanoutMergeAgent, FanoutPlannerAgent
+    from adk_pipeline.file_saver import FileSaverAgent
+    from adk_pipeline.flow import ConditionalAgent, early_stop
+    from adk_pipeline.materialize import MaterializeAgent
+    from adk_pipeline.review_rules import (
+        ReviewLoopControlAgent, RuleReviewAgent, approval_settled, approved_promotion, is_approved,
+    )
+    from adk_pipeline.scaffold import ScaffoldMergeAgent, ScaffoldSelectorAgent, load_snapshots
+    from adk_pipeline.validator import StaticValidatorAgent
+
+    build_services()
+    model_callbacks = shared_model_callbacks()
+    scaffold_snapshots = load_snapshots() if SCAFFOLDS_ENABLED else {}
+    read_project_file = read_project_file_tool(artifact_store)
 
     # ============================================================================
     # AGENT 0: BUSINESS ANALYST (Analyzes and clarifies requirements)
     # ============================================================================
     ba_agent = LlmAgent(
         name="BusinessAnalystAgent",
-        model=LLM_MODEL,
-        instruction=f"""You are a SENIOR BUSINESS ANALYST specializing in translating user requests into detailed technical requirements.
+        model=model_router.llm("BusinessAnalystAgent"),
+        **model_callbacks,
+        instruction="""You are a SENIOR BUSINESS ANALYST specializing in translating user requests into detailed technical requirements.
 
 **Your Task:**
 Analyze the user's request and create a comprehensive requirements document that will guide the development team.
 
 **User Request:**
-{user_message}
+{user_request}
 
-**Context:** {ctx_summary}
+**Context:** {memory_context}
 
 **Analysis Framework:**
 
@@ -202,12 +418,22 @@ Be thorough but concise. This document will guide the code generation process.
         output_key="requirements_analysis"
     )
 
+    # ============================================================================
+    # SCAFFOLD SELECTION (Native stage - picks a snapshot for the analysed stack)
+    # ============================================================================
+    scaffold_selector_agent = ScaffoldSelectorAgent(
+        name="ScaffoldSelectorAgent",
+        snapshots=scaffold_snapshots,
+        description="Picks a pre-validated scaffold snapshot for the requested stack",
+    )
+
     # ============================================================================
     # AGENT 1: CODE WRITER (No tools - just generates code as text)
     # ============================================================================
     code_writer_agent = LlmAgent(
         name="CodeWriterAgent",
-        model=LLM_MODEL,
+        model=model_router.llm("CodeWriterAgent"),
+        **model_callbacks,
         instruction=f"""You are a SENIOR FULL-STACK SOFTWARE ENGINEER specializing in production-ready project scaffolding.
 
 **CRITICAL MISSION:** Generate a complete, immediately executable Python script that creates a FULLY FUNCTIONAL, PRODUCTION-READY project.
@@ -215,7 +441,9 @@ Be thorough but concise. This document will guide the code generation process.
 **Requirements Analysis:**
 {{{{requirements_analysis}}}}
 
-**Target Directory:** {TARGET_FOLDER_PATH}
+**Target Directory:** {{work_dir}}
+
+{{scaffold_brief}}
 
 **ABSOLUTE REQUIREMENTS:**
 
@@ -317,7 +545,7 @@ Be thorough but concise. This document will guide the code generation process.
            print("✗ Error creating " + path + ": " + str(e))
    
    def main():
-       base_path = "{TARGET_FOLDER_PATH}"
+       base_path = "{{work_dir}}"
        project_name = "project-name"
        project_path = os.path.join(base_path, project_name)
        
@@ -361,7 +589,7 @@ import json
 from pathlib import Path
 
 def main():
-    base_path = "{TARGET_FOLDER_PATH}"
+    base_path = "{{work_dir}}"
     project_name = "your-project-name"
     project_path = os.path.join(base_path, project_name)
     
@@ -395,20 +623,143 @@ if __name__ == "__main__":
         output_key="generated_code"
     )
 
+    # ============================================================================
+    # PARALLEL FAN-OUT (Large projects - one writer per file group, run concurrently)
+    # ============================================================================
+    fanout_planner_agent = FanoutPlannerAgent(
+        name="FanoutPlannerAgent",
+        mode=FANOUT_MODE,
+        min_files=FANOUT_MIN_FILES,
+        description="Splits the deliverables into file groups for parallel generation",
+    )
+
+    group_focus = {
+        "frontend": "UI source code: entry points, components, pages, routing, state and styles",
+        "backend": "server code: entry point, routes, controllers, models, middleware and data access",
+        "config": "project configuration: package manifests with pinned versions, build and tool configs, .gitignore, .env.example",
+        "docs": "documentation: README.md with complete setup and run instructions, plus any docs/ pages",
+    }
+
+    def group_writer(group: str) -> ConditionalAgent:
+        writer = LlmAgent(
+            name=f"{group.capitalize()}WriterAgent",
+            model=model_router.llm(f"{group.capitalize()}WriterAgent"),
+            **model_callbacks,
+            instruction=f"""You are a SENIOR SOFTWARE ENGINEER writing one part of a larger project. Other engineers write the other parts at the same time.
+
+**File Group:** {group} - {group_focus[group]}
+
+**Requirements Analysis:**
+{{requirements_analysis}}
+
+**Your Files (write these and nothing else):**
+{{fanout_{group}}}
+
+**Target Directory:** {{work_dir}}
+**Project Name:** {{fanout_project_name}}
 
+{{scaffold_brief}}
+
+**RULES:**
+- Generate COMPLETE, production-ready files. NO placeholders, NO TODOs.
+- Files outside your group are written by others; reference them by their conventional paths but do NOT create them.
+- Write every file with create_file(os.path.join(project_path, "<relative path>"), <string literal>) directly in main(). No loops, no content built at runtime.
+- Use exactly the base_path and project_name below so all parts land in the same project.
+
+**OUTPUT:** Pure Python code ONLY, no markdown, no explanations, no triple-double-quote strings:
+```python
+#!/usr/bin/env python3
+import os
+
+def create_file(path, content):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(content)
+    print("✓ Created: " + path)
+
+def main():
+    base_path = "{{work_dir}}"
+    project_name = "{{fanout_project_name}}"
+    project_path = os.path.join(base_path, project_name)
+    os.makedirs(project_path, exist_ok=True)
+    # create_file(...) for each of your files
+
+if __name__ == "__main__":
+    main()
+```
+""",
+            description=f"Generates the {group} files of the project",
+            output_key=f"fanout_code_{group}",
+        )
+        return ConditionalAgent(
+            name=f"{group.capitalize()}WriterGate",
+            sub_agents=[writer],
+            condition=lambda state: bool(state.get(f"fanout_{group}")),
+            skip_reason=f"no {group} deliverables",
+            description=f"Runs the {group} writer when the plan has {group} files",
+        )
+
+    fanout_agent = SequentialAgent(
+        name="FanoutCodeGeneration",
+        sub_agents=[
+            ParallelAgent(
+                name="FanoutWriters",
+                sub_agents=[group_writer(group) for group in FANOUT_GROUPS],
+                description="Generates every file group concurrently",
+            ),
+            FanoutMergeAgent(
+                name="FanoutMergeAgent",
+                description="Merges the group scripts into one build script and resolves conflicts",
+            ),
+        ],
+        description="Generates large projects as parallel file groups",
+    )
+    fanout_gate = ConditionalAgent(
+        name="FanoutGate",
+        sub_agents=[fanout_agent],
+        condition=lambda state: bool(state.get("fanout_active")),
+        skip_reason="project too small to split",
+        description="Runs parallel generation when the planner split the project",
+    )
+    code_writer_gate = ConditionalAgent(
+        name="CodeWriterGate",
+        sub_agents=[code_writer_agent],
+        condition=lambda state: not state.get("generated_code"),
+        skip_reason="generated in parallel",
+        description="Runs the serial writer unless parallel generation produced the script",
+    )
+
+    # ============================================================================
+    # SCAFFOLD MERGE (Native stage - injects the snapshot into the writer's script)
     # ============================================================================
-    # AGENT 2: CODE REVIEWER (No tools needed - just reviews text)
+    scaffold_merge_agent = ScaffoldMergeAgent(
+        name="ScaffoldMergeAgent",
+        snapshots=scaffold_snapshots,
+        description="Merges the selected scaffold snapshot into the generated script",
+    )
+
+
+    # ============================================================================
+    # AGENT 2: CODE REVIEWER (Reads the project files it needs from the artifact store)
     # ============================================================================
     code_reviewer_agent = LlmAgent(
         name="CodeReviewerAgent",
-        model=LLM_MODEL,
+        # An approval is final once its first line is out; the commentary after it is not paid for
+        model=early_stop(model_router.llm("CodeReviewerAgent"), "CodeReviewerAgent", approval_settled),
+        **model_callbacks,
+        tools=[read_project_file],
         instruction="""You are a SENIOR CODE REVIEWER with ZERO tolerance for incomplete or non-production-ready code.
 
     **Your Task:**
     Review the generated Python code with EXTREME scrutiny for production readiness.
 
     **Code to Review:**
-    {generated_code}
+    {review_code}
+
+    **Project Files:**
+    {artifact_index}
+
+    File bodies shown as <<file: path>> are not repeated in the script. Use the read_project_file tool to read the files you need to judge; do not assume what they contain.
 
     **STRICT REVIEW CHECKLIST:**
 
@@ -498,11 +849,13 @@ if __name__ == "__main__":
     )
 
     # ============================================================================
-    # AGENT 3: CODE REFACTORER (No tools - just refactors text)
+    # AGENT 3: CODE REFACTORER (Whole script when the files could not be indexed,
+    # per-file patches otherwise)
     # ============================================================================
     code_refactorer_agent = LlmAgent(
         name="CodeRefactorerAgent",
-        model=LLM_MODEL,
+        model=model_router.llm("CodeRefactorerAgent"),
+        **model_callbacks,
         instruction=f"""You are a Python refactoring expert.
 
     **Your Task:**
@@ -554,62 +907,118 @@ if __name__ == "__main__":
         output_key="refactored_code"
     )
 
-    # ============================================================================
-    # AGENT 4: FILE SAVER (Uses MCP tools to save the file)
-    # ============================================================================
-    file_saver_agent = LlmAgent(
-        name="FileSaverAgent",
-        model=LLM_MODEL,
-        tools=[filesystem_toolset],
-        instruction=f"""You are a file management specialist with access to filesystem tools.
+    patch_refactorer_agent = LlmAgent(
+        name="PatchRefactorerAgent",
+        model=model_router.llm("PatchRefactorerAgent"),
+        **model_callbacks,
+        tools=[read_project_file],
+        instruction=f"""You are a refactoring expert fixing a generated project file by file.
 
-    **Your Task:**
-    Save the final Python script to disk using the write_file tool.
+    **Project Files:**
+    {{artifact_index}}
+
+    **Reviewer Feedback:**
+    {{review_comments}}
 
-    **Final Code to Save:**
-    {{refactored_code}}
+    **Problems With Your Previous Patches (if any):**
+    {{artifact_patch_errors}}
 
     **Instructions:**
-    1. Extract ONLY the Python code section (everything after the analysis sections)
-    2. Use the `write_file` tool to save the code
-    3. Filename: `output.py`
-    4. Full path: `{SCRIPT}`
-    5. Content: The complete refactored Python code (without the markdown analysis sections)
+    1. Read every file the feedback mentions with the read_project_file tool before changing it.
+    2. Address EVERY issue in the feedback: no TODOs or placeholders, complete implementations, current package versions, valid JSON.
+    3. Change only what the feedback requires. Do not touch files that are fine.
+
+    **Output Format:**
+    Output ONLY patches, no explanations. For each file you change:
+
+    FILE: relative/path/from/the/index
+    <<<<<<< SEARCH
+    exact lines copied from the current file
+    =======
+    replacement lines
+    >>>>>>> REPLACE
+
+    - A file may have several SEARCH/REPLACE blocks; each SEARCH must match the current file exactly once.
+    - To create a new file, use an empty SEARCH section.
+    - To remove a file, write a line "DELETE: relative/path".
+    - Paths are relative to the project root, exactly as listed in the index.
+    """,
+        description="Fixes reviewer feedback with per-file patches instead of re-emitting the script",
+        output_key="refactor_patches"
+    )
+    artifact_patch_agent = ArtifactPatchAgent(
+        name="ArtifactPatchAgent",
+        store=artifact_store,
+        description="Applies the refactorer's patches to the stored files and updates the script",
+    )
 
-    **CRITICAL:**
-    - You MUST call the write_file tool
-    - Save ONLY the Python code, not the analysis sections
-    - Verify the save was successful
+    # ============================================================================
+    # AGENT 4: FILE SAVER (Native stage - writes refactored_code without an LLM call)
+    # ============================================================================
+    file_saver_agent = FileSaverAgent(
+        name="FileSaverAgent",
+        script_path=SCRIPT,
+        work_dir_key="work_dir",
+        description="Saves the final Python script to output.py atomically",
+    )
 
-    **After saving:**
-    Report: "✓ Successfully saved output.py to {TARGET_FOLDER_PATH}"
+    # ============================================================================
+    # AGENT 5: STATIC VALIDATOR (Native stage - AST checks, no LLM call)
+    # ============================================================================
+    static_validator_agent = StaticValidatorAgent(
+        name="StaticValidatorAgent",
+        script_path=SCRIPT,
+        target_root=os.path.abspath(TARGET_FOLDER_PATH),
+        work_dir_key="work_dir",
+        description="Statically validates output.py and the files it will create",
+    )
 
-    If there's an error saving, report: "✗ Error saving file: [error details]
-    """,
-        description="Saves the final Python script to output.py using filesystem tools",
-        output_key="save_status"
+    # ============================================================================
+    # PROJECT MATERIALIZER (Native stage - writes the project files itself)
+    # ============================================================================
+    materialize_agent = MaterializeAgent(
+        name="MaterializeAgent",
+        index=project_index,
+        workers=MATERIALIZE_WORKERS,
+        description="Writes the project's files through a staging directory, skipping unchanged ones",
+    )
+    materialize_gate = ConditionalAgent(
+        name="MaterializeGate",
+        sub_agents=[materialize_agent],
+        condition=lambda state: MATERIALIZE_ENABLED,
+        skip_reason="disabled by ADK_MATERIALIZE",
+        description="Materializes the project unless output.py should build it",
     )
 
     # ============================================================================
-    # AGENT 5: TESTING & VALIDATION AGENT (Validates and tests the generated project)
+    # AGENT 6: TESTING & VALIDATION AGENT (Covers what static checks could not decide)
     # ============================================================================
     testing_agent = LlmAgent(
         name="TestingAgent",
-        model=LLM_MODEL,
-        tools=[filesystem_toolset],
+        model=model_router.llm("TestingAgent"),
+        **model_callbacks,
+        tools=[filesystem_toolset, read_project_file],
         instruction=f"""You are a QA ENGINEER specializing in validation and testing of generated projects.
 
 **Your Task:**
 Validate that output.py was saved correctly and test the generated project for completeness and correctness.
 
+**Static Pre-checks (already run locally):**
+{{validation_findings}}
+
+Focus on the items that could not be checked statically and confirm any failures; do not redo checks that already passed.
+
 **Validation Steps:**
 
 1. **File Verification:**
-   - Confirm output.py exists at {SCRIPT}
-   - Use read_file tool to verify the content
-   - Check file size is reasonable (not empty, not truncated)
+   - Confirm output.py exists at {{work_dir}}/output.py
+   - The project files it creates are listed below; read the ones you need to check with the read_project_file tool instead of reading output.py in full
+   - Check file sizes are reasonable (not empty, not truncated)
    - Verify Python syntax is valid
 
+**Project Files:**
+{{artifact_index}}
+
 2. **Code Quality Checks:**
    - No TODO comments in the generated code
    - All imports are present
@@ -631,7 +1040,7 @@ Validate that output.py was saved correctly and test the generated project for c
 
 5. **Execution Safety:**
    - Check for any potentially harmful operations
-   - Verify paths are within {TARGET_FOLDER_PATH}
+   - Verify paths are within {{work_dir}}
    - Confirm no hardcoded credentials or secrets
 
 **Output Format:**
@@ -664,30 +1073,101 @@ Be thorough and critical. If you find any issues, clearly explain what's wrong a
         output_key="test_results"
     )
 
+    testing_gate = ConditionalAgent(
+        name="TestingGate",
+        sub_agents=[testing_agent],
+        condition=lambda state: LLM_TESTER_MODE == "always" or (
+            LLM_TESTER_MODE == "auto" and not state.get("validation_conclusive")
+        ),
+        skip_reason="static validation was conclusive",
+        description="Runs the LLM tester only when static validation needs it",
+    )
+
 
 
     # ============================================================================
     # COMPOSITE AGENTS
     # ============================================================================
 
-    # Loop for iterative improvement (Review -> Refactor)
+    # Loop for iterative improvement (Rules -> Review -> Refactor) until both
+    # the rules and the reviewer pass or the budget runs out
+    rule_review_agent = RuleReviewAgent(
+        name="RuleReviewAgent",
+        llm_review_mode=LLM_REVIEW_MODE,
+        description="Checks the generated project against local review rules",
+    )
+    review_gate = ConditionalAgent(
+        name="ReviewGate",
+        sub_agents=[code_reviewer_agent],
+        condition=lambda state: state.get("review_source") == "llm",
+        skip_reason="decided by review rules",
+        description="Runs the LLM reviewer only when the rules cannot decide",
+    )
+    review_loop_control = ReviewLoopControlAgent(
+        name="ReviewLoopControl",
+        time_budget_s=REVIEW_TIME_BUDGET_S,
+        token_budget=REVIEW_TOKEN_BUDGET,
+        description="Stops the loop on approval or when the review budget is spent",
+    )
+    artifact_index_agent = ArtifactIndexAgent(
+        name="ArtifactIndexAgent",
+        store=artifact_store,
+        description="Stores the script's files and indexes them for the review prompts",
+    )
+    refactor_gate = ConditionalAgent(
+        name="RefactorGate",
+        sub_agents=[code_refactorer_agent],
+        condition=lambda state: not state.get("artifact_mode") and not is_approved(state.get("review_comments")),
+        skip_reason="approved or files are indexed",
+        on_skip=approved_promotion,
+        description="Re-emits the whole script only when its files could not be indexed",
+    )
+    patch_refactor_gate = ConditionalAgent(
+        name="PatchRefactorGate",
+        sub_agents=[SequentialAgent(
+            name="PatchRefactoring",
+            sub_agents=[patch_refactorer_agent, artifact_patch_agent],
+            description="Per-file patches applied to the indexed files",
+        )],
+        condition=lambda state: bool(state.get("artifact_mode")) and not is_approved(state.get("review_comments")),
+        skip_reason="approved or files could not be indexed",
+        on_skip=approved_promotion,
+        description="Refactors by per-file patches when the files are indexed",
+    )
     code_improvement_loop = LoopAgent(
         name="CodeImprovementLoop",
-        sub_agents=[code_reviewer_agent, code_refactorer_agent],
-        max_iterations=1,  # Reduced from 3 to 1 for faster execution
-        description="Reviews and refactors code once for quality assurance"
+        sub_agents=[
+            rule_review_agent, artifact_index_agent, review_gate, review_loop_control,
+            refactor_gate, patch_refactor_gate,
+        ],
+        max_iterations=REVIEW_MAX_ITERATIONS,
+        description="Reviews and refactors code until it passes review or the budget is spent"
     )
 
 
         
-    code_pipeline_agent = SequentialAgent(
+    final_index_agent = ArtifactIndexAgent(
+        name="FinalArtifactIndexAgent",
+        store=artifact_store,
+        description="Indexes the final script's files for the tester",
+    )
+
+    code_pipeline_agent = CheckpointedSequenceAgent(
         name="FullPipelineAgent",
+        store=checkpoint_store,
         sub_agents=[
             ba_agent,              # 1. Analyze requirements
-            code_writer_agent,     # 2. Generate code
+            scaffold_selector_agent,  # Pick a scaffold snapshot for the stack
+            fanout_planner_agent,  # Split large projects into file groups
+            fanout_gate,           # 2a. Generate the groups in parallel and merge them
+            code_writer_gate,      # 2b. Or generate the whole script serially
+            scaffold_merge_agent,  # Merge the snapshot into the script
             code_improvement_loop, # 3. Review & refactor
             file_saver_agent,      # 4. Save to disk
-            testing_agent,         # 5. Validate & test
+            static_validator_agent,  # 5. Static checks
+            materialize_gate,      # Write the project files (else Node runs output.py)
+            final_index_agent,     # Index the saved script's files for the tester
+            testing_gate,          # 6. LLM validation for what static checks could not decide
         ],
         description="Complete pipeline: analyzes requirements, generates code, improves it, saves it, and validates the result",
     )
@@ -695,108 +1175,295 @@ Be thorough and critical. If you find any issues, clearly explain what's wrong a
     # ============================================================================
     # ROOT AGENT
     # ============================================================================
-    root_agent = code_pipeline_agent
+    return code_pipeline_agent
+
+
+# Refinements patch the project on disk instead of regenerating output.py:
+# manifest -> per-file patches for the affected files -> validated, atomic apply
+def build_refinement_pipeline():
+    from google.adk.agents import LlmAgent, LoopAgent, SequentialAgent
+
+    from adk_pipeline.refine import PatchApplyAgent, ProjectManifestAgent
+
+    build_services()
+    model_callbacks = shared_model_callbacks()
+
+    manifest_agent = ProjectManifestAgent(
+        name="ProjectManifestAgent",
+        index=project_index,
+        max_files=REFINE_MAX_FILES,
+        max_context_chars=REFINE_MAX_CONTEXT_CHARS,
+        description="Hashes the existing project and picks the files affected by the request",
+    )
+
+    refinement_writer_agent = LlmAgent(
+        name="RefinementWriterAgent",
+        model=model_router.llm("RefinementWriterAgent"),
+        **model_callbacks,
+        instruction="""You are a SENIOR SOFTWARE ENGINEER making a targeted change to an existing project.
+
+**User Request:**
+{user_request}
+
+**Context:** {memory_context}
+
+**Project Files (paths relative to the project root):**
+{refine_files}
+
+**Current Contents of the Relevant Files:**
+{refine_context}
+
+**Problems With Your Previous Patch (empty on the first attempt):**
+{refine_errors}
+
+**Your Task:**
+Make the SMALLEST change that fully satisfies the request. Touch only the files that must change and preserve all working code.
+
+**OUTPUT FORMAT - patches only, no explanations:**
+
+FILE: relative/path/to/file
+<<<<<<< SEARCH
+exact lines copied from the current file, including indentation
+=======
+the lines that replace them
+>>>>>>> REPLACE
+
+Rules:
+- SEARCH must match the current file exactly once; include a few surrounding lines when needed.
+- Use several SEARCH/REPLACE blocks under one FILE header for separate edits in the same file.
+- To create a new file, use an empty SEARCH section and put the whole file in the REPLACE section.
+- To delete a file, write a single line: DELETE: relative/path/to/file
+- Never rewrite a whole existing file and never repeat unchanged files.
+- NO placeholders, NO TODOs.
+""",
+        description="Writes per-file patches for the files the request affects",
+        output_key="refine_patches",
+    )
+
+    patch_apply_agent = PatchApplyAgent(
+        name="PatchApplyAgent",
+        index=project_index,
+        max_attempts=REFINE_MAX_ATTEMPTS,
+        description="Validates the patches and applies them atomically",
+    )
 
-    runner = Runner(
-        agent=root_agent,
-        app_name="node_adk_bridge",
-        session_service=session_service,
+    patch_loop = LoopAgent(
+        name="RefinementPatchLoop",
+        sub_agents=[refinement_writer_agent, patch_apply_agent],
+        max_iterations=REFINE_MAX_ATTEMPTS,
+        description="Writes and applies patches, retrying with the validation errors",
     )
 
+    return SequentialAgent(
+        name="RefinementPipelineAgent",
+        sub_agents=[manifest_agent, patch_loop],
+        description="Refines an existing project with validated per-file patches",
+    )
+
+
+# Built on first use and then shared by every job this process runs
+_session_service = None
+_runner = None
+_refine_runner = None
+
+
+def get_runner() -> "Runner":
+    global _session_service, _runner
+    if _runner is None:
+        built = time.perf_counter()
+        from google.adk.runners import Runner
+        from google.adk.sessions import InMemorySessionService
+
+        # Created here rather than at import so importing the module has no side effects
+        os.makedirs(TARGET_FOLDER_PATH, exist_ok=True)
+        _session_service = InMemorySessionService()
+        _runner = Runner(
+            agent=build_pipeline(),
+            app_name=APP_NAME,
+            session_service=_session_service,
+        )
+        _startup["buildMs"] = round((time.perf_counter() - built) * 1000, 1)
+        startup_ms = _startup["importMs"] + _startup["buildMs"]
+        if startup_ms > STARTUP_BUDGET_MS:
+            print(
+                f"Startup took {startup_ms:.0f}ms, over the {STARTUP_BUDGET_MS:.0f}ms budget "
+                "(python3 adk_service.py --profile-startup shows where)",
+                file=sys.stderr, flush=True,
+            )
+    return _runner
+
+
+def get_refine_runner() -> "Runner":
+    global _refine_runner
+    if _refine_runner is None:
+        from google.adk.runners import Runner
+
+        get_runner()
+        _refine_runner = Runner(
+            agent=build_refinement_pipeline(),
+            app_name=APP_NAME,
+            session_service=_session_service,
+        )
+    return _refine_runner
+
+
+async def shutdown_async():
+    # Close every MCP server child; they are otherwise only reaped when the process exits.
+    # The services are None when the run ended before get_runner() built them
+    if mcp_pool:
+        await mcp_pool.shutdown()
+    if response_cache:
+        response_cache.close()
+    if project_index:
+        project_index.close()
+    if checkpoint_store:
+        checkpoint_store.close()
+
+
+async def run_pipeline_async(
+    user_message: str,
+    context: Optional[Dict[str, Any]] = None,
+    write_stdout: bool = True,
+    job_id: Optional[str] = None,
+    work_dir: Optional[str] = None,
+    refine_path: Optional[str] = None,
+    resume: bool = False,
+):
+    from adk_pipeline.checkpoint import COMPLETED_KEY, JOB_ID_KEY, OUTPUTS_KEY
+
+    # A refinement patches the existing project in place
+    runner = get_refine_runner() if refine_path else get_runner()
+    # Prompts and the save/validate stages resolve paths through {work_dir}
+    work_dir = os.path.abspath(refine_path or work_dir or TARGET_FOLDER_PATH)
+    os.makedirs(work_dir, exist_ok=True)
+    print(f"Current PATH is: {work_dir}", file=sys.stderr, flush=True)
+
+    # Only full runs are checkpointed; a refinement is one patch pass
+    checkpoint_job = job_id if job_id and not refine_path else None
+    restored: Dict[str, Any] = {}
+    if checkpoint_job and resume:
+        checkpoint = checkpoint_store.load(checkpoint_job)
+        if checkpoint and checkpoint.status != "complete":
+            restored = {**checkpoint.state, COMPLETED_KEY: checkpoint.completed}
+            user_message = user_message or checkpoint.task
+        emit_event("pipeline.resume", {
+            "jobId": checkpoint_job,
+            "status": checkpoint.status if checkpoint else None,
+            "completed": restored.get(COMPLETED_KEY, []),
+        })
+
+    # Calls this run leads in the response cache are released even if it is cancelled
+    cache_scope = response_cache.job_scope() if response_cache else nullcontext()
+    with tracer.run(), model_limiter.job_scope(), cache_scope:
+        # Each run gets its own session so a worker can serve several jobs at once
+        session_id = f"adk_session_{job_id or uuid.uuid4().hex}"
+        with trace_span("build_context_summary", "context") as span:
+            memory_context = build_context_summary(context, user_message)
+            span["chars"] = len(memory_context)
+        await _session_service.create_session(
+            app_name=APP_NAME,
+            user_id=USER_ID,
+            session_id=session_id,
+            state={
+                **restored,
+                "user_request": user_message,
+                "memory_context": memory_context,
+                "work_dir": work_dir,
+                **({"refine_path": work_dir} if refine_path else {}),
+                **({JOB_ID_KEY: checkpoint_job} if checkpoint_job else {}),
+            },
+        )
+
+        try:
+            async with filesystem_toolset.lease() as mcp_lease:
+                outputs = await _run_session(
+                    runner, session_id, user_message, write_stdout, mcp_lease, work_dir,
+                    # The raw patches are not for the user; the apply report is
+                    output_authors={"PatchApplyAgent"} if refine_path else None,
+                    checkpoint_job=checkpoint_job,
+                    # The stages skipped on a resume answered in the earlier run
+                    prior_outputs=restored.get(OUTPUTS_KEY),
+                )
+            emit_event("mcp.pool", mcp_pool.metrics())
+            if response_cache:
+                emit_event("cache.stats", response_cache.metrics())
+            emit_event("model.routes", model_router.metrics())
+            return outputs
+        finally:
+            await _session_service.delete_session(app_name=APP_NAME, user_id=USER_ID, session_id=session_id)
+
+
+async def _run_session(
+    runner: "Runner",
+    session_id: str,
+    user_message: str,
+    write_stdout: bool,
+    mcp_lease,
+    work_dir: str,
+    output_authors: Optional[Set[str]] = None,
+    checkpoint_job: Optional[str] = None,
+    prior_outputs: Optional[List[str]] = None,
+):
+    from google.adk.agents.run_config import RunConfig, StreamingMode
+    from google.genai import types as genai_types
+
+    from adk_pipeline.checkpoint import final_texts
+    from adk_pipeline.metrics import PipelineMetrics
+
     # Prepare user message
     message = genai_types.Content(
         role="user",
         parts=[genai_types.Part(text=user_message)],
     )
 
-    outputs = []
-    current_agent = None
+    outputs = list(prior_outputs or [])
 
     # Emit initial pipeline start
-    emit_event("pipeline.start", {"message": "Starting ADK pipeline"})
-    
-    # Emit agent sequence
-    agents_sequence = [
-        {"name": "BusinessAnalystAgent", "description": "Analyzing requirements and creating specifications"},
-        {"name": "CodeWriterAgent", "description": "Generating production-ready code"},
-        {"name": "CodeReviewerAgent", "description": "Reviewing code quality"},
-        {"name": "CodeRefactorerAgent", "description": "Refactoring and improving code"},
-        {"name": "SyntaxValidatorAgent", "description": "Validating Python syntax"},
-        {"name": "FileSaverAgent", "description": "Saving files to disk"},
-        {"name": "ProjectExecutorAgent", "description": "Executing output.py and creating project"},
-        {"name": "TestingAgent", "description": "Validating and testing the generated project"},
-    ]
-    
-    agent_index = 0
+    emit_event("pipeline.start", {
+        "message": "Starting ADK pipeline",
+        "startup": {**_startup, "budgetMs": STARTUP_BUDGET_MS},
+    })
+
+    # Agent transitions, timings and token usage come from the events themselves
+    metrics = PipelineMetrics(runner.agent)
+    deltas = DeltaCoalescer(STREAM_DELTA_MAX_CHARS, STREAM_DELTA_INTERVAL_S) if STREAMING_ENABLED else None
+    run_config = RunConfig(streaming_mode=StreamingMode.SSE if STREAMING_ENABLED else StreamingMode.NONE)
 
     # Run the pipeline
     try:
         async for event in runner.run_async(
-            user_id="node_user",
-            session_id="adk_session",
+            user_id=USER_ID,
+            session_id=session_id,
             new_message=message,
+            run_config=run_config,
         ):
-            # Detect agent transitions by checking event type and content
-            event_type = type(event).__name__
-            
-            # Emit agent start for each step
-            if event_type in ["AgentStartEvent", "AgentThinkingEvent"] or (hasattr(event, 'content') and event.content):
-                if agent_index < len(agents_sequence):
-                    agent_info = agents_sequence[agent_index]
-                    if current_agent != agent_info["name"]:
-                        current_agent = agent_info["name"]
-                        emit_event("agent.start", {
-                            "agent": agent_info["name"],
-                            "description": agent_info["description"],
-                            "timestamp": None
-                        })
-            
-            # Detect tool usage from function calls in event
-            if hasattr(event, 'function_calls') and event.function_calls:
-                for func_call in event.function_calls:
-                    # Try multiple attributes for tool name
-                    tool_name = (
-                        getattr(func_call, 'name', None) or
-                        getattr(func_call, 'function_name', None) or
-                        getattr(func_call, 'tool_name', None) or
-                        str(type(func_call).__name__)
-                    )
-                    if not tool_name or tool_name == 'NoneType':
-                        tool_name = 'write_file'  # Default for filesystem operations
-                    emit_event("tool.use", {
-                        "agent": current_agent or "Unknown",
-                        "tool": tool_name,
-                        "timestamp": None
-                    })
-            
-            # Check for tool calls in content parts
-            if hasattr(event, 'content') and hasattr(event.content, 'parts'):
-                for part in event.content.parts:
-                    if hasattr(part, 'function_call'):
-                        fc = part.function_call
-                        tool_name = (
-                            getattr(fc, 'name', None) or
-                            getattr(fc, 'function_name', None) or
-                            str(type(fc).__name__)
-                        )
-                        if not tool_name or tool_name == 'NoneType':
-                            tool_name = 'write_file'
-                        emit_event("tool.use", {
-                            "agent": current_agent or "Unknown",
-                            "tool": tool_name,
-                            "timestamp": None
-                        })
-            
+            # Flush the live preview before metrics report the agent as done
+            if deltas and not event.partial:
+                deltas.flush()
+            metrics.on_event(event)
+
+            # Partial chunks only feed the live preview; the aggregated event follows
+            if event.partial:
+                if deltas and event.content and event.content.parts:
+                    deltas.add(event.author, "".join(p.text for p in event.content.parts if p.text and not p.thought))
+                continue
+
             # Collect final outputs
-            if event.is_final_response() and hasattr(event.content, "parts"):
-                for part in event.content.parts:
-                    if hasattr(part, "text"):
-                        outputs.append(part.text)
-                        agent_index += 1  # Move to next agent after response
+            if output_authors is None or event.author in output_authors:
+                outputs.extend(final_texts(event))
     except Exception as e:
+        # Don't hand a connection that may be mid-call to the next run
+        mcp_lease.mark_failed()
         # Return a single-element outputs array with a readable error
         err_msg = str(e)
-        emit_event("pipeline.error", {"error": err_msg})
+        metrics.finish("error")
+        # The stages completed so far stay checkpointed for a resume
+        if checkpoint_job:
+            checkpoint_store.set_status(checkpoint_job, "failed")
+        emit_event("pipeline.error", {
+            "error": err_msg,
+            **({"jobId": checkpoint_job, "resumable": True} if checkpoint_job else {}),
+        })
         return [f"ADK error: {err_msg}"]
 
     # Process outputs to extract only the analysis sections (not the Python code)
@@ -820,28 +1487,131 @@ Be thorough and critical. If you find any issues, clearly explain what's wrong a
             processed_outputs.append(output)
     
     
-    # Emit pipeline completion event
+    # Emit per-agent metrics and pipeline completion
+    summary = metrics.finish()
+    if checkpoint_job:
+        checkpoint_store.set_status(checkpoint_job, "complete")
     emit_event("pipeline.complete", {"message": "ADK pipeline completed successfully"})
     
     # Emit final 'complete' event that frontend expects to close the stream
     final_outputs = processed_outputs if processed_outputs else outputs
+    # Node runs output.py only when the project was not materialized here
+    session = await runner.session_service.get_session(app_name=APP_NAME, user_id=USER_ID, session_id=session_id)
     emit_event("complete", {
         "outputs": final_outputs,
-        "projectPath": f"{TARGET_FOLDER_PATH}",
-        "status": "success"
+        "projectPath": work_dir,
+        "materialized": session.state.get("materialized") if session else None,
+        "status": "success",
+        "usage": {"inputTokens": summary["promptTokens"], "outputTokens": summary["completionTokens"]},
     })
     
     # CRITICAL: Also print to stdout for Node.js agentService to parse
     # Node.js reads from stdout buffer to get final results
-    print(json.dumps(final_outputs), flush=True)
+    # (worker mode returns them over the job channel instead)
+    if write_stdout:
+        print(json.dumps(final_outputs), flush=True)
     
     return final_outputs
 
 
-def run_pipeline(user_message: str):
-    return asyncio.run(run_pipeline_async(user_message))
+def run_pipeline(user_message: Optional[str] = None, argv: Optional[List[str]] = None):
+    # --events-fd N sends the events to that descriptor and leaves stderr to logs
+    events_fd = events_fd_from_argv(argv or [])
+    channel = EventChannel(events_fd, max_interval_s=EVENT_BATCH_MS / 1000) if events_fd is not None else None
+
+    async def _main():
+        try:
+            # Open the run's trace here so reading the job input is part of it
+            with tracer.run():
+                with trace_span("read_job_input", "context") as span:
+                    job_input = read_job_input(argv or [], user_message)
+                    span["source"] = job_input.source
+                    span["bytes"] = job_input.bytes
+                job = job_input.job
+                # {"refineFrom": ...} or ADK_REFINE_PATH=<project path> patches an existing project
+                refine_path = job.get("refineFrom") or os.getenv("ADK_REFINE_PATH") or None
+                # The outputs travel once: in the complete event when there is a channel, else on stdout
+                # {"id": ..., "resume": true} picks a failed run up at its last checkpoint
+                return await run_pipeline_async(
+                    job["task"], job.get("context"), write_stdout=channel is None,
+                    job_id=job.get("id"), refine_path=refine_path, resume=bool(job.get("resume")),
+                )
+        finally:
+            await shutdown_async()
+
+    if channel is None:
+        return asyncio.run(_main())
+    try:
+        with event_sink(channel):
+            return asyncio.run(_main())
+    finally:
+        channel.close()
+
+
+def job_work_dir(job_id: str, requested: Optional[str] = None) -> str:
+    if not job_id.replace("-", "").replace("_", "").isalnum():
+        raise ValueError(f"Invalid job id {job_id!r}")
+    root = os.path.abspath(TARGET_FOLDER_PATH)
+    work_dir = os.path.abspath(requested or os.path.join(root, "jobs", job_id))
+    # The MCP filesystem server only serves TARGET_FOLDER_PATH
+    if os.path.commonpath([root, work_dir]) != root:
+        raise ValueError(f"workDir {work_dir} is outside {root}")
+    return work_dir
+
+
+async def run_worker_job(job: Dict[str, Any]):
+    job_id = job.get("id") or uuid.uuid4().hex
+    work_dir = job_work_dir(job_id, job.get("workDir"))
+    # {"refineFrom": "<project path>"} patches an earlier job's project instead
+    refine_path = job_work_dir(job_id, job["refineFrom"]) if job.get("refineFrom") else None
+    return await scheduler.run(job_id, lambda: run_pipeline_async(
+        job.get("task") or "",
+        job.get("context"),
+        write_stdout=False,
+        job_id=job_id,
+        work_dir=work_dir,
+        refine_path=refine_path,
+        resume=bool(job.get("resume")),
+    ))
+
+
+def run_worker(socket_path: Optional[str] = None):
+    from adk_pipeline.worker import serve_socket, serve_stdio
+
+    async def _main():
+        # Pay the agent graph construction and MCP server start once, before the first job arrives
+        get_runner()
+        await mcp_pool.prewarm(MCP_PREWARM)
+        try:
+            options = {"capacity": MAX_CONCURRENT_JOBS, "status": scheduler.metrics}
+            if socket_path:
+                await serve_socket(socket_path, run_worker_job, **options)
+            else:
+                await serve_stdio(run_worker_job, **options)
+        finally:
+            await shutdown_async()
+
+    asyncio.run(_main())
 
 
 if __name__ == "__main__":
-    msg = sys.argv[1] if len(sys.argv) > 1 else "Help me create something new"
-    run_pipeline(msg)
+    if len(sys.argv) > 1 and sys.argv[1] == "--profile-startup":
+        # python3 adk_service.py --profile-startup [--budget-ms N]
+        from adk_pipeline.startup import main as profile_main
+
+        sys.exit(profile_main(os.path.dirname(os.path.abspath(__file__)), sys.argv[2:], STARTUP_BUDGET_MS))
+    elif len(sys.argv) > 1 and sys.argv[1] == "--worker":
+        # python3 adk_service.py --worker [--socket /path/to.sock]
+        socket_path = None
+        if "--socket" in sys.argv:
+            socket_path = sys.argv[sys.argv.index("--socket") + 1]
+        run_worker(socket_path)
+    else:
+        # python3 adk_service.py --input - | --input PATH [--input-delete] | --input-fd N
+        # (a JSON job document), or python3 adk_service.py "<task>" with ADK_CONTEXT;
+        # add --events-fd N to write the events there instead of stderr
+        try:
+            run_pipeline(argv=sys.argv[1:])
+        except JobInputError as e:
+            print(f"Invalid job input: {e}", file=sys.stderr, flush=True)
+            sys.exit(2)
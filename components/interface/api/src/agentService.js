@@ -1,10 +1,13 @@
 import fs from "fs";
 import path from "path";
+import readline from "readline";
 import { fileURLToPath } from "url";
-import { spawn, execFileSync } from "child_process";
-import { TIMEOUTS, LIMITS, PATHS } from "./constants.js";
+import { randomUUID } from "crypto";
+import { spawn, spawnSync, execFileSync } from "child_process";
+import { TIMEOUTS, LIMITS, PATHS, ADK_WORKERS } from "./constants.js";
 import { MemoryService } from "./memory/memoryService.js";
 import { uploadDirectory } from "./storageService.js";
+import { ADKWorkerPool } from "./adkWorkerPool.js";
 
 const PROJECT_DIR = "/home/coder/project/";
 
@@ -14,15 +17,27 @@ export class AgentService {
     this.projectRoot = process.cwd();
     this.memory = new MemoryService();
     this.__dirname = path.dirname(fileURLToPath(import.meta.url));
+    // Warm Python workers; null falls back to one python3 process per request
+    this.workerPool = ADK_WORKERS.POOL_SIZE > 0
+      ? new ADKWorkerPool({
+        scriptPath: path.join(this.__dirname, "adk_service.py"),
+        env: { TARGET_FOLDER_PATH: PROJECT_DIR },
+      })
+      : null;
   }
 
   async initialize() {
     if (!this.initialized) {
       this.initialized = true;
+      this.workerPool?.start();
       console.log("🤖 Agent service ready (ADK mode)");
     }
   }
 
+  async shutdown() {
+    await this.workerPool?.shutdown();
+  }
+
   /**
    * Detect if user is requesting refinement vs new project
    */
@@ -43,55 +58,13 @@ export class AgentService {
   }
 
   /**
-   * Load project files for refinement context
+   * A job id from an earlier run (pipeline.error carries it) that can be resumed.
+   * It names the job's directory, so only plain ids are accepted
    */
-  loadProjectContext(projectPath) {
-    const keyFiles = ['package.json', 'requirements.txt', 'README.md', 'docker-compose.yml'];
-    const context = {};
-
-    for (const file of keyFiles) {
-      const filePath = path.join(projectPath, file);
-      try {
-        if (fs.existsSync(filePath)) {
-          const content = fs.readFileSync(filePath, 'utf8');
-          // Limit file size
-          context[file] = content.length > 5000 ? content.substring(0, 5000) + '\n...(truncated)' : content;
-        }
-      } catch (err) {
-        console.warn(`Could not read ${file}:`, err.message);
-      }
-    }
-
-    return context;
+  isResumableJobId(jobId) {
+    return typeof jobId === "string" && /^[\w-]{1,64}$/.test(jobId);
   }
 
-  /**
-   * Build enhanced prompt for refinement
-   */
-  buildRefinementPrompt(task, projectContext) {
-    const filesContext = Object.entries(projectContext)
-      .map(([file, content]) => `--- ${file} ---\n${content}`)
-      .join('\n\n');
-
-    return `You are refining an existing project based on user feedback.
-
-CURRENT PROJECT FILES:
-${filesContext}
-
-USER REQUEST:
-${task}
-
-INSTRUCTIONS:
-1. Analyze the user's feedback and any errors mentioned
-2. Make MINIMAL changes to fix the issue
-3. Only modify necessary files  
-4. Preserve all working code
-5. Output the fixed/updated files
-
-Focus on targeted fixes rather than complete rewrites.`;
-  }
-
-
   /**
    * Stream ADK pipeline execution via SSE
    * @param {Response} res - Express response object
@@ -100,7 +73,7 @@ Focus on targeted fixes rather than complete rewrites.`;
    * @returns {Function} Cleanup function
    */
   async runADKPipelineStream(res, task, options = {}) {
-    let { userId, sessionId, projectId, session } = options || {};
+    let { userId, sessionId, projectId, session, resumeJobId } = options || {};
     userId = userId || "adk-user";
     sessionId = sessionId || "adk-session";
     projectId = projectId || "adk-project";
@@ -110,253 +83,263 @@ Focus on targeted fixes rather than complete rewrites.`;
       "adk_service.py"
     );
 
-    const TARGET_DIR = PROJECT_DIR;
-
-    // Check if this is a refinement request
-    const isRefinement = this.isRefinementRequest(task, session);
-    let enhancedTask = task;
-
-    if (isRefinement) {
-      const projectPath = session.metadata.lastProject.path;
-      console.log(`🔧 Refinement detected for project: ${projectPath}`);
+    // Each request gets its own job id and work directory, so concurrent runs
+    // never share output.py or the generated project. A resume reuses the
+    // failed job's id and directory and continues from its last checkpoint
+    const resume = this.isResumableJobId(resumeJobId);
+    const jobId = resume ? resumeJobId : randomUUID();
+    const TARGET_DIR = path.join(PROJECT_DIR, "jobs", jobId);
 
-      // Load project files for context
-      const projectContext = this.loadProjectContext(projectPath);
-      const fileCount = Object.keys(projectContext).length;
-      console.log(`📁 Loaded ${fileCount} files for refinement context`);
+    // Refinements patch the existing project in place (adk_pipeline/refine.py)
+    // instead of regenerating it, so only the affected files reach the model
+    const refineFrom = !resume && this.isRefinementRequest(task, session) ? session.metadata.lastProject.path : null;
 
-      // Build enhanced prompt with project files
-      enhancedTask = this.buildRefinementPrompt(task, projectContext);
-
-      // Emit refinement event to frontend
+    if (refineFrom) {
+      console.log(`🔧 Refinement detected for project: ${refineFrom}`);
       res.write(`event: refinement.detected\n`);
-      res.write(`data: ${JSON.stringify({ projectPath, filesLoaded: fileCount })}\n\n`);
+      res.write(`data: ${JSON.stringify({ projectPath: refineFrom, mode: "patch" })}\n\n`);
     }
 
     // Save initial turn
     await this.memory.saveTurn({ userId, sessionId, projectId, userMsg: task, assistantMsg: null, usage: null });
     const ctx = await this.memory.getChatContext({ userId, sessionId, projectId, query: task, limit: LIMITS.MAX_CONTEXT_MESSAGES });
+    const adkContext = { userId, sessionId, projectId, context: ctx };
+    const run = { task, userId, sessionId, projectId, targetDir: refineFrom || TARGET_DIR };
 
-    // Spawn Python process with enhanced task
-    const proc = spawn("python3", [scriptPath, enhancedTask], {
+    const forwardEvent = (eventType, data) => {
+      // The pipeline may have written the project itself (adk_pipeline/materialize.py)
+      if (eventType === "complete") {
+        run.materialized = data.materialized || null;
+      }
+      res.write(`event: ${eventType}\n`);
+      res.write(`data: ${JSON.stringify(data)}\n\n`);
+      // Streamed token deltas are relayed as-is; logging each one would flood the console
+      if (eventType !== "agent.delta") {
+        console.log(`📤 Forwarded event: ${eventType}`, data);
+      }
+    };
+
+    if (this.workerPool) {
+      this.workerPool
+        .run(
+          { id: jobId, task, context: adkContext, workDir: TARGET_DIR, refineFrom, resume },
+          { onEvent: forwardEvent, timeout: TIMEOUTS.ADK_PIPELINE }
+        )
+        .then((outputs) => this.#finishStream(res, outputs, run))
+        .catch((error) => this.#failStream(res, error, run));
+
+      // Return cleanup function
+      return () => this.workerPool.cancel(jobId);
+    }
+
+    // Spawn Python process. The job goes over stdin rather than argv/env, which
+    // the kernel caps and copies into every child process (adk_pipeline/job_input.py).
+    // Events come back as NDJSON on a fourth pipe (fd 3, adk_pipeline/event_channel.py);
+    // stderr only carries logs
+    const proc = spawn("python3", [scriptPath, "--input", "-", "--events-fd", "3"], {
       env: {
         ...process.env,
-        TARGET_FOLDER_PATH: TARGET_DIR,
-        ADK_CONTEXT: JSON.stringify({ userId, sessionId, projectId, context: ctx })
+        TARGET_FOLDER_PATH: refineFrom || TARGET_DIR,
       },
+      stdio: ["pipe", "pipe", "pipe", "pipe"],
     });
+    proc.stdin.on("error", (error) => console.warn("⚠️ Could not send the job to the ADK process:", error.message));
+    proc.stdin.end(JSON.stringify({ id: jobId, task, context: adkContext, refineFrom, resume }));
 
-    let buffer = "";
     let finalResult = null;
+    let lastSeq = 0;
 
-    proc.stdout.on("data", (chunk) => {
-      buffer += chunk.toString();
-      // Send progress events
-      res.write(`event: progress\n`);
-      res.write(`data: ${JSON.stringify({ message: chunk.toString() })}\n\n`);
+    // The final outputs arrive once, in the complete event
+    readline.createInterface({ input: proc.stdio[3], crlfDelay: Infinity }).on("line", (line) => {
+      if (!line.trim()) return;
+      let record;
+      try {
+        record = JSON.parse(line);
+      } catch (parseError) {
+        console.warn("⚠️ Malformed ADK event record:", parseError.message);
+        return;
+      }
+      const { seq, event, data } = record;
+      if (seq !== lastSeq + 1) {
+        console.warn(`⚠️ ADK event sequence jumped from ${lastSeq} to ${seq}`);
+      }
+      lastSeq = seq;
+      if (event === "complete") {
+        finalResult = data.outputs;
+      }
+      forwardEvent(event, data);
     });
 
-    let stderrBuffer = "";
-
-    proc.stderr.on("data", (chunk) => {
-      const text = chunk.toString();
-      console.error("ADK stderr:", text);
-
-      // Add to buffer and process line by line
-      stderrBuffer += text;
-      const lines = stderrBuffer.split("\n");
+    // Anything the process prints is a log line, relayed as-is
+    const forwardLog = (line) => {
+      if (!line.trim()) return;
+      console.error("ADK:", line);
+      res.write(`event: log\n`);
+      res.write(`data: ${JSON.stringify({ level: "info", message: line })}\n\n`);
+    };
+    readline.createInterface({ input: proc.stdout, crlfDelay: Infinity }).on("line", forwardLog);
+    readline.createInterface({ input: proc.stderr, crlfDelay: Infinity }).on("line", forwardLog);
 
-      // Keep the last incomplete line in the buffer
-      stderrBuffer = lines.pop() || "";
+    proc.on("close", async (code) => {
+      // MCP cleanup errors can cause non-zero exit codes, but pipeline may have succeeded
+      // Log warning but don't fail immediately - check if we have valid results
+      if (code !== 0 && code !== null) {
+        console.warn(`⚠️ Python process exited with code ${code} (may be MCP cleanup error)`);
+      }
 
-      // Process each complete line
-      for (const line of lines) {
-        const trimmed = line.trim();
-        if (!trimmed) continue;
+      if (Array.isArray(finalResult)) {
+        console.log('✅ Received pipeline results');
+      } else {
+        console.log('ℹ️ No complete event received - pipeline may have streamed all output');
+        finalResult = [];
+      }
 
-        try {
-          // Try to parse as JSON
-          const eventData = JSON.parse(trimmed);
+      await this.#finishStream(res, finalResult, run);
+    });
 
-          // If it has an 'event' field, forward it with that event type
-          if (eventData.event) {
-            const eventType = eventData.event;
+    // Return cleanup function
+    return () => {
+      if (!proc.killed) {
+        proc.kill();
+      }
+    };
+  }
 
-            // Remove the 'event' field from data to avoid duplication
-            const { event, ...data } = eventData;
+  /**
+   * Post-process a finished streaming run: build the project, upload it and record memory
+   */
+  async #finishStream(res, finalResult, { task, userId, sessionId, projectId, targetDir: TARGET_DIR, materialized }) {
+    try {
+      // NOTE: output.py execution moved to AFTER pipeline completes (see below)
 
-            res.write(`event: ${eventType}\n`);
-            res.write(`data: ${JSON.stringify(data)}\n\n`);
+      // Save artifacts
+      const timestamp = new Date().toISOString().replace(/[:.]/g, "-");
+      const ARTIFACTS_ROOT = path.resolve(process.cwd(), PATHS.ARTIFACTS_DIR);
+      fs.mkdirSync(ARTIFACTS_ROOT, { recursive: true });
+      const projectDir = path.join(ARTIFACTS_ROOT, `adk-project-${timestamp}`);
+      fs.mkdirSync(projectDir, { recursive: true });
 
-            console.log(`📤 Forwarded event: ${eventType}`, data);
-          } else {
-            // JSON but no event field, send as generic log
-            res.write(`event: log\n`);
-            res.write(`data: ${JSON.stringify({ level: "info", message: trimmed })}\n\n`);
-          }
-        } catch (parseError) {
-          // Not JSON, send as plain log event
-          res.write(`event: log\n`);
-          res.write(`data: ${JSON.stringify({ level: "info", message: trimmed })}\n\n`);
-        }
+      if (Array.isArray(finalResult)) {
+        const fileNames = ["requirements.md", "solution.md", "validation.md"];
+        finalResult.forEach((content, idx) => {
+          const file = fileNames[idx] || `output-${idx}.txt`;
+          fs.writeFileSync(path.join(projectDir, file), content, "utf8");
+        });
       }
-    });
 
-    proc.on("close", async (code) => {
+      // ============================================
+      // EXECUTE PROJECT CREATION (Now at end of pipeline)
+      // ============================================
       try {
-        // MCP cleanup errors can cause non-zero exit codes, but pipeline may have succeeded
-        // Log warning but don't fail immediately - check if we have valid results
-        if (code !== 0 && code !== null) {
-          console.warn(`⚠️ Python process exited with code ${code} (may be MCP cleanup error)`);
-        }
-
-        // Parse result - if buffer is empty or invalid, try to handle gracefully
-        try {
-          if (buffer && buffer.trim()) {
-            finalResult = JSON.parse(buffer);
-            console.log('✅ Successfully parsed pipeline results');
-          } else {
-            console.log('ℹ️ No JSON buffer to parse - pipeline may have streamed all output');
-            finalResult = [];
-          }
-        } catch (parseError) {
-          console.warn('⚠️ Could not parse pipeline results as JSON:', parseError.message);
-          // Don't throw - the pipeline may have worked via streaming
-          // Just set empty results and continue
-          finalResult = [];
-        }
-
-        // NOTE: output.py execution moved to AFTER pipeline completes (see below)
-
-        // Save artifacts
-        const timestamp = new Date().toISOString().replace(/[:.]/g, "-");
-        const ARTIFACTS_ROOT = path.resolve(process.cwd(), PATHS.ARTIFACTS_DIR);
-        fs.mkdirSync(ARTIFACTS_ROOT, { recursive: true });
-        const projectDir = path.join(ARTIFACTS_ROOT, `adk-project-${timestamp}`);
-        fs.mkdirSync(projectDir, { recursive: true });
-
-        if (Array.isArray(finalResult)) {
-          const fileNames = ["requirements.md", "solution.md", "validation.md"];
-          finalResult.forEach((content, idx) => {
-            const file = fileNames[idx] || `output-${idx}.txt`;
-            fs.writeFileSync(path.join(projectDir, file), content, "utf8");
+        const generatedScript = path.join(TARGET_DIR, "output.py");
+        if (materialized) {
+          console.log(`📦 Project materialized by the pipeline (${materialized.mode}): ` +
+            `${materialized.written} files written, ${materialized.skipped} unchanged, ${materialized.bytesWritten} bytes`);
+        } else if (fs.existsSync(generatedScript)) {
+          console.log('📦 Executing project creation...');
+          const execOut = execFileSync("python3", [generatedScript], {
+            encoding: "utf8",
+            timeout: TIMEOUTS.OUTPUT_EXECUTION,
           });
+          console.log("output.py execution output:\n", execOut);
+        } else {
+          console.log('No output.py found, skipping project creation');
         }
+      } catch (e) {
+        console.error("Failed to execute output.py:", e.message);
+        // Don't fail the whole pipeline if project creation fails
+      }
 
-        // ============================================
-        // EXECUTE PROJECT CREATION (Now at end of pipeline)
-        // ============================================
-        console.log('📦 Executing project creation...');
-        try {
-          const generatedScript = path.join(TARGET_DIR, "output.py");
-          if (fs.existsSync(generatedScript)) {
-            const execOut = execFileSync("python3", [generatedScript], {
-              encoding: "utf8",
-              timeout: TIMEOUTS.OUTPUT_EXECUTION,
-            });
-            console.log("output.py execution output:\n", execOut);
-          } else {
-            console.log('No output.py found, skipping project creation');
-          }
-        } catch (e) {
-          console.error("Failed to execute output.py:", e.message);
-          // Don't fail the whole pipeline if project creation fails
-        }
-
-        // ============================================
-        // UPLOAD TO GOOGLE CLOUD STORAGE
-        // ============================================
-        let gcsUrl = null;
-        try {
-          console.log(`📤 Uploading project from ${TARGET_DIR} to GCS...`);
-          const destinationPrefix = `projects/${projectId}/${timestamp}`;
-          await uploadDirectory(TARGET_DIR, destinationPrefix);
-          gcsUrl = `gs://${process.env.GCS_BUCKET_NAME || 'data298b-project-store'}/${destinationPrefix}`;
-          console.log(`✅ Project uploaded to GCS: ${gcsUrl}`);
-        } catch (uploadError) {
-          console.error("❌ Failed to upload project to GCS:", uploadError);
-          // Log the error but don't fail the pipeline
-        }
+      // ============================================
+      // UPLOAD TO GOOGLE CLOUD STORAGE
+      // ============================================
+      let gcsUrl = null;
+      try {
+        console.log(`📤 Uploading project from ${TARGET_DIR} to GCS...`);
+        const destinationPrefix = `projects/${projectId}/${timestamp}`;
+        await uploadDirectory(TARGET_DIR, destinationPrefix);
+        gcsUrl = `gs://${process.env.GCS_BUCKET_NAME || 'data298b-project-store'}/${destinationPrefix}`;
+        console.log(`✅ Project uploaded to GCS: ${gcsUrl}`);
+      } catch (uploadError) {
+        console.error("❌ Failed to upload project to GCS:", uploadError);
+        // Log the error but don't fail the pipeline
+      }
 
-        // ============================================
-        // CLEANUP INTERMEDIATE FILES
-        // ============================================
-        try {
-          const filesToCleanup = [
-            path.join(TARGET_DIR, "output.py"),
-          ];
-
-          for (const file of filesToCleanup) {
-            if (fs.existsSync(file)) {
-              fs.unlinkSync(file);
-              console.log(`🧹 Cleaned up: ${path.basename(file)}`);
-            }
+      // ============================================
+      // CLEANUP INTERMEDIATE FILES
+      // ============================================
+      try {
+        const filesToCleanup = [
+          path.join(TARGET_DIR, "output.py"),
+        ];
+
+        for (const file of filesToCleanup) {
+          if (fs.existsSync(file)) {
+            fs.unlinkSync(file);
+            console.log(`🧹 Cleaned up: ${path.basename(file)}`);
           }
-        } catch (cleanupError) {
-          console.error("Cleanup warning:", cleanupError.message);
-          // Don't fail pipeline for cleanup errors
         }
+      } catch (cleanupError) {
+        console.error("Cleanup warning:", cleanupError.message);
+        // Don't fail pipeline for cleanup errors
+      }
 
-        // Log success
-        await this.memory.saveToolRun({
-          userId,
-          sessionId,
-          projectId,
-          name: "adk_stream",
-          input: { task },
-          output: { projectPath: projectDir, outputs: finalResult, gcsUrl },
-          success: true,
-        });
-
-        const assistantSummary = `ADK stream succeeded. Artifacts at ${projectDir}. Uploaded to ${gcsUrl || 'local only'}.`;
-        await this.memory.saveTurn({ userId, sessionId, projectId, userMsg: null, assistantMsg: assistantSummary, usage: null });
+      // Log success
+      await this.memory.saveToolRun({
+        userId,
+        sessionId,
+        projectId,
+        name: "adk_stream",
+        input: { task },
+        output: { projectPath: projectDir, outputs: finalResult, gcsUrl },
+        success: true,
+      });
 
-        if (projectId) {
-          await this.memory.indexMemory({
-            scope: "project",
-            key: `adk-stream:${timestamp}`,
-            text: `ADK stream completed. Artifacts at ${projectDir}. GCS: ${gcsUrl}. Task: ${task}`,
-            meta: { files: Array.isArray(finalResult) ? finalResult.length : 0, gcsUrl },
-          });
-        }
+      const assistantSummary = `ADK stream succeeded. Artifacts at ${projectDir}. Uploaded to ${gcsUrl || 'local only'}.`;
+      await this.memory.saveTurn({ userId, sessionId, projectId, userMsg: null, assistantMsg: assistantSummary, usage: null });
 
-        // Python script already emitted 'complete' event through stderr
-        // Just close the response stream
-        console.log('✅ ADK pipeline completed successfully');
-        res.end();
-      } catch (error) {
-        console.error("ADK stream completion error:", error);
-
-        // Log failure
-        await this.memory.saveToolRun({
-          userId,
-          sessionId,
-          projectId,
-          name: "adk_stream",
-          input: { task },
-          output: { error: error.message },
-          success: false,
+      if (projectId) {
+        await this.memory.indexMemory({
+          scope: "project",
+          key: `adk-stream:${timestamp}`,
+          text: `ADK stream completed. Artifacts at ${projectDir}. GCS: ${gcsUrl}. Task: ${task}`,
+          meta: { files: Array.isArray(finalResult) ? finalResult.length : 0, gcsUrl },
         });
-
-        res.write(`event: error\n`);
-        res.write(`data: ${JSON.stringify({ message: error.message })}\n\n`);
-        res.end();
       }
+
+      // Python script already emitted 'complete' event through the event channel
+      // Just close the response stream
+      console.log('✅ ADK pipeline completed successfully');
+      res.end();
+    } catch (error) {
+      await this.#failStream(res, error, { task, userId, sessionId, projectId });
+    }
+  }
+
+  async #failStream(res, error, { task, userId, sessionId, projectId }) {
+    console.error("ADK stream completion error:", error);
+
+    // Log failure
+    await this.memory.saveToolRun({
+      userId,
+      sessionId,
+      projectId,
+      name: "adk_stream",
+      input: { task },
+      output: { error: error.message },
+      success: false,
     });
 
-    // Return cleanup function
-    return () => {
-      if (!proc.killed) {
-        proc.kill();
-      }
-    };
+    res.write(`event: error\n`);
+    res.write(`data: ${JSON.stringify({ message: error.message })}\n\n`);
+    res.end();
   }
 
   // ============================================
   // Real Google ADK (Python Bridge Only)
   // ============================================
   async runADKPipeline(task, options = {}) {
-    let { userId, sessionId, projectId } = options || {};
+    let { userId, sessionId, projectId, resumeJobId } = options || {};
     userId = userId || "adk-user";
     sessionId = sessionId || "adk-session";
     projectId = projectId || "adk-project";
@@ -366,32 +349,67 @@ Focus on targeted fixes rather than complete rewrites.`;
       "adk_service.py"
     );
 
-    const TARGET_DIR = PROJECT_DIR;
+    // Each request gets its own job id and work directory, so concurrent runs
+    // never share output.py or the generated project (a resume reuses them)
+    const resume = this.isResumableJobId(resumeJobId);
+    const jobId = resume ? resumeJobId : randomUUID();
+    const TARGET_DIR = path.join(PROJECT_DIR, "jobs", jobId);
 
     await this.memory.saveTurn({ userId, sessionId, projectId, userMsg: task, assistantMsg: null, usage: null });
     const ctx = await this.memory.getChatContext({ userId, sessionId, projectId, query: task, limit: LIMITS.MAX_CONTEXT_MESSAGES });
 
     try {
-      const output = execFileSync("python3", [scriptPath, task], {
-        encoding: "utf8",
-        timeout: TIMEOUTS.ADK_PIPELINE,
-        env: {
-          ...process.env,
-          TARGET_FOLDER_PATH: TARGET_DIR,
-          ADK_CONTEXT: JSON.stringify({ userId, sessionId, projectId, context: ctx })
-        },
-      });
+      const adkContext = { userId, sessionId, projectId, context: ctx };
+      let result;
+      // Set when the pipeline wrote the project itself (adk_pipeline/materialize.py)
+      let materialized = null;
+      if (this.workerPool) {
+        result = await this.workerPool.run(
+          { id: jobId, task, context: adkContext, workDir: TARGET_DIR, resume },
+          {
+            onEvent: (eventType, data) => {
+              if (eventType === "complete") materialized = data.materialized || null;
+            },
+            timeout: TIMEOUTS.ADK_PIPELINE,
+          }
+        );
+      } else {
+        // Events, the complete event with the outputs among them, come back on fd 3
+        const proc = spawnSync("python3", [scriptPath, "--input", "-", "--events-fd", "3"], {
+          encoding: "utf8",
+          timeout: TIMEOUTS.ADK_PIPELINE,
+          maxBuffer: 256 * 1024 * 1024,
+          input: JSON.stringify({ id: jobId, task, context: adkContext, resume }),
+          env: {
+            ...process.env,
+            TARGET_FOLDER_PATH: TARGET_DIR,
+          },
+          stdio: ["pipe", "pipe", "pipe", "pipe"],
+        });
+        if (proc.error) throw proc.error;
+        const complete = (proc.output[3] || "")
+          .split("\n")
+          .filter((line) => line.includes('"event":"complete"'))
+          .map((line) => JSON.parse(line).data)
+          .pop();
+        if (!complete) {
+          throw new Error(`ADK pipeline exited with code ${proc.status} without a result: ${(proc.stderr || "").slice(-500)}`);
+        }
+        result = complete.outputs;
+        materialized = complete.materialized || null;
+      }
 
       const endTime = Date.now();
       console.log(`ADK pipeline started at ${startTime}`);
       console.log(`ADK pipeline ended at ${endTime}`);
       console.log(`ADK pipeline took ${endTime - startTime} ms`);
 
-      const result = JSON.parse(output);
-
       try {
         const generatedScript = path.join(TARGET_DIR, "output.py");
-        if (fs.existsSync(generatedScript)) {
+        if (materialized) {
+          console.log(`📦 Project materialized by the pipeline (${materialized.mode}): ` +
+            `${materialized.written} files written, ${materialized.skipped} unchanged, ${materialized.bytesWritten} bytes`);
+        } else if (fs.existsSync(generatedScript)) {
           const execOut = execFileSync("python3", [generatedScript], {
             encoding: "utf8",
             timeout: TIMEOUTS.OUTPUT_EXECUTION,
@@ -10,6 +10,17 @@ export const TIMEOUTS = {
   RETRY_DELAY_BASE: 1_000,        // 1 second - base delay for exponential backoff
 };
 
+// ADK worker pool (long-lived `adk_service.py --worker` processes)
+export const ADK_WORKERS = {
+  POOL_SIZE: parseInt(process.env.ADK_WORKER_POOL_SIZE ?? "2", 10), // 0 = spawn one process per request
+  READY_TIMEOUT: 120_000,         // 2 minutes - worker import + agent graph warm-up
+  HEALTH_CHECK_INTERVAL: 30_000,  // 30 seconds - ping every idle or busy worker
+  HEALTH_CHECK_TIMEOUT: 10_000,   // 10 seconds - restart a worker that misses its pong
+  RESPAWN_DELAY: 1_000,           // 1 second - back-off before replacing a dead worker
+  SHUTDOWN_TIMEOUT: 5_000,        // 5 seconds - grace period before SIGKILL on shutdown
+  MAX_JOBS_PER_WORKER: 50,        // Recycle workers to bound memory growth
+};
+
 // Limits
 export const LIMITS = {
   MAX_MESSAGE_LENGTH: 10_000,     // Maximum chat message length in characters
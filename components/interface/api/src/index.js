@@ -194,6 +194,8 @@ app.post("/api/adk/run", adkLimiter, async (req, res) => {
     const msg = message || task;
     if (!msg)
       return res.status(400).json({ error: "Message (or task) field is required" });
+    if (options?.resumeJobId != null && !agentService.isResumableJobId(options.resumeJobId))
+      return res.status(400).json({ error: "Invalid resumeJobId" });
 
     const result = await agentService.runADKPipeline(msg, options || {});
     res.json(result);
@@ -259,11 +261,17 @@ app.get("/api/adk/stream", adkLimiter, async (req, res) => {
     const task = req.query.task;
     if (!task) return res.status(400).end("Missing ?task=");
 
+    // ?resumeJobId= continues a failed run (pipeline.error names the job) from its last checkpoint
+    const resumeJobId = req.query.resumeJobId;
+    if (resumeJobId != null && !agentService.isResumableJobId(resumeJobId))
+      return res.status(400).end("Invalid ?resumeJobId=");
+
     // optional identity for logging
     const options = {
       userId: req.query.userId,
       sessionId: req.query.sessionId,
       projectId: req.query.projectId,
+      resumeJobId,
     };
 
     // Fetch session for refinement detection
@@ -2075,6 +2083,10 @@ const PORT = process.env.PORT || 3030;
         console.log('✅ HTTP server closed');
 
         try {
+          // Stop ADK workers (and the MCP servers they own)
+          await agentService.shutdown();
+          console.log('✅ ADK workers stopped');
+
           // Close database connections
           closeDatabase();
           console.log('✅ Database connections closed');
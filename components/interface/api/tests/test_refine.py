@@ -0,0 +1,152 @@
+# test_refine.py — patch parsing and planning for refinement mode (adk_pipeline/refine.py)
+# ============================================
+#
+#   cd components/interface/api && python3 -m pytest -q tests
+
+import os
+import sys
+
+import pytest
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+sys.path.insert(0, SRC_DIR)
+
+from adk_pipeline.refine import PatchError, parse_patches, plan_edits  # noqa: E402
+
+
+def _plan(files, text):
+    manifest = {path: {"sha256": "x"} for path in files}
+    return plan_edits(manifest, parse_patches(text), files.get)
+
+
+def _block(search, replace):
+    return f"<<<<<<< SEARCH\n{search}\n=======\n{replace}\n>>>>>>> REPLACE\n"
+
+
+# ============================================================================
+# parse_patches
+# ============================================================================
+
+def test_parse_file_blocks_and_delete():
+    patches = parse_patches(
+        "FILE: `src/App.jsx`\n" + _block("old", "new") + _block("a", "b")
+        + "DELETE: src/old.css\n"
+    )
+    assert [(p.path, p.delete, p.edits) for p in patches] == [
+        ("src/App.jsx", False, [("old", "new"), ("a", "b")]),
+        ("src/old.css", True, []),
+    ]
+
+
+def test_parse_repeated_file_header_gives_separate_patches():
+    patches = parse_patches("FILE: a.txt\n" + _block("1", "2") + "FILE: a.txt\n" + _block("3", "4"))
+    assert [(p.path, p.edits) for p in patches] == [("a.txt", [("1", "2")]), ("a.txt", [("3", "4")])]
+
+
+def test_parse_multiline_and_empty_search():
+    patches = parse_patches("FILE: new.txt\n<<<<<<< SEARCH\n=======\nline 1\nline 2\n>>>>>>> REPLACE\n")
+    assert patches[0].edits == [("", "line 1\nline 2")]
+
+
+def test_parse_search_without_file_header():
+    with pytest.raises(PatchError):
+        parse_patches(_block("a", "b"))
+
+
+def test_parse_search_after_delete_needs_a_new_header():
+    with pytest.raises(PatchError):
+        parse_patches("DELETE: a.txt\n" + _block("a", "b"))
+
+
+def test_parse_unterminated_block():
+    with pytest.raises(PatchError):
+        parse_patches("FILE: a.txt\n<<<<<<< SEARCH\nold\n=======\nnew\n")
+
+
+# ============================================================================
+# plan_edits
+# ============================================================================
+
+def test_plan_single_edit():
+    assert _plan({"a.txt": "one\ntwo\n"}, "FILE: a.txt\n" + _block("two", "2")) == ({"a.txt": "one\n2\n"}, [], [])
+
+
+def test_plan_repeated_file_header_keeps_both_edits():
+    changes, unchanged, errors = _plan(
+        {"a.txt": "one\ntwo\n"},
+        "FILE: a.txt\n" + _block("one", "1") + "FILE: a.txt\n" + _block("two", "2"),
+    )
+    assert (changes, unchanged, errors) == ({"a.txt": "1\n2\n"}, [], [])
+
+
+def test_plan_second_block_builds_on_emptied_file():
+    changes, _, errors = _plan(
+        {"a.txt": "old\n"},
+        "FILE: a.txt\n" + _block("old\n", "") + "FILE: a.txt\n" + _block("old", "x"),
+    )
+    # The second SEARCH runs against the emptied text, not the file on disk
+    assert errors == ["a.txt: SEARCH text not found"]
+    assert changes == {"a.txt": ""}
+
+
+def test_plan_edit_after_delete_is_an_error():
+    changes, _, errors = _plan({"a.txt": "old\n"}, "DELETE: a.txt\nFILE: a.txt\n" + _block("old", "new"))
+    assert changes == {"a.txt": None}
+    assert errors == ["a.txt: edited after it was deleted in the same patch"]
+
+
+def test_plan_delete_after_edit_wins():
+    changes, _, errors = _plan({"a.txt": "old\n"}, "FILE: a.txt\n" + _block("old", "new") + "DELETE: a.txt\n")
+    assert (changes, errors) == ({"a.txt": None}, [])
+
+
+def test_plan_repeated_noop_keeps_earlier_change():
+    changes, unchanged, errors = _plan(
+        {"a.txt": "old\n"},
+        "FILE: a.txt\n" + _block("old", "new") + "FILE: a.txt\n" + _block("new", "new"),
+    )
+    assert (changes, unchanged, errors) == ({"a.txt": "new\n"}, [], [])
+
+
+def test_plan_unchanged_file():
+    assert _plan({"a.txt": "same\n"}, "FILE: a.txt\n" + _block("same", "same")) == ({}, ["a.txt"], [])
+
+
+def test_plan_new_file():
+    changes, _, errors = _plan({}, "FILE: src/new.js\n" + _block("", "export default 1;"))
+    assert (changes, errors) == ({"src/new.js": "export default 1;\n"}, [])
+
+
+def test_plan_empty_search_on_existing_file():
+    _, _, errors = _plan({"a.txt": "x\n"}, "FILE: a.txt\n" + _block("", "y"))
+    assert errors == ["a.txt: empty SEARCH is only allowed for new files"]
+
+
+def test_plan_delete_missing_file():
+    assert _plan({}, "DELETE: gone.txt\n")[2] == ["gone.txt: cannot delete a file that does not exist"]
+
+
+def test_plan_rejects_paths_outside_the_project():
+    _, _, errors = _plan({}, "FILE: ../escape.txt\n" + _block("", "x") + "FILE: node_modules/x.js\n" + _block("", "x"))
+    assert len(errors) == 2
+
+
+def test_plan_ambiguous_search():
+    _, _, errors = _plan({"a.txt": "x\nx\n"}, "FILE: a.txt\n" + _block("x", "y"))
+    assert errors == ["a.txt: SEARCH text matches 2 places; include more context"]
+
+
+def test_plan_whitespace_tolerant_match():
+    changes, _, errors = _plan({"a.txt": "keep  \nold   \n"}, "FILE: a.txt\n" + _block("keep\nold", "keep\nnew"))
+    assert (changes, errors) == ({"a.txt": "keep\nnew\n"}, [])
+
+
+def test_plan_invalid_json_after_patch():
+    _, _, errors = _plan({"p.json": '{"a": 1}\n'}, "FILE: p.json\n" + _block('"a": 1', '"a": '))
+    assert errors and errors[0].startswith("p.json: invalid JSON after patch")
+
+
+def test_plan_stale_file():
+    patches = parse_patches("FILE: a.txt\n" + _block("old", "new"))
+    _, _, errors = plan_edits({"a.txt": {"sha256": "x"}}, patches, lambda _: "old\n", lambda *_: True)
+    assert errors == ["a.txt: changed since the manifest was taken"]
@@ -0,0 +1,62 @@
+# test_script.py — static analysis of build scripts (adk_pipeline/script.py)
+# ============================================
+#
+#   cd components/interface/api && python3 -m pytest -q tests
+
+import os
+import sys
+
+import pytest
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+sys.path.insert(0, SRC_DIR)
+
+from adk_pipeline.script import analyze_script  # noqa: E402
+
+_HEADER = '''import json
+import os
+
+
+def create_file(path, content):
+    with open(path, "w") as f:
+        f.write(content)
+
+
+'''
+
+
+def _content(body: str):
+    """What `body` (run at module level) writes to /p/out.txt, or None when it did not resolve."""
+    analysis = analyze_script(_HEADER + body + 'create_file("/p/out.txt", x)\n')
+    return analysis.files().get("/p/out.txt")
+
+
+def test_resolves_ordinary_string_operations():
+    body = (
+        'pkg = {"name": "app"}\n'
+        'x = "%s-%d " % ("a", 1) + "{}!".format("b") + f"{pkg[\'name\']}" + "/".join(["c", "d"])\n'
+        'x += json.dumps(pkg, indent=2).replace("app", "App")\n'
+    )
+    assert _content(body) == 'a-1 b!app' + 'c/d' + '{\n  "name": "App"\n}'
+
+
+@pytest.mark.parametrize("body", [
+    'x = "ab"\nfor c in "' + "x" * 40 + '":\n    x += x\n',
+    'x = "ab"\nfor c in "' + "x" * 40 + '":\n    x = f"{x}{x}"\n',
+    'x = "{:>400000000}".format("a")\n',
+    'x = "{:{}}".format("a", 400000000)\n',
+    'x = "%400000000s" % "a"\n',
+    'x = "%*s" % (400000000, "a")\n',
+    'x = "' + "a" * 1000 + '"\nfor i in [1, 2, 3]:\n    x = x.replace("a", x)\n',
+    'x = "' + "a" * 1000 + '"\nfor i in [1, 2, 3, 4, 5]:\n    x = x.join([x, x, x, x])\n',
+    'x = json.dumps({"k": "v"}, indent=400000000)\n',
+], ids=["augassign", "fstring", "format-width", "format-arg-width", "mod-width", "mod-star", "replace", "join", "dumps"])
+def test_oversized_values_are_unknown(body):
+    assert _content(body) is None
+
+
+def test_statement_budget_spans_nested_loops():
+    body = 'x = "v"\nfor a in "' + "x" * 5000 + '":\n    for b in "' + "x" * 5000 + '":\n        y = 1\n'
+    analysis = analyze_script(_HEADER + body + 'create_file("/p/out.txt", x)\n')
+    assert analysis.truncated
+    assert not analysis.complete
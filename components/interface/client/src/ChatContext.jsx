@@ -283,6 +283,24 @@ export const ChatContextProvider = ({ children }) => {
             setProgressEvents((p) => [...p, { type: "tool.use", data: d }]);
           } catch { }
         });
+        ev.addEventListener("agent.end", (e) => {
+          try {
+            const d = JSON.parse(e.data);
+            // d: { agent, durationMs, ttftMs, promptTokens, completionTokens, totalTokens, toolCalls, toolMs }
+            // Attach the measured duration and tokens to the agent's "started" entry
+            setAgentActivity((p) => {
+              const idx = p.findLastIndex((a) => a.action === "started" && a.agent === d.agent);
+              if (idx < 0) return p;
+              return p.map((a, i) => (i === idx ? { ...a, durationMs: d.durationMs, totalTokens: d.totalTokens } : a));
+            });
+            setProgressEvents((p) => [...p, { type: "agent.end", data: d }]);
+          } catch { }
+        });
+        ev.addEventListener("pipeline.metrics", (e) => {
+          try {
+            setProgressEvents((p) => [...p, { type: "pipeline.metrics", data: JSON.parse(e.data) }]);
+          } catch { }
+        });
         ev.addEventListener("agent.output", (e) => {
           try {
             const d = JSON.parse(e.data);
@@ -298,6 +316,26 @@ export const ChatContextProvider = ({ children }) => {
             setProgressEvents((p) => [...p, { type: "agent.output", data: d }]);
           } catch { }
         });
+        ev.addEventListener("agent.delta", (e) => {
+          try {
+            const d = JSON.parse(e.data);
+            // d: { agent, text, seq } - streamed model output, appended to the agent's live entry
+            setAgentActivity((p) => {
+              const idx = p.findLastIndex((a) => a.action === "output" && a.is_partial && a.agent === d.agent);
+              if (idx >= 0) {
+                return p.map((a, i) => (i === idx ? { ...a, text: a.text + d.text } : a));
+              }
+              // A new agent is streaming, so earlier live entries are complete
+              return [...p.map((a) => (a.is_partial ? { ...a, is_partial: false } : a)), {
+                agent: d.agent,
+                action: "output",
+                text: d.text,
+                is_partial: true,
+                timestamp: new Date().toISOString()
+              }];
+            });
+          } catch { }
+        });
         ev.addEventListener("log", (e) => {
           setProgressEvents((p) => [...p, { type: "log", data: JSON.parse(e.data) }]);
         });
@@ -328,6 +366,7 @@ export const ChatContextProvider = ({ children }) => {
           try {
             const d = JSON.parse(e.data);
             setActiveAgent(null);
+            setAgentActivity((p) => p.map((a) => (a.is_partial ? { ...a, is_partial: false } : a)));
             setProgressEvents((p) => [...p, { type: "pipeline.complete", data: d }]);
           } catch { }
         });
@@ -263,6 +263,11 @@ function AgentProgressPanel() {
                         <span style={{ fontStyle: "italic" }}>
                           "I'm taking over from here. Let me {activity.description || 'work on this'}..."
                         </span>
+                        {activity.durationMs != null && (
+                          <small className="ms-2" style={{ color: "rgba(255, 255, 255, 0.5)" }}>
+                            ✓ {(activity.durationMs / 1000).toFixed(1)}s{activity.totalTokens ? ` · ${activity.totalTokens} tokens` : ""}
+                          </small>
+                        )}
                       </div>
                     )}
                     {activity.action === "using_tool" && (
@@ -290,8 +295,10 @@ function AgentProgressPanel() {
                               whiteSpace: "pre-wrap",
                             }}
                           >
-                            {activity.text.length > 200 
-                              ? activity.text.substring(0, 200) + "..." 
+                            {activity.text.length > 200
+                              ? (activity.is_partial
+                                ? "..." + activity.text.slice(-200)
+                                : activity.text.substring(0, 200) + "...")
                               : activity.text}
                             {activity.is_partial && <span className="ms-1 text-info">⏳</span>}
                           </div>